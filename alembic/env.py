@@ -36,7 +36,9 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        # une transaction par revision: app/migration_utils.py y ouvre des blocs
+        # autocommit (copie par tranches) sans engager les revisions suivantes
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
 
         with context.begin_transaction():
             context.run_migrations()
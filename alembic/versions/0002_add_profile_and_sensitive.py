@@ -8,6 +8,8 @@ Create Date: 2025-12-24
 from alembic import op
 import sqlalchemy as sa
 
+from app.migration_utils import add_column, drop_columns
+
 # NOTE: for a real repo, set proper revision hashes.
 revision = "0002"
 down_revision = None
@@ -15,10 +17,9 @@ branch_labels = None
 depends_on = None
 
 def upgrade() -> None:
-    # Add columns to existing clients table (safe: nullable)
-    with op.batch_alter_table("clients") as batch:
-        batch.add_column(sa.Column("nb_enfants", sa.Integer(), nullable=True))
-        batch.add_column(sa.Column("quotient_caf", sa.Float(), nullable=True))
+    # Add columns to existing clients table (nullable: native ADD COLUMN, no table copy)
+    add_column("clients", sa.Column("nb_enfants", sa.Integer(), nullable=True))
+    add_column("clients", sa.Column("quotient_caf", sa.Float(), nullable=True))
 
     # Create new sensitive table (1-1 via unique constraint)
     op.create_table(
@@ -30,7 +31,7 @@ def upgrade() -> None:
     )
 
 def downgrade() -> None:
-    op.drop_table("client_sensitive")
-    with op.batch_alter_table("clients") as batch:
-        batch.drop_column("quotient_caf")
-        batch.drop_column("nb_enfants")
+    # if_exists: an interrupted chunked rebuild has already committed this drop
+    op.drop_table("client_sensitive", if_exists=True)
+    # native DROP COLUMN on small tables, otherwise one chunked, resumable rebuild
+    drop_columns("clients", ["quotient_caf", "nb_enfants"])
@@ -0,0 +1,38 @@
+"""add client_features (feature store) and feature_levels
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "feature_levels",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("column_name", sa.String(length=80), nullable=False),
+        sa.Column("level", sa.String(length=120), nullable=False),
+        sa.UniqueConstraint("column_name", "level", name="uq_feature_levels_column_level"),
+    )
+    op.create_table(
+        "client_features",
+        sa.Column("client_id", sa.Integer(), sa.ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("feature_version", sa.String(length=16), nullable=False),
+        sa.Column("target", sa.Float(), nullable=True),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_client_features_feature_version", "client_features", ["feature_version"])
+    # remplissage: python -m scripts.build_feature_store
+
+def downgrade() -> None:
+    op.drop_index("ix_client_features_feature_version", table_name="client_features")
+    op.drop_table("client_features")
+    op.drop_table("feature_levels")
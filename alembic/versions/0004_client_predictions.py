@@ -0,0 +1,30 @@
+"""add client_predictions (rescoring en masse)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "client_predictions",
+        sa.Column("client_id", sa.Integer(), sa.ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("model_version", sa.String(length=40), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("scored_at", sa.DateTime(), nullable=False),
+    )
+    # reprise: MAX(client_id) WHERE model_version = ...
+    op.create_index("ix_client_predictions_model_version", "client_predictions", ["model_version", "client_id"])
+    # remplissage: python -m scripts.rescore
+
+def downgrade() -> None:
+    op.drop_index("ix_client_predictions_model_version", table_name="client_predictions")
+    op.drop_table("client_predictions")
@@ -0,0 +1,31 @@
+"""add client search / stats indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+
+from app.migration_utils import create_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    # GET /clients/search: egalite puis ORDER BY id (curseur after_id)
+    "ix_clients_region_id": ["region", "id"],
+    "ix_clients_niveau_etude_id": ["niveau_etude", "id"],
+    # GET /clients/stats: index couvrant pour les agregats par segment
+    "ix_clients_segment_stats": ["region", "niveau_etude", "age", "revenu_estime_mois", "score_credit"],
+}
+
+def upgrade() -> None:
+    for name, columns in INDEXES.items():
+        create_index(name, "clients", columns)
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="clients", if_exists=True)
@@ -0,0 +1,162 @@
+"""Cache de reponses serialisees (bytes JSON) avec backends interchangeables.
+
+FASTIA_CACHE_BACKEND: "local" (LRU + TTL en memoire, defaut), "redis"
+(FASTIA_REDIS_URL, partage entre workers) ou "none".
+"""
+from __future__ import annotations
+import os, threading, time
+from collections import OrderedDict
+from typing import Protocol
+
+CACHE_BACKEND = os.getenv("FASTIA_CACHE_BACKEND", "local")
+CACHE_TTL = float(os.getenv("FASTIA_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("FASTIA_CACHE_MAX_ENTRIES", "10000"))
+
+class CacheBackend(Protocol):
+    name: str
+
+    def get(self, key: str) -> bytes | None: ...
+    def set(self, key: str, value: bytes) -> None: ...
+    def delete(self, keys: list[str]) -> None: ...
+    def clear(self, prefix: str) -> None: ...
+    def size(self) -> int | None: ...
+
+class LocalTTLCache:
+    """LRU borne + expiration; propre au processus (chaque worker a le sien)."""
+
+    name = "local"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, keys: list[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def size(self) -> int | None:
+        return len(self._data)
+
+class RedisCache:
+    name = "redis"
+
+    def __init__(self, url: str, ttl: float = CACHE_TTL):
+        import redis  # optionnel: seulement si FASTIA_CACHE_BACKEND=redis
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self._client.set(key, value, px=int(self.ttl * 1000))
+
+    def delete(self, keys: list[str]) -> None:
+        if keys:
+            self._client.delete(*keys)
+
+    def clear(self, prefix: str) -> None:
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=1000))
+        if keys:
+            self._client.delete(*keys)
+
+    def size(self) -> int | None:
+        return None
+
+class NullCache:
+    name = "none"
+
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        pass
+
+    def delete(self, keys: list[str]) -> None:
+        pass
+
+    def clear(self, prefix: str) -> None:
+        pass
+
+    def size(self) -> int | None:
+        return 0
+
+def make_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    if name == "local":
+        return LocalTTLCache()
+    if name == "redis":
+        return RedisCache(os.getenv("FASTIA_REDIS_URL", "redis://localhost:6379/0"))
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"FASTIA_CACHE_BACKEND inconnu: {name}")
+
+class Cache:
+    """Espace de noms sur un backend + compteurs hits/misses."""
+
+    def __init__(self, backend: CacheBackend, namespace: str):
+        self.backend = backend
+        self.prefix = f"fastia:{namespace}:"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> bytes | None:
+        value = self.backend.get(f"{self.prefix}{key}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value: bytes) -> None:
+        self.backend.set(f"{self.prefix}{key}", value)
+
+    def invalidate(self, keys) -> None:
+        self.backend.delete([f"{self.prefix}{k}" for k in keys])
+
+    def clear(self) -> None:
+        self.backend.clear(self.prefix)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": self.backend.size(),
+        }
+
+_backend = make_backend()
+client_cache = Cache(_backend, "client")
+# backend a part: le vidage a chaque ecriture ne parcourt que les agregats
+stats_cache = Cache(make_backend(), "stats")
@@ -1,27 +1,203 @@
 from __future__ import annotations
+import os, time
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from .models import Client
-from .schemas import ClientCreate
+from sqlalchemy import Connection, Select, delete, func, insert, select
+from .cache import client_cache, stats_cache
+from .database import is_transient_error
+from .models import Client, ClientSensitive
+from .schemas import ClientCreate, ClientFilters
 
-def list_clients(db: Session, skip: int = 0, limit: int = 50):
-    stmt = select(Client).offset(skip).limit(limit)
+# marge sous la limite de variables liees de SQLite
+IN_CHUNK = 900
+# nouvelles tentatives d'un lot en conflit d'ecriture (base verrouillee, id pris)
+WRITE_RETRIES = int(os.getenv("FASTIA_WRITE_RETRIES", "3"))
+WRITE_RETRY_DELAY = 0.05  # s, double a chaque tentative
+
+# regroupements et colonnes agregees autorises par GET /clients/stats
+STATS_GROUP_COLUMNS = {
+    "region": Client.region,
+    "niveau_etude": Client.niveau_etude,
+    "situation_familiale": Client.situation_familiale,
+    "sexe": Client.sexe,
+    "smoker": Client.smoker,
+    "sport_licence": Client.sport_licence,
+    "nationalite_francaise": Client.nationalite_francaise,
+    "tranche_age": (Client.age // 10 * 10),
+}
+STATS_FIELDS = {
+    c: getattr(Client, c)
+    for c in ("revenu_estime_mois", "score_credit", "loyer_mensuel", "montant_pret", "quotient_caf",
+              "historique_credits", "risque_personnel", "age", "nb_enfants")
+}
+
+def list_clients(db: Session, skip: int = 0, limit: int = 50, after_id: int | None = None):
+    stmt = select(Client).order_by(Client.id).limit(limit)
+    if after_id is not None:
+        # keyset: cout constant quelle que soit la profondeur (index sur la PK)
+        stmt = stmt.where(Client.id > after_id)
+    else:
+        stmt = stmt.offset(skip)
     return list(db.scalars(stmt).all())
 
+def _prefix_range(column, prefix: str) -> list:
+    # LIKE 'x%' n'utilise pas l'index sous SQLite (collation BINARY): intervalle equivalent
+    return [column >= prefix, column < prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+
+def filter_clauses(f: ClientFilters) -> list:
+    clauses = []
+    for name in ("region", "niveau_etude", "situation_familiale"):
+        values = getattr(f, name)
+        if values:
+            col = getattr(Client, name)
+            clauses.append(col == values[0] if len(values) == 1 else col.in_(values))
+    for name in ("sexe", "smoker", "sport_licence", "nationalite_francaise"):
+        if getattr(f, name) is not None:
+            clauses.append(getattr(Client, name) == getattr(f, name))
+    for col, lo, hi in ((Client.age, f.age_min, f.age_max), (Client.revenu_estime_mois, f.revenu_min, f.revenu_max),
+                        (Client.score_credit, f.score_min, f.score_max)):
+        if lo is not None:
+            clauses.append(col >= lo)
+        if hi is not None:
+            clauses.append(col <= hi)
+    if f.nom:
+        clauses += _prefix_range(Client.nom, f.nom)
+    if f.prenom:
+        clauses += _prefix_range(Client.prenom, f.prenom)
+    return clauses
+
+def search_stmt(filters: ClientFilters, limit: int = 50, after_id: int | None = None) -> Select:
+    stmt = select(Client).where(*filter_clauses(filters)).order_by(Client.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(Client.id > after_id)
+    return stmt
+
+def search_clients(db: Session, filters: ClientFilters, limit: int = 50, after_id: int | None = None):
+    return list(db.scalars(search_stmt(filters, limit, after_id)).all())
+
+def stats_stmt(filters: ClientFilters, group_by: list[str], fields: list[str]) -> Select:
+    """COUNT + COUNT/AVG/MIN/MAX par colonne, agreges en SQL par groupe."""
+    keys = [STATS_GROUP_COLUMNS[g].label(g) for g in group_by]
+    aggs = [func.count().label("count")]
+    for name in fields:
+        col = STATS_FIELDS[name]
+        aggs += [func.count(col).label(f"{name}__count"), func.avg(col).label(f"{name}__mean"),
+                 func.min(col).label(f"{name}__min"), func.max(col).label(f"{name}__max")]
+    stmt = select(*keys, *aggs).where(*filter_clauses(filters))
+    return stmt.group_by(*keys).order_by(*keys) if keys else stmt
+
+def stats_rows(rows, group_by: list[str], fields: list[str]) -> dict:
+    groups = []
+    for r in rows:
+        if not r["count"]:
+            continue  # sans GROUP BY: une ligne meme quand aucun client ne correspond
+        stats = {}
+        for name in fields:
+            stats[name] = {k: r[f"{name}__{k}"] for k in ("count", "mean", "min", "max")}
+        groups.append({"group": {g: r[g] for g in group_by}, "count": r["count"], "fields": stats})
+    return {"group_by": group_by, "total": sum(g["count"] for g in groups), "groups": groups}
+
+def client_stats(db: Session, filters: ClientFilters, group_by: list[str], fields: list[str]) -> dict:
+    return stats_rows(db.execute(stats_stmt(filters, group_by, fields)).mappings(), group_by, fields)
+
+def iter_clients(db: Session, chunk_size: int = 5000):
+    """Toute la table par tranches de dicts (curseur serveur, memoire constante)."""
+    stmt = select(*Client.__table__.columns).order_by(Client.id).execution_options(yield_per=chunk_size)
+    for part in db.execute(stmt).mappings().partitions():
+        yield part
+
 def get_client(db: Session, client_id: int):
     return db.get(Client, client_id)
 
 def create_client(db: Session, payload: ClientCreate):
-    obj = Client(**payload.model_dump())
+    record = payload.model_dump()
+    obj = Client(**record)
     db.add(obj)
+    db.flush()
+    from .ml import feature_store  # pandas: charge a la premiere ecriture
+
+    # meme transaction que le client: jamais de ligne sans son vecteur
+    feature_store.write_records(db.connection(), [obj.id], [record])
     db.commit()
     db.refresh(obj)
+    client_cache.invalidate([obj.id])
+    stats_cache.clear()
     return obj
 
 def delete_client(db: Session, client_id: int) -> bool:
     obj = db.get(Client, client_id)
     if obj is None:
         return False
+    from .ml import feature_store, rescore
+
+    feature_store.delete_rows(db.connection(), [client_id])
+    rescore.delete_rows(db.connection(), [client_id])
     db.delete(obj)
     db.commit()
+    client_cache.invalidate([client_id])
+    stats_cache.clear()
     return True
+
+def lock_for_write(conn: Connection) -> None:
+    """SQLite: BEGIN IMMEDIATE si aucune transaction n'est ouverte sur la connexion.
+
+    pysqlite/aiosqlite n'ouvrent la transaction (DEFERRED) qu'au premier INSERT:
+    les lectures qui precedent ne sont pas protegees. Attend busy_timeout au plus."""
+    if conn.dialect.name == "sqlite" and not conn.connection.driver_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def insert_clients(conn: Connection, records: list[dict]) -> list[int]:
+    """INSERT multi-lignes (+ vecteurs du feature store); renvoie les ids dans l'ordre de `records`."""
+    if not records:
+        return []
+    if conn.dialect.name == "sqlite":
+        # SQLite ne batche pas INSERT ... RETURNING ordonne (une requete par ligne):
+        # ids attribues ici puis executemany, sous le verrou d'ecriture pris avant
+        # de lire max(id) (sinon deux ecrivains lisent le meme max)
+        lock_for_write(conn)
+        start = conn.execute(select(func.coalesce(func.max(Client.id), 0))).scalar_one() + 1
+        ids = list(range(start, start + len(records)))
+        conn.execute(insert(Client), [{**r, "id": i} for r, i in zip(records, ids)])
+    else:
+        stmt = insert(Client).returning(Client.id, sort_by_parameter_order=True)
+        ids = list(conn.execute(stmt, records).scalars().all())
+    from .ml import feature_store
+
+    feature_store.write_records(conn, ids, records)
+    return ids
+
+def create_clients_bulk(db: Session, payloads: list[ClientCreate], retries: int | None = None) -> list[int]:
+    """Un lot par transaction, rejoue en cas de conflit d'ecriture (is_transient_error)."""
+    records = [p.model_dump() for p in payloads]
+    retries = WRITE_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            ids = insert_clients(db.connection(), records)
+            db.commit()
+            break
+        except (IntegrityError, OperationalError) as exc:
+            db.rollback()
+            if attempt == retries or not is_transient_error(exc):
+                raise
+            time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+    client_cache.invalidate(ids)
+    stats_cache.clear()
+    return ids
+
+def delete_clients_bulk(db: Session, client_ids: list[int]) -> list[int]:
+    """Supprime en une transaction; renvoie les ids effectivement supprimes."""
+    from .ml import feature_store, rescore
+
+    deleted: list[int] = []
+    ids = list(dict.fromkeys(client_ids))
+    for i in range(0, len(ids), IN_CHUNK):
+        chunk = ids[i:i + IN_CHUNK]
+        # pas de cascade ORM ici (et FK non appliquees par defaut sous SQLite)
+        db.execute(delete(ClientSensitive).where(ClientSensitive.client_id.in_(chunk)))
+        feature_store.delete_rows(db.connection(), chunk)
+        rescore.delete_rows(db.connection(), chunk)
+        deleted.extend(db.scalars(delete(Client).where(Client.id.in_(chunk)).returning(Client.id)).all())
+    db.commit()
+    client_cache.invalidate(deleted)
+    stats_cache.clear()
+    return deleted
@@ -0,0 +1,76 @@
+"""Equivalents async de crud.py (AsyncSession)."""
+from __future__ import annotations
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud
+from .cache import client_cache, stats_cache
+from .database import is_transient_error
+from .models import Client
+from .schemas import ClientCreate, ClientFilters
+
+async def list_clients(db: AsyncSession, skip: int = 0, limit: int = 50, after_id: int | None = None):
+    stmt = select(Client).order_by(Client.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(Client.id > after_id)
+    else:
+        stmt = stmt.offset(skip)
+    return list((await db.scalars(stmt)).all())
+
+async def search_clients(db: AsyncSession, filters: ClientFilters, limit: int = 50, after_id: int | None = None):
+    return list((await db.scalars(crud.search_stmt(filters, limit, after_id))).all())
+
+async def client_stats(db: AsyncSession, filters: ClientFilters, group_by: list[str], fields: list[str]) -> dict:
+    result = await db.execute(crud.stats_stmt(filters, group_by, fields))
+    return crud.stats_rows(result.mappings(), group_by, fields)
+
+async def iter_clients(db: AsyncSession, chunk_size: int = 5000):
+    stmt = select(*Client.__table__.columns).order_by(Client.id).execution_options(yield_per=chunk_size)
+    result = await db.stream(stmt)
+    async for part in result.mappings().partitions():
+        yield part
+
+async def get_client(db: AsyncSession, client_id: int):
+    return await db.get(Client, client_id)
+
+async def create_client(db: AsyncSession, payload: ClientCreate):
+    record = payload.model_dump()
+    obj = Client(**record)
+    db.add(obj)
+    await db.flush()
+    from .ml import feature_store
+
+    await db.run_sync(lambda s: feature_store.write_records(s.connection(), [obj.id], [record]))
+    await db.commit()
+    client_cache.invalidate([obj.id])
+    stats_cache.clear()
+    return obj
+
+async def delete_client(db: AsyncSession, client_id: int) -> bool:
+    obj = await db.get(Client, client_id)
+    if obj is None:
+        return False
+    from .ml import feature_store, rescore
+
+    await db.run_sync(lambda s: feature_store.delete_rows(s.connection(), [client_id]))
+    await db.run_sync(lambda s: rescore.delete_rows(s.connection(), [client_id]))
+    await db.delete(obj)
+    await db.commit()
+    client_cache.invalidate([client_id])
+    stats_cache.clear()
+    return True
+
+async def create_clients_bulk(db: AsyncSession, payloads: list[ClientCreate]) -> list[int]:
+    # meme SQL que la version sync, execute dans le contexte async; l'attente entre
+    # deux tentatives rend la main a la boucle d'evenements
+    for attempt in range(crud.WRITE_RETRIES + 1):
+        try:
+            return await db.run_sync(crud.create_clients_bulk, payloads, 0)
+        except (IntegrityError, OperationalError) as exc:
+            if attempt == crud.WRITE_RETRIES or not is_transient_error(exc):
+                raise
+            await asyncio.sleep(crud.WRITE_RETRY_DELAY * 2 ** attempt)
+
+async def delete_clients_bulk(db: AsyncSession, client_ids: list[int]) -> list[int]:
+    return await db.run_sync(crud.delete_clients_bulk, client_ids)
@@ -1,14 +1,175 @@
 from __future__ import annotations
-import os
-from sqlalchemy import create_engine
+import os, time
+from typing import TYPE_CHECKING
+from sqlalchemy import Connection, Engine, Table, create_engine, event, insert, inspect
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from . import metrics
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
 
 DB_URL = os.getenv("FASTIA_DB_URL", "sqlite:///./fastia.db")
-connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+# routes /clients en async (AsyncSession) plutot que sur le threadpool
+DB_ASYNC = os.getenv("FASTIA_DB_ASYNC", "0") == "1"
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+# "production": pragmas ci-dessous; "legacy": reglages SQLite par defaut
+DB_PROFILE = os.getenv("FASTIA_DB_PROFILE", "production")
+
+# chaque pragma est surchargeable; une valeur vide le desactive
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("FASTIA_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("FASTIA_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": os.getenv("FASTIA_SQLITE_CACHE_SIZE", "-65536"),  # KiB (negatif) -> 64 MiB
+    "mmap_size": os.getenv("FASTIA_SQLITE_MMAP_SIZE", str(256 * 2**20)),
+    "temp_store": os.getenv("FASTIA_SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": os.getenv("FASTIA_SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
+# tables des migrations optionnelles: presence retenue, absence reverifiee
+TABLE_RECHECK_SECONDS = float(os.getenv("FASTIA_TABLE_RECHECK_SECONDS", "30"))
+_tables_found: set[tuple[str, str]] = set()
+_tables_missing: dict[tuple[str, str], float] = {}
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"))
+
+def _pool_options(url: str) -> dict:
+    if _is_sqlite_memory(url):
+        # pool dedie de SQLAlchemy (une connexion par thread), pas de dimensionnement
+        return {}
+    if url.startswith("sqlite"):
+        # connexions peu couteuses; en WAL les lecteurs ne bloquent pas l'ecrivain.
+        # pool_size + max_overflow >= threadpool FastAPI (40): sinon les routes sync
+        # attendent une connexion que seule une autre tache du threadpool peut rendre
+        return {
+            "pool_size": int(os.getenv("FASTIA_DB_POOL_SIZE", "8")),
+            "max_overflow": int(os.getenv("FASTIA_DB_MAX_OVERFLOW", "32")),
+            "pool_timeout": float(os.getenv("FASTIA_DB_POOL_TIMEOUT", "30")),
+        }
+    return {
+        "pool_size": int(os.getenv("FASTIA_DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("FASTIA_DB_MAX_OVERFLOW", "30")),
+        "pool_timeout": float(os.getenv("FASTIA_DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("FASTIA_DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+def _apply_sqlite_pragmas(dbapi_conn, _record) -> None:
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            if value != "":
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def is_transient_error(exc: Exception) -> bool:
+    """Conflit d'ecriture qu'une nouvelle transaction peut resoudre: base verrouillee
+    au-dela de busy_timeout, ou cle primaire prise par un ecrivain concurrent."""
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    msg = str(getattr(exc, "orig", exc)).lower()
+    if isinstance(exc, OperationalError):
+        return "locked" in msg or "busy" in msg or "deadlock" in msg or "could not serialize" in msg
+    return isinstance(exc, IntegrityError) and ("clients.id" in msg or "clients_pkey" in msg)
+
+def create_db_engine(url: str = DB_URL, profile: str = DB_PROFILE) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    options = _pool_options(url)
+    if options and metrics.ENABLED:
+        options["poolclass"] = metrics.TimedQueuePool
+    eng = create_engine(url, echo=False, future=True, connect_args=connect_args, **options)
+    if url.startswith("sqlite") and profile == "production":
+        event.listen(eng, "connect", _apply_sqlite_pragmas)
+    if metrics.ENABLED:
+        metrics.instrument_engine(eng)
+    return eng
 
-engine = create_engine(DB_URL, echo=False, future=True, connect_args=connect_args)
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if driver is None:
+        raise ValueError(f"Pas de driver async connu pour {scheme}")
+    return f"{driver}://{rest}"
+
+def create_async_db_engine(url: str | None = None, profile: str = DB_PROFILE) -> AsyncEngine:
+    # extension asyncio (greenlet + driver async) importee seulement si utilisee
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or os.getenv("FASTIA_DB_ASYNC_URL") or to_async_url(DB_URL)
+    options = _pool_options(url)
+    if options and metrics.ENABLED:
+        options["poolclass"] = metrics.TimedAsyncQueuePool
+    eng = create_async_engine(url, echo=False, **options)
+    if url.startswith("sqlite") and profile == "production":
+        event.listen(eng.sync_engine, "connect", _apply_sqlite_pragmas)
+    if metrics.ENABLED:
+        metrics.instrument_engine(eng.sync_engine)
+    return eng
+
+def table_exists(conn: Connection, name: str) -> bool:
+    """has_table memoise par base: une table trouvee le reste; une absence est
+    reverifiee apres TABLE_RECHECK_SECONDS (migration appliquee a chaud)."""
+    key = (str(conn.engine.url), name)
+    if key in _tables_found:
+        return True
+    checked = _tables_missing.get(key)
+    if checked is not None and time.monotonic() - checked < TABLE_RECHECK_SECONDS:
+        return False
+    if inspect(conn).has_table(name):
+        _tables_found.add(key)
+        _tables_missing.pop(key, None)
+        return True
+    _tables_missing[key] = time.monotonic()
+    return False
+
+def upsert(conn: Connection, table: Table, rows: list[dict], keys: list[str], update: bool = True) -> None:
+    """INSERT ... ON CONFLICT (keys) DO UPDATE (ou DO NOTHING si update=False).
+
+    SQLite/PostgreSQL: ON CONFLICT; MySQL: ON DUPLICATE KEY; sinon DELETE + INSERT."""
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    columns = [c for c in rows[0] if c not in keys]
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        if update and columns:
+            stmt = stmt.on_conflict_do_update(index_elements=keys, set_={c: stmt.excluded[c] for c in columns})
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        stmt = dialect_insert(table)
+        targets = columns if update and columns else keys[:1]
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in targets})
+    else:
+        if update:
+            for row in rows:
+                conn.execute(table.delete().where(*(table.c[k] == row[k] for k in keys)))
+        stmt = insert(table)
+    conn.execute(stmt, rows)
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# cree seulement si active: greenlet et le driver async (aiosqlite, asyncpg...) sont optionnels
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine()
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
@@ -18,3 +179,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
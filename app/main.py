@@ -1,7 +1,37 @@
-from fastapi import FastAPI
-from .routers.clients import router as clients_router
-from .routers.train import router as train_router
+import os
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+from .database import DB_ASYNC, is_transient_error
+from .metrics import ENABLED as METRICS_ENABLED, MetricsMiddleware
+from .routers.metrics import router as metrics_router
+
+# 0: API /clients seule, sans routes ML (service de scoring deploye a part)
+ENABLE_ML = os.getenv("FASTIA_ENABLE_ML", "1") == "1"
+
+if DB_ASYNC:
+    from .routers.clients_async import router as clients_router
+else:
+    from .routers.clients import router as clients_router
 
 app = FastAPI(title="FastIA API", version="2.0.0")
+if METRICS_ENABLED:
+    # latence par route; SQL et pool mesures par app.database
+    app.add_middleware(MetricsMiddleware)
 app.include_router(clients_router)
-app.include_router(train_router)
+
+@app.exception_handler(OperationalError)
+async def database_busy(request: Request, exc: OperationalError):
+    # base verrouillee malgre busy_timeout et les nouvelles tentatives: 503, pas 500
+    if not is_transient_error(exc):
+        raise exc
+    return JSONResponse({"detail": "Base de donnees occupee, reessayer"}, status_code=503, headers={"Retry-After": "1"})
+
+app.include_router(metrics_router)
+if ENABLE_ML:
+    # routes legeres: torch/pandas/sklearn importes au premier entrainement ou scoring
+    from .routers.train import router as train_router
+    from .routers.predict import router as predict_router
+
+    app.include_router(train_router)
+    app.include_router(predict_router)
@@ -0,0 +1,285 @@
+"""Metriques en memoire du processus, exposees par GET /metrics.
+
+- latence des requetes HTTP par route (gabarit de chemin, middleware ASGI);
+- requetes SQL: nombre et duree par instruction (evenements du moteur SQLAlchemy);
+- pool de connexions: duree d'obtention d'une connexion (attente + ouverture);
+- entrainement: durees par phase, ecrites dans metrics.json du run (PhaseTimer).
+
+Histogrammes a seaux fixes: quantiles approches (borne haute du seau), cout
+constant par mesure. Chaque worker uvicorn a ses propres compteurs.
+
+Profilage opt-in (FASTIA_PROFILING=1): une requete portant l'en-tete X-Profile est
+echantillonnee a la facon de py-spy (pile de chaque thread actif toutes les
+FASTIA_PROFILE_INTERVAL_MS); le resultat, au format "folded" (flamegraph.pl,
+speedscope), est servi par GET /metrics/profiles/{id} (id dans l'en-tete X-Profile-Id).
+
+Module sans dependance lourde: importe par app.database au demarrage.
+"""
+from __future__ import annotations
+import bisect, os, sys, threading, time, uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+ENABLED = os.getenv("FASTIA_METRICS", "1") == "1"
+PROFILING = os.getenv("FASTIA_PROFILING", "0") == "1"
+PROFILE_INTERVAL_S = float(os.getenv("FASTIA_PROFILE_INTERVAL_MS", "2")) / 1000
+PROFILE_KEEP = int(os.getenv("FASTIA_PROFILE_KEEP", "20"))
+
+# bornes hautes des seaux, en millisecondes
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK",
+             "CREATE", "DROP", "ALTER"}
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        i = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += ms
+            if ms > self.max:
+                self.max = ms
+
+    def quantile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean_ms": self.total / self.count if self.count else 0.0,
+                "p50_ms": self.quantile(0.5),
+                "p95_ms": self.quantile(0.95),
+                "p99_ms": self.quantile(0.99),
+                "max_ms": self.max,
+            }
+
+class Registry:
+    """Histogrammes et compteurs par (groupe, nom): "http", "sql", "pool"."""
+
+    def __init__(self):
+        self._hists: dict[tuple[str, str], Histogram] = {}
+        self._counters: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def histogram(self, group: str, name: str) -> Histogram:
+        hist = self._hists.get((group, name))
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault((group, name), Histogram())
+        return hist
+
+    def observe(self, group: str, name: str, ms: float) -> None:
+        self.histogram(group, name).observe(ms)
+
+    def incr(self, group: str, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[(group, name)] += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hists, counters = list(self._hists.items()), dict(self._counters)
+        out: dict[str, dict] = {"http": {}, "sql": {}, "pool": {}}
+        for (group, name), hist in sorted(hists):
+            out.setdefault(group, {})[name] = hist.snapshot()
+        for (group, name), n in counters.items():
+            out.setdefault(group, {}).setdefault(name, {})["errors"] = n
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+registry = Registry()
+
+# --- SQL et pool -------------------------------------------------------------
+
+def _verb(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    verb = head[0].upper() if head else ""
+    return verb if verb in SQL_VERBS else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["_fastia_sql_t0"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    t0 = conn.info.pop("_fastia_sql_t0", None)
+    if t0 is not None:
+        registry.observe("sql", _verb(statement), (time.perf_counter() - t0) * 1e3)
+
+def _handle_error(ctx) -> None:
+    if ctx.connection is not None:
+        ctx.connection.info.pop("_fastia_sql_t0", None)
+    if ctx.statement:
+        registry.incr("sql", _verb(ctx.statement))
+
+def instrument_engine(engine: Engine) -> None:
+    """Mesure chaque requete SQL (moteur synchrone; `AsyncEngine.sync_engine` en async)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class _TimedGet:
+    # _do_get: attente d'une connexion libre, ou ouverture d'une nouvelle (overflow)
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe("pool", "checkout", (time.perf_counter() - t0) * 1e3)
+
+class TimedQueuePool(_TimedGet, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedGet, AsyncAdaptedQueuePool):
+    pass
+
+# --- entrainement ------------------------------------------------------------
+
+class PhaseTimer:
+    """Durees cumulees par phase: `with timer.phase("fetch"): ...`."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def as_dict(self) -> dict[str, float]:
+        return {**{k: round(v, 4) for k, v in self.phases.items()}, "total": round(time.perf_counter() - self._t0, 4)}
+
+# --- profilage par requete ---------------------------------------------------
+
+# feuilles de pile d'un thread inactif (boucle asyncio en attente, threadpool vide)
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+class Sampler:
+    """Echantillonneur de piles dans un thread dedie: couvre la boucle asyncio et
+    les threads du threadpool (routes sync), contrairement a cProfile (un thread).
+    Les requetes profilees en meme temps se retrouvent dans les piles des autres."""
+
+    def __init__(self, interval_s: float = PROFILE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fastia-sampler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> Sampler:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+_profiles: OrderedDict[str, dict] = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def _store_profile(profile: dict) -> None:
+    with _profiles_lock:
+        _profiles[profile["id"]] = profile
+        while len(_profiles) > PROFILE_KEEP:
+            _profiles.popitem(last=False)
+
+def list_profiles() -> list[dict]:
+    with _profiles_lock:
+        return [{k: v for k, v in p.items() if k != "folded"} for p in reversed(_profiles.values())]
+
+def get_profile(profile_id: str) -> dict | None:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+# --- middleware HTTP ---------------------------------------------------------
+
+def _route_label(scope) -> str:
+    # gabarit ("/clients/{client_id}") et non chemin brut: nombre de series borne
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', '<non route>')}"
+
+class MetricsMiddleware:
+    """Middleware ASGI brut (pas BaseHTTPMiddleware): aucune tache ni copie du corps."""
+
+    def __init__(self, app, profiling: bool = PROFILING):
+        self.app = app
+        self.profiling = profiling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        sampler = profile_id = None
+        if self.profiling and any(k == b"x-profile" for k, _ in scope["headers"]):
+            profile_id = uuid.uuid4().hex[:12]
+            sampler = Sampler().start()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile_id is not None:
+                    message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ms = (time.perf_counter() - t0) * 1e3
+            label = _route_label(scope)
+            registry.observe("http", label, ms)
+            if status_code >= 500:
+                registry.incr("http", label)
+            if sampler is not None:
+                sampler.stop()
+                _store_profile({"id": profile_id, "route": label, "status": status_code, "duration_ms": ms,
+                                "samples": sampler.samples, "interval_ms": sampler.interval_s * 1e3,
+                                "folded": sampler.folded()})
@@ -0,0 +1,315 @@
+"""Operations Alembic sures sur de grosses tables.
+
+`batch_alter_table` recree et recopie toute la table SQLite dans une seule
+transaction: la base est verrouillee en ecriture pendant toute la copie. Ici:
+
+- CREATE INDEX idempotent, CONCURRENTLY sous PostgreSQL;
+- ADD COLUMN natif (toujours possible sous SQLite pour une colonne nullable ou a
+  defaut constant, ni cle primaire ni unique): simple modification du schema;
+- DROP COLUMN natif quand SQLite >= 3.35 l'accepte (colonne hors cle primaire,
+  index, contrainte unique ou cle etrangere) et que la table tient dans une
+  tranche: SQLite reecrit toutes les lignes dans la meme transaction;
+- sinon reconstruction par tranches (`rebuild_table`): nouvelle table avec le
+  schema cible, copie par intervalles d'ids en transactions courtes (au plus
+  `chunk_size` lignes, separees par une pause), triggers qui repercutent les
+  ecritures concurrentes, puis bascule par deux RENAME dans une transaction
+  courte; l'ancienne table est videe par tranches avant son DROP. La table en
+  service garde ses index pendant la copie. L'avancement est journalise (logger alembic) et
+  enregistre dans une table de suivi: une migration interrompue reprend a la
+  derniere tranche commitee.
+
+Les autres bases (PostgreSQL, MySQL) gardent les operations natives d'Alembic.
+A appeler depuis une revision; env.py execute chaque revision dans sa propre
+transaction (transaction_per_migration) pour permettre les blocs autocommit.
+"""
+from __future__ import annotations
+import logging, os, sqlite3, time
+from typing import Callable
+
+import sqlalchemy as sa
+from alembic import op
+
+CHUNK_SIZE = int(os.getenv("FASTIA_MIGRATION_CHUNK", "50000"))
+# force la reconstruction par tranches meme si l'operation native est possible
+FORCE_COPY = os.getenv("FASTIA_MIGRATION_FORCE_COPY", "0") == "1"
+# pause entre deux tranches: le gestionnaire d'attente SQLite des autres connexions
+# reessaie toutes les 100 ms au plus, sans pause elles ne prendraient jamais le verrou
+PAUSE_S = int(os.getenv("FASTIA_MIGRATION_PAUSE_MS", "100")) / 1000
+PROGRESS_TABLE = "_fastia_migration_progress"
+# index de la nouvelle table construits sous un nom temporaire pendant la copie:
+# la table en service garde les siens (voir rebuild_table)
+KEEP_INDEXES = os.getenv("FASTIA_MIGRATION_KEEP_INDEXES", "1") == "1"
+TEMP_INDEX_PREFIX = "_fastia_tmp_"
+BUSY_TIMEOUT_MS = 30_000
+
+logger = logging.getLogger("alembic.migration_utils")
+
+ProgressCallback = Callable[[int, int], None]
+
+def _is_sqlite() -> bool:
+    return op.get_bind().dialect.name == "sqlite"
+
+def _columns(table_name: str) -> dict[str, dict]:
+    return {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+def _column_is_constrained(table_name: str, column_name: str) -> bool:
+    insp = sa.inspect(op.get_bind())
+    pk = insp.get_pk_constraint(table_name).get("constrained_columns") or []
+    groups = [pk]
+    groups += [ix["column_names"] for ix in insp.get_indexes(table_name)]
+    groups += [uq["column_names"] for uq in insp.get_unique_constraints(table_name)]
+    groups += [fk["constrained_columns"] for fk in insp.get_foreign_keys(table_name)]
+    return any(column_name in g for g in groups)
+
+def supports_native_drop(table_name: str, column_name: str) -> bool:
+    if not _is_sqlite():
+        return True
+    return sqlite3.sqlite_version_info >= (3, 35, 0) and not _column_is_constrained(table_name, column_name)
+
+def add_column(table_name: str, column: sa.Column) -> None:
+    """ADD COLUMN natif; sans effet si la colonne existe deja (reprise)."""
+    if column.name in _columns(table_name):
+        return
+    if _is_sqlite() and (column.primary_key or column.unique or (not column.nullable and column.server_default is None)):
+        raise ValueError(f"{table_name}.{column.name}: ADD COLUMN SQLite impossible (cle, unique ou NOT NULL sans defaut)")
+    op.add_column(table_name, column)
+
+def create_index(name: str, table_name: str, columns: list[str]) -> None:
+    """CREATE INDEX sans effet s'il existe deja (reprise). PostgreSQL: CONCURRENTLY,
+    hors transaction, les ecritures continuent pendant la construction. SQLite n'a
+    pas d'equivalent: une seule instruction, ecrivains bloques le temps du tri."""
+    if name in {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes(table_name)}:
+        return
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(name, table_name, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index(name, table_name, columns)
+
+def drop_columns(table_name: str, names: list[str], chunk_size: int = CHUNK_SIZE, keep_indexes: bool = KEEP_INDEXES) -> None:
+    """DROP COLUMN natif si possible, sinon une seule reconstruction pour toutes les colonnes."""
+    existing = _columns(table_name)
+    names = [n for n in names if n in existing]
+    if not names:
+        finish_pending(table_name, chunk_size)
+        return
+    small = not _is_sqlite() or _exec(op.get_bind(), f'SELECT COUNT(*) FROM "{table_name}"').scalar() <= chunk_size
+    if not FORCE_COPY and small and all(supports_native_drop(table_name, n) for n in names):
+        for name in names:
+            op.drop_column(table_name, name)
+        return
+    if not _is_sqlite():
+        with op.batch_alter_table(table_name) as batch:
+            for name in names:
+                batch.drop_column(name)
+        return
+    old = sa.Table(table_name, sa.MetaData(), autoload_with=op.get_bind())
+    rebuild_table(table_name, [c for c in old.columns if c.name not in names], chunk_size=chunk_size,
+                  keep_indexes=keep_indexes)
+
+def _target_table(table_name: str, columns: list[sa.Column], index_prefix: str = "") -> sa.Table:
+    """Table `_new_<nom>` avec les colonnes donnees et les index de l'ancienne
+    table qui n'utilisent que ces colonnes (memes noms, precedes de `index_prefix`)."""
+    bind = op.get_bind()
+    old = sa.Table(table_name, sa.MetaData(), autoload_with=bind)
+    new = sa.Table(f"_new_{table_name}", sa.MetaData(), *[c._copy() for c in columns])
+    kept = {c.name for c in columns}
+    for ix in sa.inspect(bind).get_indexes(table_name):
+        if set(ix["column_names"]) <= kept:
+            sa.Index(index_prefix + ix["name"], *[new.c[n] for n in ix["column_names"]], unique=bool(ix["unique"]))
+    for uq in old.constraints:
+        if isinstance(uq, sa.UniqueConstraint) and uq.name and {c.name for c in uq.columns} <= kept:
+            new.append_constraint(sa.UniqueConstraint(*[c.name for c in uq.columns], name=uq.name))
+    return new
+
+def _exec(conn, sql: str, params: tuple = ()):
+    return conn.exec_driver_sql(sql, params)
+
+def _trigger_sql(table_name: str, new_name: str, cols: list[str]) -> list[str]:
+    col_list = ", ".join(f'"{c}"' for c in cols)
+    new_values = ", ".join(f'NEW."{c}"' for c in cols)
+    mirror = f'INSERT OR REPLACE INTO "{new_name}" ({col_list}) VALUES ({new_values});'
+    prefix = f"_fastia_sync_{table_name}"
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS "{prefix}_ins" AFTER INSERT ON "{table_name}" BEGIN {mirror} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{prefix}_upd" AFTER UPDATE ON "{table_name}" BEGIN '
+        f'DELETE FROM "{new_name}" WHERE id = OLD.id; {mirror} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{prefix}_del" AFTER DELETE ON "{table_name}" BEGIN '
+        f'DELETE FROM "{new_name}" WHERE id = OLD.id; END',
+    ]
+
+def _drop_triggers(conn, table_name: str) -> None:
+    for suffix in ("ins", "upd", "del"):
+        _exec(conn, f'DROP TRIGGER IF EXISTS "_fastia_sync_{table_name}_{suffix}"')
+
+def _drop_in_chunks(conn, table_name: str, chunk_size: int, stats: dict) -> None:
+    """Vide la table par tranches d'ids puis la supprime: un DROP direct liberait
+    toutes ses pages dans une seule transaction."""
+    while True:
+        with _Transaction(conn, stats):
+            n = _exec(conn, f'DELETE FROM "{table_name}" WHERE id IN (SELECT id FROM "{table_name}" ORDER BY id LIMIT ?)',
+                      (chunk_size,)).rowcount
+            if not n:
+                _exec(conn, f'DROP TABLE "{table_name}"')
+        if not n:
+            return
+        time.sleep(PAUSE_S)
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT sur une connexion en autocommit; mesure la duree."""
+
+    def __init__(self, conn, stats: dict):
+        self.conn, self.stats = conn, stats
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        _exec(self.conn, "BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        _exec(self.conn, "ROLLBACK" if exc_type else "COMMIT")
+        elapsed = time.perf_counter() - self.t0
+        self.stats["max_transaction_s"] = max(self.stats["max_transaction_s"], elapsed)
+        return False
+
+def _final_indexes(conn, table_name: str, stats: dict) -> None:
+    """Index temporaires (TEMP_INDEX_PREFIX) recrees sous leur nom definitif, libere
+    par la suppression de l'ancienne table; SQLite ne sait pas renommer un index.
+    Une transaction par index: les ecrivains attendent le tri, pas les lecteurs (WAL),
+    et la table reste indexee tout du long."""
+    for ix in sa.inspect(conn).get_indexes(table_name):
+        if not ix["name"].startswith(TEMP_INDEX_PREFIX):
+            continue
+        name = ix["name"][len(TEMP_INDEX_PREFIX):]
+        cols = ", ".join(f'"{c}"' for c in ix["column_names"])
+        t0 = time.perf_counter()
+        with _Transaction(conn, stats):
+            _exec(conn, f'CREATE {"UNIQUE " if ix["unique"] else ""}INDEX IF NOT EXISTS "{name}" ON "{table_name}" ({cols})')
+            _exec(conn, f'DROP INDEX "{ix["name"]}"')
+        logger.info("%s: index %s recree (%.2f s)", table_name, name, time.perf_counter() - t0)
+
+def _finish_swap(conn, table_name: str, chunk_size: int, stats: dict) -> None:
+    """Supprime `_old_<nom>` (ancienne table renommee a la bascule), donne leur nom
+    definitif aux index de la nouvelle et supprime la table de suivi si vide."""
+    old_name = f"_old_{table_name}"
+    if old_name in sa.inspect(conn).get_table_names():
+        with _Transaction(conn, stats):
+            # plus lue par personne: ses index ralentiraient la vidange par tranches
+            for ix in sa.inspect(conn).get_indexes(old_name):
+                _exec(conn, f'DROP INDEX IF EXISTS "{ix["name"]}"')
+        _drop_in_chunks(conn, old_name, chunk_size, stats)
+    _final_indexes(conn, table_name, stats)
+    if PROGRESS_TABLE in sa.inspect(conn).get_table_names() and not _exec(conn, f'SELECT COUNT(*) FROM "{PROGRESS_TABLE}"').scalar():
+        _exec(conn, f'DROP TABLE "{PROGRESS_TABLE}"')
+
+def finish_pending(table_name: str, chunk_size: int = CHUNK_SIZE) -> None:
+    """Termine une reconstruction interrompue apres la bascule (rien sinon)."""
+    if not _is_sqlite():
+        return
+    insp = sa.inspect(op.get_bind())
+    if f"_old_{table_name}" in insp.get_table_names() or any(
+        ix["name"].startswith(TEMP_INDEX_PREFIX) for ix in insp.get_indexes(table_name)
+    ):
+        logger.info("%s: suppression de l'ancienne table restante", table_name)
+        with op.get_context().autocommit_block():
+            _finish_swap(op.get_bind(), table_name, chunk_size, {"max_transaction_s": 0.0})
+
+def rebuild_table(
+    table_name: str,
+    columns: list[sa.Column],
+    chunk_size: int = CHUNK_SIZE,
+    on_progress: ProgressCallback | None = None,
+    keep_indexes: bool = KEEP_INDEXES,
+) -> dict:
+    """Reconstruit `table_name` (SQLite, cle `id` entiere) avec `columns`.
+
+    Les colonnes communes sont copiees par nom; les nouvelles prennent leur defaut.
+    Les index secondaires sont tenus a jour sur la nouvelle table tranche par
+    tranche. Les noms d'index etant globaux sous SQLite:
+    - keep_indexes=True (defaut): la table en service garde ses index pendant la
+      copie (requetes inchangees); ceux de la nouvelle portent un nom temporaire et
+      sont recrees sous leur nom apres la bascule, un tri par index pendant lequel
+      les ecrivains attendent;
+    - keep_indexes=False: les index de la table en service sont supprimes au
+      demarrage et recrees directement sous leur nom: aucun tri a la fin, mais les
+      lectures qui en dependent parcourent la table pendant toute la copie.
+    Renvoie des statistiques de verrouillage.
+    """
+    new = _target_table(table_name, columns, TEMP_INDEX_PREFIX if keep_indexes else "")
+    new_name, old_name = new.name, f"_old_{table_name}"
+    cols = [c.name for c in columns if c.name in _columns(table_name)]
+    col_list = ", ".join(f'"{c}"' for c in cols)
+    stats = {"rows": 0, "chunks": 0, "max_transaction_s": 0.0, "swap_s": 0.0, "resumed_from": None}
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        _exec(conn, f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        _exec(conn, f'CREATE TABLE IF NOT EXISTS "{PROGRESS_TABLE}" (name VARCHAR(80) PRIMARY KEY, last_id INTEGER NOT NULL)')
+        last_id = _exec(conn, f'SELECT last_id FROM "{PROGRESS_TABLE}" WHERE name = ?', (table_name,)).scalar()
+
+        if last_id is None:
+            with _Transaction(conn, stats):
+                if not keep_indexes:
+                    # noms d'index globaux sous SQLite: liberes avant d'etre recrees sur la nouvelle table
+                    for ix in sa.inspect(conn).get_indexes(table_name):
+                        _exec(conn, f'DROP INDEX IF EXISTS "{ix["name"]}"')
+                _exec(conn, f'DROP TABLE IF EXISTS "{new_name}"')
+                new.create(conn)
+                for sql in _trigger_sql(table_name, new_name, cols):
+                    _exec(conn, sql)
+                _exec(conn, f'INSERT INTO "{PROGRESS_TABLE}" (name, last_id) VALUES (?, 0)', (table_name,))
+            last_id = 0
+        else:
+            stats["resumed_from"] = last_id
+            logger.info("%s: reprise apres id %d", table_name, last_id)
+
+        total = _exec(conn, f'SELECT COUNT(*) FROM "{table_name}" WHERE id > ?', (last_id,)).scalar()
+        t0 = time.perf_counter()
+        while True:
+            with _Transaction(conn, stats):
+                hi = _exec(
+                    conn, f'SELECT MAX(id) FROM (SELECT id FROM "{table_name}" WHERE id > ? ORDER BY id LIMIT ?)',
+                    (last_id, chunk_size),
+                ).scalar()
+                if hi is not None:
+                    # les triggers ont pu deja ecrire certaines lignes: la copie les remplace par la valeur courante
+                    n = _exec(
+                        conn, f'INSERT OR REPLACE INTO "{new_name}" ({col_list}) '
+                        f'SELECT {col_list} FROM "{table_name}" WHERE id > ? AND id <= ?', (last_id, hi),
+                    ).rowcount
+                    _exec(conn, f'UPDATE "{PROGRESS_TABLE}" SET last_id = ? WHERE name = ?', (hi, table_name))
+            if hi is None:
+                break
+            time.sleep(PAUSE_S)
+            last_id = hi
+            stats["rows"] += n
+            stats["chunks"] += 1
+            if on_progress is not None:
+                on_progress(stats["rows"], total)
+            elapsed = time.perf_counter() - t0
+            logger.info("%s: %d/%d lignes copiees (%.0f lignes/s)", table_name, stats["rows"], total,
+                        stats["rows"] / elapsed if elapsed else 0)
+
+        # bascule par renommage (metadonnees seulement). legacy_alter_table: les cles
+        # etrangeres des autres tables gardent le nom `table_name` au lieu de suivre
+        # l'ancienne table; les deux PRAGMA sont ignores dans une transaction.
+        foreign_keys = _exec(conn, "PRAGMA foreign_keys").scalar()
+        _exec(conn, "PRAGMA foreign_keys=OFF")
+        _exec(conn, "PRAGMA legacy_alter_table=ON")
+        try:
+            swap = {"max_transaction_s": 0.0}
+            with _Transaction(conn, swap):
+                _drop_triggers(conn, table_name)
+                _exec(conn, f'ALTER TABLE "{table_name}" RENAME TO "{old_name}"')
+                _exec(conn, f'ALTER TABLE "{new_name}" RENAME TO "{table_name}"')
+                _exec(conn, f'DELETE FROM "{PROGRESS_TABLE}" WHERE name = ?', (table_name,))
+        finally:
+            _exec(conn, "PRAGMA legacy_alter_table=OFF")
+            _exec(conn, f"PRAGMA foreign_keys={int(foreign_keys or 0)}")
+        stats["swap_s"] = swap["max_transaction_s"]
+        stats["max_transaction_s"] = max(stats["max_transaction_s"], stats["swap_s"])
+        _finish_swap(conn, table_name, chunk_size, stats)
+
+    logger.info("%s: reconstruite (%d lignes, %d tranches, transaction max %.3f s, bascule %.3f s)",
+                table_name, stats["rows"], stats["chunks"], stats["max_transaction_s"], stats["swap_s"])
+    return stats
@@ -0,0 +1,35 @@
+from __future__ import annotations
+import os, time, uuid
+from pathlib import Path
+
+ARTIFACTS_DIR = Path(os.getenv("FASTIA_ARTIFACTS_DIR", "artifacts"))
+RUNS_DIR = ARTIFACTS_DIR / "runs"
+LATEST_FILE = ARTIFACTS_DIR / "LATEST"
+
+class ModelNotReady(RuntimeError):
+    """Aucun run promu: defini ici (module leger) pour etre capture sans importer torch."""
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def run_dir(run_id: str) -> Path:
+    return RUNS_DIR / run_id
+
+def latest_run_id() -> str | None:
+    try:
+        run_id = LATEST_FILE.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return run_id or None
+
+def latest_dir() -> Path:
+    """Dossier du dernier run promu; a defaut, l'ancienne disposition a plat."""
+    run_id = latest_run_id()
+    return run_dir(run_id) if run_id else ARTIFACTS_DIR
+
+def promote(run_id: str) -> None:
+    """Bascule atomique de LATEST vers `run_id`."""
+    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = LATEST_FILE.with_suffix(".tmp")
+    tmp.write_text(run_id, encoding="utf-8")
+    os.replace(tmp, LATEST_FILE)
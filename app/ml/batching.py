@@ -0,0 +1,91 @@
+"""Micro-batching des requetes de scoring.
+
+Les requetes concurrentes sont mises en file; un worker asyncio les regroupe
+jusqu'a FASTIA_BATCH_MAX_ROWS lignes ou FASTIA_BATCH_MAX_WAIT_MS apres la premiere,
+puis lance un seul transform() + une seule passe avant (inference_mode) dans un
+thread dedie, et rend a chaque appelant sa tranche de scores. Pendant le calcul
+d'un lot, le suivant se remplit.
+"""
+from __future__ import annotations
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import numpy as np
+
+# 0 = pas de regroupement (chaque requete est scoree seule)
+BATCH_MAX_ROWS = int(os.getenv("FASTIA_BATCH_MAX_ROWS", "256"))
+BATCH_MAX_WAIT_MS = float(os.getenv("FASTIA_BATCH_MAX_WAIT_MS", "2"))
+
+ScoreFn = Callable[[list[dict]], tuple[np.ndarray, str]]
+
+class MicroBatcher:
+    def __init__(self, score: ScoreFn, max_rows: int = BATCH_MAX_ROWS, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.score = score
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        # un seul lot calcule a la fois: torch parallelise deja la passe avant
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fastia-batch")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # file et tache liees a la boucle courante (une nouvelle boucle par TestClient)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, records: list[dict]) -> tuple[np.ndarray, str]:
+        if self.max_rows <= 0:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self.score, records)
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((records, future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> list[tuple[list[dict], asyncio.Future]]:
+        batch = [await queue.get()]
+        n = len(batch[0][0])
+        deadline = self._loop.time() + self.max_wait
+        while n < self.max_rows:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            n += len(item[0])
+        return batch
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = await self._collect(queue)
+            batch = [(records, fut) for records, fut in batch if not fut.cancelled()]
+            if not batch:
+                continue
+            records = [r for rs, _ in batch for r in rs]
+            try:
+                scores, version = await self._loop.run_in_executor(self._executor, self.score, records)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(records)
+            start = 0
+            for rs, fut in batch:
+                if not fut.done():
+                    fut.set_result((scores[start:start + len(rs)], version))
+                start += len(rs)
@@ -0,0 +1,104 @@
+"""Artefacts d'inference autonomes, ecrits a cote de model.pt.
+
+- model.npz: poids float32 des couches + spec de pretraitement, scorable avec
+  NumPy seul (app/ml/portable.py), sans torch, pandas ni la classe MLP;
+- model.ts: TorchScript (torch.jit.load suffit);
+- model_int8.ts: TorchScript quantifie dynamiquement (poids int8 des Linear);
+- model.onnx: si le paquet onnx est installe (scoring via onnxruntime).
+
+La spec (artefacts de pretraitement + regles de nettoyage) est embarquee dans
+chaque fichier: entree "preprocessing.json" des TorchScript, metadata ONNX.
+"""
+from __future__ import annotations
+import copy, json, os, warnings
+from pathlib import Path
+import numpy as np
+import torch
+
+from .preprocessing import ANOMALY_COLS, MISSING_TOKENS, PreprocessArtifacts
+
+FILES = {"npz": "model.npz", "torchscript": "model.ts", "int8": "model_int8.ts", "onnx": "model.onnx"}
+# "" desactive l'export
+EXPORT_FORMATS = [f for f in os.getenv("FASTIA_EXPORT_FORMATS", "npz,torchscript,int8,onnx").split(",") if f]
+SPEC_KEY = "preprocessing.json"
+# a incrementer si la spec ou la disposition de model.npz change
+SPEC_FORMAT = 1
+
+def preprocessing_spec(prep: PreprocessArtifacts) -> dict:
+    return {
+        "format": SPEC_FORMAT,
+        "feature_names": prep.feature_names,
+        "num_means": prep.num_means,
+        "num_stds": prep.num_stds,
+        "num_medians": prep.num_medians,
+        "cat_levels": prep.cat_levels,
+        "anomaly_cols": ANOMALY_COLS,
+        "missing_tokens": sorted(MISSING_TOKENS),
+    }
+
+def _layers(model: torch.nn.Module) -> list[torch.nn.Linear]:
+    """Couches Linear d'un MLP Linear/ReLU alterne (seule forme exportee en .npz)."""
+    modules = list(model.net)
+    linears = modules[::2]
+    if not all(isinstance(m, torch.nn.Linear) for m in linears) or not all(isinstance(m, torch.nn.ReLU) for m in modules[1::2]):
+        raise ValueError("Architecture non exportable en .npz (Linear/ReLU attendus)")
+    return linears
+
+def _replace(tmp: Path, path: Path) -> str:
+    os.replace(tmp, path)
+    return str(path)
+
+def _save_npz(model: torch.nn.Module, spec: str, path: Path) -> str:
+    arrays = {}
+    for i, layer in enumerate(_layers(model)):
+        arrays[f"W{i}"] = layer.weight.detach().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().numpy().astype(np.float32)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, spec=np.frombuffer(spec.encode("utf-8"), dtype=np.uint8), **arrays)
+    return _replace(tmp, path)
+
+def _save_script(model: torch.nn.Module, spec: str, path: Path) -> str:
+    tmp = path.with_name(path.name + ".tmp")
+    torch.jit.script(model).save(str(tmp), _extra_files={SPEC_KEY: spec})
+    return _replace(tmp, path)
+
+def _save_int8(model: torch.nn.Module, spec: str, path: Path) -> str:
+    with warnings.catch_warnings():
+        # torch.ao.quantization est annonce deprecie, toujours fonctionnel ici
+        warnings.simplefilter("ignore")
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return _save_script(quantized, spec, path)
+
+def _save_onnx(model: torch.nn.Module, spec: str, path: Path) -> str:
+    import onnx  # optionnel
+
+    tmp = path.with_name(path.name + ".tmp")
+    n_features = _layers(model)[0].in_features
+    torch.onnx.export(
+        model, torch.zeros(1, n_features), str(tmp), input_names=["X"], output_names=["score"],
+        dynamic_axes={"X": {0: "n"}, "score": {0: "n"}}, dynamo=False,
+    )
+    proto = onnx.load(str(tmp))
+    proto.metadata_props.add(key=SPEC_KEY, value=spec)
+    onnx.save(proto, str(tmp))
+    return _replace(tmp, path)
+
+_WRITERS = {"npz": _save_npz, "torchscript": _save_script, "int8": _save_int8, "onnx": _save_onnx}
+
+def export_model(model: torch.nn.Module, prep: PreprocessArtifacts, out_dir: Path, formats: list[str] | None = None) -> dict[str, str]:
+    """Ecrit les formats demandes (defaut: FASTIA_EXPORT_FORMATS); renvoie {format: chemin}.
+
+    Un format indisponible (onnx non installe, moteur de quantification absent)
+    est ignore: l'entrainement ne doit pas echouer pour un artefact optionnel.
+    """
+    formats = EXPORT_FORMATS if formats is None else formats
+    model = copy.deepcopy(model).cpu().eval()
+    spec = json.dumps(preprocessing_spec(prep), ensure_ascii=False)
+    paths = {}
+    for fmt in formats:
+        try:
+            paths[fmt] = _WRITERS[fmt](model, spec, Path(out_dir) / FILES[fmt])
+        except (ImportError, RuntimeError) as e:
+            warnings.warn(f"export {fmt} ignore: {e}")
+    return paths
@@ -0,0 +1,220 @@
+"""Feature store: une ligne `client_features` par client, tenue a jour a l'ecriture.
+
+Le vecteur stocke (BLOB) est le resultat du nettoyage, pas la standardisation:
+valeurs numeriques apres `pd.to_numeric` et anomalies -> NaN (float64), et pour
+chaque colonne categorielle le code entier du niveau nettoye dans le dictionnaire
+`feature_levels` (ajout seulement, codes stables). Les moyennes/ecarts-types et
+l'ordre des niveaux changent a chaque entrainement: les appliquer a la lecture
+(operation vectorielle) evite de reecrire toute la table apres chaque run.
+
+`feature_version` identifie le schema du vecteur (colonnes, regles de nettoyage,
+disposition): les lignes d'une autre version sont ignorees jusqu'au rebuild.
+"""
+from __future__ import annotations
+import hashlib, json, os, threading, weakref
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, Engine, String, delete, event, func, select
+
+from ..database import engine as default_engine, table_exists, upsert
+from ..models import Client, ClientFeatures, FeatureLevel
+from .loader import FEATURE_COLUMNS
+from .preprocessing import ANOMALY_COLS, MISSING_TOKENS, PreprocessArtifacts, _numeric_values, clean_levels, encode_columns
+
+FEATURE_STORE = os.getenv("FASTIA_FEATURE_STORE", "1") == "1"
+TARGET_COL = "score_credit"
+IN_CHUNK = 900
+
+NUM_COLS = [c.name for c in FEATURE_COLUMNS if not isinstance(c.type, String) and c.name != TARGET_COL]
+CAT_COLS = [c.name for c in FEATURE_COLUMNS if isinstance(c.type, String)]
+NUM_INDEX = {c: j for j, c in enumerate(NUM_COLS)}
+CAT_INDEX = {c: j for j, c in enumerate(CAT_COLS)}
+ROW_DTYPE = np.dtype([("num", "<f8", (len(NUM_COLS),)), ("codes", "<i4", (len(CAT_COLS),))])
+FEATURE_VERSION = hashlib.sha256(json.dumps({
+    "num": NUM_COLS,
+    "cat": CAT_COLS,
+    "anomaly": ANOMALY_COLS,
+    "missing": sorted(MISSING_TOKENS),
+    "dtype": ROW_DTYPE.descr,
+}).encode()).hexdigest()[:16]
+
+_features = ClientFeatures.__table__
+_levels = FeatureLevel.__table__
+
+def enabled(conn: Connection) -> bool:
+    """Store actif et table migree (revision 0003); voir database.table_exists."""
+    return FEATURE_STORE and table_exists(conn, _features.name)
+
+class LevelDictionary:
+    """Cache memoire de feature_levels; les niveaux absents sont inseres a la volee.
+
+    Seuls les ids commites entrent dans le cache: ceux inseres par la transaction
+    de l'appelant restent attaches a sa connexion jusqu'au COMMIT (publies) ou au
+    ROLLBACK (oublies; SQLite reattribuerait le meme rowid a un autre niveau)."""
+
+    def __init__(self) -> None:
+        self._ids: dict[tuple[str, str, str], int] = {}
+        self._staged: weakref.WeakKeyDictionary[Connection, dict] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _fetch(self, conn: Connection, url: str, column: str, levels: list[str], into: dict) -> None:
+        for i in range(0, len(levels), IN_CHUNK):
+            stmt = select(_levels.c.level, _levels.c.id).where(
+                _levels.c.column_name == column, _levels.c.level.in_(levels[i:i + IN_CHUNK])
+            )
+            for level, level_id in conn.execute(stmt):
+                into[(url, column, level)] = level_id
+
+    def _stage(self, conn: Connection) -> dict:
+        staged = self._staged.get(conn)
+        if staged is None:
+            staged = self._staged[conn] = {}
+            event.listen(conn, "commit", self._publish)
+            event.listen(conn, "rollback", self._discard)
+        return staged
+
+    def _publish(self, conn: Connection) -> None:
+        with self._lock:
+            staged = self._staged.get(conn)
+            if staged:
+                self._ids.update(staged)
+                staged.clear()
+
+    def _discard(self, conn: Connection) -> None:
+        with self._lock:
+            self._staged.get(conn, {}).clear()
+
+    def ids(self, conn: Connection, column: str, levels: list[str]) -> list[int]:
+        url = str(conn.engine.url)
+        with self._lock:
+            staged = self._staged.get(conn, {})
+            missing = [lvl for lvl in levels if (url, column, lvl) not in self._ids and (url, column, lvl) not in staged]
+            if missing:
+                # niveaux commites (y compris par d'autres processus): caches
+                self._fetch(conn, url, column, missing, self._ids)
+                missing = [lvl for lvl in missing if (url, column, lvl) not in self._ids]
+            if missing:
+                # DO NOTHING: un autre processus a pu inserer le meme niveau entre-temps
+                upsert(conn, _levels, [{"column_name": column, "level": lvl} for lvl in missing],
+                       ["column_name", "level"], update=False)
+                staged = self._stage(conn)
+                self._fetch(conn, url, column, missing, staged)
+            return [self._ids.get((url, column, lvl)) or staged[(url, column, lvl)] for lvl in levels]
+
+    def positions(self, conn: Connection, artifacts: PreprocessArtifacts) -> dict[str, np.ndarray]:
+        """Par colonne: tableau code -> position dans artifacts.cat_levels (-1 si absent)."""
+        max_id = conn.execute(select(func.coalesce(func.max(_levels.c.id), 0))).scalar_one()
+        out = {c: np.full(max_id + 1, -1, dtype=np.intp) for c in artifacts.cat_levels}
+        for column, level, level_id in conn.execute(select(_levels.c.column_name, _levels.c.level, _levels.c.id)):
+            if column in out:
+                out[column][level_id] = artifacts.level_index[column][1].get(level, -1)
+        return out
+
+levels = LevelDictionary()
+
+def encode_frame(conn: Connection, df: pd.DataFrame) -> np.ndarray:
+    """Lignes `clients` (DataFrame) -> tableau structure ROW_DTYPE."""
+    rows = np.zeros(len(df), dtype=ROW_DTYPE)
+    for c, j in NUM_INDEX.items():
+        rows["num"][:, j] = _numeric_values(df, c)
+    for c, j in CAT_INDEX.items():
+        uniq, inverse = np.unique(clean_levels(df, c).astype(str), return_inverse=True)
+        rows["codes"][:, j] = np.asarray(levels.ids(conn, c, uniq.tolist()), dtype=np.int32)[inverse]
+    return rows
+
+def write_frame(conn: Connection, client_ids: list[int], df: pd.DataFrame) -> None:
+    if not client_ids or not enabled(conn):
+        return
+    rows = encode_frame(conn, df)
+    target = pd.to_numeric(df[TARGET_COL], errors="coerce") if TARGET_COL in df.columns else pd.Series(np.nan, index=df.index)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    upsert(conn, _features, [
+        {
+            "client_id": int(i),
+            "feature_version": FEATURE_VERSION,
+            "target": None if np.isnan(t) else float(t),
+            "vector": r.tobytes(),
+            "updated_at": now,
+        }
+        for i, t, r in zip(client_ids, target.to_numpy(dtype=float, na_value=np.nan), rows)
+    ], ["client_id"])
+
+def write_records(conn: Connection, client_ids: list[int], records: list[dict]) -> None:
+    if client_ids and enabled(conn):
+        write_frame(conn, client_ids, pd.DataFrame.from_records(records))
+
+def delete_rows(conn: Connection, client_ids: list[int]) -> None:
+    if not client_ids or not enabled(conn):
+        return
+    for i in range(0, len(client_ids), IN_CHUNK):
+        conn.execute(delete(_features).where(_features.c.client_id.in_(client_ids[i:i + IN_CHUNK])))
+
+def is_current(engine: Engine | None = None) -> bool:
+    """Chaque client a une ligne a la version courante (sinon: lecture brute + rebuild)."""
+    engine = engine or default_engine
+    with engine.connect() as conn:
+        if not enabled(conn):
+            return False
+        n_clients = conn.execute(select(func.count()).select_from(Client)).scalar_one()
+        n_features = conn.execute(
+            select(func.count()).select_from(_features).where(_features.c.feature_version == FEATURE_VERSION)
+        ).scalar_one()
+    return n_clients > 0 and n_clients == n_features
+
+def rebuild(engine: Engine | None = None, chunk_size: int = 20_000) -> int:
+    """(Re)calcule toutes les lignes par tranches d'ids; supprime les versions perimees."""
+    engine = engine or default_engine
+    columns = [Client.__table__.c.id, *FEATURE_COLUMNS]
+    n, after = 0, 0
+    while True:
+        with engine.begin() as conn:
+            result = conn.execute(select(*columns).where(Client.id > after).order_by(Client.id).limit(chunk_size))
+            df = pd.DataFrame(result.all(), columns=list(result.keys()))
+            if df.empty:
+                conn.execute(delete(_features).where(_features.c.feature_version != FEATURE_VERSION))
+                return n
+            write_frame(conn, df["id"].tolist(), df)
+        n += len(df)
+        after = int(df["id"].iloc[-1])
+
+def load_rows(engine: Engine | None = None, where=None, chunk_size: int = 50_000):
+    """(client_ids, cibles, lignes ROW_DTYPE) de la version courante, par id croissant."""
+    engine = engine or default_engine
+    stmt = select(_features.c.client_id, _features.c.target, _features.c.vector).where(
+        _features.c.feature_version == FEATURE_VERSION
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    stmt = stmt.order_by(_features.c.client_id).execution_options(yield_per=chunk_size)
+    ids, targets, vectors = [], [], []
+    with engine.connect() as conn:
+        for part in conn.execute(stmt).partitions():
+            for client_id, target, vector in part:
+                ids.append(client_id)
+                targets.append(target)
+                vectors.append(vector)
+    rows = np.frombuffer(b"".join(vectors), dtype=ROW_DTYPE)
+    return np.asarray(ids, dtype=np.int64), np.asarray(targets, dtype=float), rows
+
+def densify(rows: np.ndarray, artifacts: PreprocessArtifacts, engine: Engine | None = None) -> np.ndarray:
+    """Lignes du store -> matrice dense identique a transform() sur les memes clients."""
+    engine = engine or default_engine
+    if not set(artifacts.num_means) <= NUM_INDEX.keys() or not set(artifacts.cat_levels) <= CAT_INDEX.keys():
+        raise ValueError("Artefacts incompatibles avec le feature store")
+    with engine.connect() as conn:
+        positions = levels.positions(conn, artifacts)
+    return encode_columns(
+        len(rows),
+        artifacts,
+        lambda c: rows["num"][:, NUM_INDEX[c]].copy(),
+        lambda c: positions[c][rows["codes"][:, CAT_INDEX[c]]],
+    )
+
+def load_matrix(artifacts: PreprocessArtifacts, engine: Engine | None = None, labelled: bool = False, where=None):
+    """(client_ids, X, y) depuis le store; `labelled`: seulement les lignes avec cible."""
+    ids, y, rows = load_rows(engine, where)
+    if labelled:
+        keep = ~np.isnan(y)
+        ids, y, rows = ids[keep], y[keep], rows[keep]
+    return ids, densify(rows, artifacts, engine), y.astype(np.float32)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+import hashlib, io, threading
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import torch
+
+from .artifacts import RUNS_DIR, ModelNotReady, latest_dir
+from .model import MLP
+from .preprocessing import PreprocessArtifacts, load_artifacts, transform
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: MLP
+    artifacts: PreprocessArtifacts
+    version: str
+
+def load_model(artifacts_dir: Path) -> LoadedModel | None:
+    """Modele + preprocessing d'un dossier de run (None si incomplet)."""
+    model_path = artifacts_dir / "model.pt"
+    prep_path = artifacts_dir / "preprocessing.json"
+    if not model_path.exists() or not prep_path.exists():
+        return None
+    raw = model_path.read_bytes()
+    artifacts = load_artifacts(str(prep_path))
+    model = MLP(len(artifacts.feature_names))
+    model.load_state_dict(torch.load(io.BytesIO(raw), map_location="cpu"))
+    model.eval()
+    # version = id du run; ancienne disposition a plat: empreinte du fichier
+    version = artifacts_dir.name if artifacts_dir.parent == RUNS_DIR else hashlib.sha256(raw).hexdigest()[:12]
+    return LoadedModel(model, artifacts, version)
+
+class Predictor:
+    """Modele + preprocessing gardes en memoire.
+
+    L'etat est un objet immuable remplace d'un bloc par `reload()`: les requetes
+    en cours gardent leur reference, les suivantes voient le nouveau modele.
+    Aucune lecture disque dans `predict()`.
+    """
+
+    def __init__(self):
+        self._state: LoadedModel | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> LoadedModel | None:
+        return load_model(latest_dir())
+
+    def reload(self) -> bool:
+        with self._lock:
+            state = self._load()
+            if state is not None:
+                self._state = state
+            return state is not None
+
+    def current(self) -> LoadedModel:
+        state = self._state
+        if state is None:
+            self.reload()
+            state = self._state
+        if state is None:
+            raise ModelNotReady("Modele non entraine. Lancer POST /train")
+        return state
+
+    def predict(self, df: pd.DataFrame) -> tuple[np.ndarray, str]:
+        state = self.current()
+        X = transform(df, state.artifacts)
+        with torch.inference_mode():
+            scores = state.model(torch.from_numpy(X)).numpy()
+        return scores, state.version
+
+predictor = Predictor()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+import json, multiprocessing, os, threading, time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .artifacts import ARTIFACTS_DIR, new_run_id, promote, run_dir
+
+MAX_WORKERS = int(os.getenv("FASTIA_TRAIN_WORKERS", "1"))
+# relance le rescoring de la table apres chaque entrainement promu
+RESCORE_AFTER_TRAIN = os.getenv("FASTIA_RESCORE_AFTER_TRAIN", "0") == "1"
+RESCORE_DIR = ARTIFACTS_DIR / "rescore"
+# jobs termines gardes en memoire (les plus anciens sont oublies: GET -> 404)
+MAX_JOBS = int(os.getenv("FASTIA_MAX_JOBS", "200"))
+
+@dataclass
+class TrainJob:
+    id: str
+    key: str
+    params: dict[str, Any]
+    run_dir: Path
+    kind: str = "train"  # train | sweep | rescore
+    created_at: float = field(default_factory=time.time)
+    status: str = "queued"  # queued | running | ok | error
+    result: dict | None = None
+    error: str | None = None
+    finished_at: float | None = None
+
+    def progress(self) -> dict | None:
+        try:
+            with open(self.run_dir / "progress.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+def _write_progress(out_dir: Path, payload: dict) -> None:
+    tmp = out_dir / "progress.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp, out_dir / "progress.json")
+
+class _ProgressWriter:
+    """Callback d'epoque (cote worker): ecrit progress.json dans le dossier du run."""
+
+    def __init__(self, out_dir: Path, epochs: int):
+        self.out_dir = out_dir
+        self.epochs = epochs
+        self.train_losses: list[float] = []
+        self.val_losses: list[float] = []
+
+    def write(self, epoch: int) -> None:
+        _write_progress(self.out_dir, {"epoch": epoch, "epochs": self.epochs,
+                                       "train_losses": self.train_losses, "val_losses": self.val_losses})
+
+    def __call__(self, epoch: int, train_loss: float, val_loss: float) -> None:
+        self.train_losses.append(train_loss)
+        self.val_losses.append(val_loss)
+        self.write(epoch)
+
+def _run_training(params: dict[str, Any], out_dir: Path) -> dict:
+    # execute dans un processus du pool
+    from .training import train_from_db
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    progress = _ProgressWriter(out_dir, params["epochs"])
+    progress.write(0)
+    return train_from_db(**params, out_dir=out_dir, on_epoch=progress)
+
+def _run_sweep(params: dict[str, Any], out_dir: Path) -> dict:
+    # le balayage ouvre son propre pool de processus (essais en parallele)
+    from .sweep import expand_space, run_sweep
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_trials = len(expand_space(params["space"], params["mode"], params["n_trials"], params["seed"]))
+
+    def on_trial(_result: dict, leaderboard: list[dict]) -> None:
+        _write_progress(out_dir, {"trials_done": len(leaderboard), "n_trials": n_trials, "best": leaderboard[0]})
+
+    _write_progress(out_dir, {"trials_done": 0, "n_trials": n_trials, "best": None})
+    return run_sweep(**params, out_dir=out_dir, on_trial=on_trial)
+
+def _run_rescore(params: dict[str, Any], out_dir: Path) -> dict:
+    # le rescoring ouvre son propre pool de processus (tranches en parallele)
+    from .rescore import rescore
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def on_chunk(done: int, total: int) -> None:
+        _write_progress(out_dir, {"chunks_done": done, "n_chunks": total})
+
+    return rescore(**params, on_chunk=on_chunk)
+
+_RUNNERS = {"train": _run_training, "sweep": _run_sweep, "rescore": _run_rescore}
+# jobs qui produisent un modele a promouvoir
+_PROMOTED = {"train", "sweep"}
+
+class JobManager:
+    """Entrainements (et rescoring) en arriere-plan sur un pool de processus.
+
+    Deux demandes identiques (memes parametres) pendant qu'un run est en attente
+    ou en cours partagent le meme job. Chaque run ecrit dans son propre dossier
+    `runs/<job_id>/`; un run reussi est promu (LATEST) puis recharge en memoire.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._jobs: dict[str, TrainJob] = {}
+        self._active: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: pas de fork d'un processus qui a deja initialise torch/threads
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        # un worker tue (OOM, signal) casse tout le pool: il est remplace une fois
+        try:
+            return self._pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            return self._pool().submit(fn, *args)
+
+    def submit(self, params: dict[str, Any], kind: str = "train") -> TrainJob:
+        key = json.dumps({"kind": kind, "params": params}, sort_keys=True)
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return self._jobs[active_id]
+            job_id = new_run_id()
+            # le rescoring n'est pas un run: dossier a part, hors de runs/
+            out_dir = RESCORE_DIR / job_id if kind == "rescore" else run_dir(job_id)
+            job = TrainJob(job_id, key, params, out_dir, kind)
+            # enregistre seulement une fois accepte par le pool: sinon la cle de
+            # deduplication designerait pour toujours un job qui ne tourne pas
+            future = self._submit(_RUNNERS[kind], params, job.run_dir)
+            self._jobs[job_id] = job
+            self._active[key] = job_id
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return job
+
+    def _finish(self, job: TrainJob, future: Future) -> None:
+        try:
+            result = future.result()
+            job.result = result
+            if result["status"] != "ok":
+                job.error = result["metrics"].get("error")
+            elif job.kind in _PROMOTED:
+                from .inference import predictor
+
+                promote(job.id)
+                predictor.reload()
+            # "ok" seulement une fois le modele promu et recharge
+            job.status = result["status"]
+        except Exception as e:
+            job.status, job.error = "error", f"{type(e).__name__}: {e}"
+        finally:
+            # toujours libere: sinon les demandes identiques renverraient ce job pour toujours
+            with self._lock:
+                self._active.pop(job.key, None)
+                job.finished_at = time.time()
+                self._evict()
+        if job.status == "ok" and job.kind in _PROMOTED and RESCORE_AFTER_TRAIN:
+            from ..schemas import RescoreRequest
+
+            self.submit(RescoreRequest().model_dump(), kind="rescore")
+
+    def _evict(self) -> None:
+        # appele sous self._lock; un job en attente ou en cours n'est jamais oublie
+        excess = len(self._jobs) - MAX_JOBS
+        if excess > 0:
+            done = sorted((j for j in self._jobs.values() if j.finished_at is not None), key=lambda j: j.finished_at)
+            for job in done[:excess]:
+                del self._jobs[job.id]
+
+    def get(self, job_id: str, kind: str = "train") -> TrainJob | None:
+        job = self._jobs.get(job_id)
+        if job is None or job.kind != kind:
+            return None
+        if job.status == "queued" and job.progress() is not None:
+            job.status = "running"
+        return job
+
+jobs = JobManager()
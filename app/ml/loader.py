@@ -0,0 +1,94 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine, String, func, select
+
+from ..database import engine as default_engine
+from ..models import Client
+
+# identifiants exclus des features (comme dans fit_transform)
+EXCLUDED_COLS = {"id", "nom", "prenom"}
+FEATURE_COLUMNS = [c for c in Client.__table__.columns if c.name not in EXCLUDED_COLS]
+
+def _empty_buffer(col, size: int) -> np.ndarray:
+    if isinstance(col.type, String):
+        return np.empty(size, dtype=object)
+    # entiers nullables compris: NaN pour les valeurs manquantes
+    return np.empty(size, dtype=np.float64)
+
+def fetch_feature_frame(
+    engine: Engine | None = None,
+    chunk_size: int = 20_000,
+    columns=None,
+    where=None,
+) -> pd.DataFrame:
+    """Lit les colonnes utiles de `clients` par tranches (curseur serveur) vers des
+    buffers NumPy types, sans hydrater d'objets ORM.
+
+    Les buffers sont pre-dimensionnes avec un COUNT(*) puis agrandis si des lignes
+    arrivent pendant la lecture.
+    """
+    engine = engine or default_engine
+    columns = list(columns) if columns is not None else FEATURE_COLUMNS
+    stmt = select(*columns)
+    count_stmt = select(func.count()).select_from(Client)
+    if where is not None:
+        stmt = stmt.where(where)
+        count_stmt = count_stmt.where(where)
+    stmt = stmt.order_by(Client.id).execution_options(yield_per=chunk_size)
+
+    with engine.connect() as conn:
+        capacity = int(conn.execute(count_stmt).scalar_one())
+        buffers = [_empty_buffer(c, capacity) for c in columns]
+        n = 0
+        for part in conn.execute(stmt).partitions():
+            m = len(part)
+            if n + m > capacity:
+                capacity = max(2 * capacity, n + m)
+                buffers = [np.resize(b, capacity) for b in buffers]
+            for buf, values in zip(buffers, zip(*part)):
+                buf[n:n + m] = values
+            n += m
+
+    return pd.DataFrame({c.name: b[:n] for c, b in zip(columns, buffers)}, copy=False)
+
+def fetch_finetune_frame(
+    watermark: int,
+    recent_rows: int,
+    replay_ratio: float,
+    replay_min: int,
+    engine: Engine | None = None,
+    seed: int | None = None,
+) -> pd.DataFrame:
+    """Lignes pour un fine-tuning: clients d'id > watermark, les `recent_rows`
+    precedents et un echantillon aleatoire de lignes plus anciennes
+    (max(replay_min, replay_ratio x nouvelles lignes)).
+
+    Le cout suit la taille du changement: l'echantillon est tire dans l'intervalle
+    d'ids (les trous laisses par des suppressions le reduisent un peu) plutot que
+    par un parcours de la table. La colonne `id` est incluse.
+    """
+    from ..crud import IN_CHUNK
+
+    engine = engine or default_engine
+    columns = [Client.__table__.c.id, *FEATURE_COLUMNS]
+    with engine.connect() as conn:
+        recent_start = conn.execute(
+            select(Client.id).where(Client.id <= watermark)
+            .order_by(Client.id.desc()).offset(max(recent_rows - 1, 0)).limit(1)
+        ).scalar()
+        min_id = conn.execute(select(func.min(Client.id))).scalar()
+    if recent_start is None:
+        # moins de recent_rows lignes anciennes: tout est "recent"
+        return fetch_feature_frame(engine, columns=columns)
+
+    frames = [fetch_feature_frame(engine, columns=columns, where=Client.id >= recent_start)]
+    n_new = int((frames[0]["id"] > watermark).sum())
+    replay_rows = max(replay_min, int(replay_ratio * n_new))
+    span = recent_start - min_id
+    if replay_rows > 0 and span > 0:
+        rng = np.random.default_rng(seed)
+        ids = np.sort(rng.choice(span, size=min(replay_rows, span), replace=False) + min_id).tolist()
+        for i in range(0, len(ids), IN_CHUNK):
+            frames.append(fetch_feature_frame(engine, columns=columns, where=Client.id.in_(ids[i:i + IN_CHUNK])))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,17 @@
+"""Architecture du modele, sans dependance au code d'entrainement (sklearn,
+matplotlib, acces base): l'inference n'importe que torch."""
+from __future__ import annotations
+import torch
+
+class MLP(torch.nn.Module):
+    def __init__(self, in_dim: int):
+        super().__init__()
+        self.net = torch.nn.Sequential(
+            torch.nn.Linear(in_dim, 64),
+            torch.nn.ReLU(),
+            torch.nn.Linear(64, 32),
+            torch.nn.ReLU(),
+            torch.nn.Linear(32, 1),
+        )
+    def forward(self, x):
+        return self.net(x).squeeze(-1)
@@ -0,0 +1,112 @@
+"""Scoring sans torch ni pandas a partir des artefacts de app/ml/export.py.
+
+`load(path)`: model.npz (passe avant NumPy) ou model.onnx (onnxruntime, optionnel).
+Le pretraitement est re-implemente sur des dicts avec les regles embarquees dans
+la spec (memes resultats que preprocessing.transform, voir bench_export):
+numeriques convertis (sinon NaN), anomalies negatives -> NaN, imputation par la
+mediane puis standardisation; categorielles nettoyees (strip, manquants ->
+"inconnu") puis one-hot, niveau inconnu -> zeros.
+
+Ce module n'importe que NumPy: un processus de scoring leger peut l'utiliser seul.
+"""
+from __future__ import annotations
+import json, math
+from pathlib import Path
+from typing import Any, Callable
+import numpy as np
+
+SPEC_KEY = "preprocessing.json"
+
+def _to_float(v: Any) -> float:
+    if v is None:
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+class PortableModel:
+    def __init__(self, spec: dict, forward: Callable[[np.ndarray], np.ndarray], backend: str):
+        self.spec = spec
+        self.forward = forward
+        self.backend = backend
+        self.feature_names: list[str] = spec["feature_names"]
+        self._anomaly = set(spec["anomaly_cols"])
+        self._missing = set(spec["missing_tokens"])
+        self._lookup = {c: {lvl: i for i, lvl in enumerate(levels)} for c, levels in spec["cat_levels"].items()}
+
+    def _clean_level(self, v: Any) -> str:
+        if v is None or (isinstance(v, float) and math.isnan(v)):
+            return "inconnu"
+        v = str(v).strip()
+        return "inconnu" if v in self._missing else v
+
+    def transform(self, records: list[dict]) -> np.ndarray:
+        spec = self.spec
+        n = len(records)
+        X = np.zeros((n, len(self.feature_names)), dtype=np.float32)
+        j = 0
+        for c, mean in spec["num_means"].items():
+            values = np.fromiter((_to_float(r.get(c)) for r in records), dtype=np.float64, count=n)
+            if c in self._anomaly:
+                values[values < 0] = np.nan
+            values[np.isnan(values)] = spec["num_medians"].get(c, mean)
+            X[:, j] = (values - mean) / spec["num_stds"][c]
+            j += 1
+        rows = np.arange(n)
+        for c, levels in spec["cat_levels"].items():
+            lookup = self._lookup[c]
+            codes = np.fromiter((lookup.get(self._clean_level(r.get(c)), -1) for r in records), dtype=np.intp, count=n)
+            known = codes >= 0
+            X[rows[known], j + codes[known]] = 1.0
+            j += len(levels)
+        return X
+
+    def predict(self, records: list[dict]) -> np.ndarray:
+        if not records:
+            return np.zeros(0, dtype=np.float32)
+        return self.forward(self.transform(records))
+
+def _npz_forward(weights: list[tuple[np.ndarray, np.ndarray]]) -> Callable[[np.ndarray], np.ndarray]:
+    def forward(X: np.ndarray) -> np.ndarray:
+        h = X
+        for i, (W, b) in enumerate(weights):
+            h = h @ W
+            h += b
+            if i < len(weights) - 1:
+                np.maximum(h, 0, out=h)
+        return h[:, 0]
+    return forward
+
+def load_npz(path: Path) -> PortableModel:
+    with np.load(path, allow_pickle=False) as data:
+        spec = json.loads(data["spec"].tobytes().decode("utf-8"))
+        n_layers = sum(1 for k in data.files if k.startswith("W"))
+        weights = [(data[f"W{i}"], data[f"b{i}"]) for i in range(n_layers)]
+    return PortableModel(spec, _npz_forward(weights), "numpy")
+
+def load_onnx(path: Path) -> PortableModel:
+    import onnxruntime as ort  # optionnel
+
+    session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+    spec = json.loads(session.get_modelmeta().custom_metadata_map[SPEC_KEY])
+
+    def forward(X: np.ndarray) -> np.ndarray:
+        return session.run(None, {"X": X})[0]
+
+    return PortableModel(spec, forward, "onnx")
+
+def load(path: str | Path) -> PortableModel:
+    path = Path(path)
+    if path.is_dir():
+        # dossier de run: ONNX si disponible, sinon NumPy
+        onnx_path = path / "model.onnx"
+        if onnx_path.exists():
+            try:
+                return load_onnx(onnx_path)
+            except ImportError:
+                pass
+        path = path / "model.npz"
+    if path.suffix == ".onnx":
+        return load_onnx(path)
+    return load_npz(path)
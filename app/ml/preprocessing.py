@@ -1,16 +1,31 @@
 from __future__ import annotations
-import json
-from dataclasses import dataclass
-from typing import Any
+import json, os
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Callable
 import numpy as np
 import pandas as pd
 
+ANOMALY_COLS = ["nb_enfants", "quotient_caf", "loyer_mensuel"]
+MISSING_TOKENS = {"nan", "None"}
+# en dessous, une boucle Python sur les valeurs coute moins que l'overhead pandas
+SMALL_BATCH = 32
+
 @dataclass
 class PreprocessArtifacts:
     feature_names: list[str]
     num_means: dict[str, float]
     num_stds: dict[str, float]
     cat_levels: dict[str, list[str]]
+    num_medians: dict[str, float] = field(default_factory=dict)
+
+    @cached_property
+    def level_index(self) -> dict[str, tuple[pd.Index, dict[str, int]]]:
+        # construit une fois par jeu d'artefacts (reutilise a chaque transform)
+        return {
+            c: (pd.Index(levels), {lvl: i for i, lvl in enumerate(levels)})
+            for c, levels in self.cat_levels.items()
+        }
 
 def _sanitize(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -20,14 +35,16 @@ def _sanitize(df: pd.DataFrame) -> pd.DataFrame:
         df[c] = df[c].astype(str).str.strip()
 
     # anomalies -> NaN
-    for col in ["nb_enfants", "quotient_caf", "loyer_mensuel"]:
+    for col in ANOMALY_COLS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
             df.loc[df[col] < 0, col] = np.nan
 
     return df
 
-def fit_transform(df: pd.DataFrame, target_col: str):
+def prepare_frame(df: pd.DataFrame, target_col: str):
+    """Nettoyage commun a fit_transform et aux statistiques incrementales:
+    lignes avec cible, colonnes features, separation numeriques / categorielles."""
     df = _sanitize(df)
 
     df = df[df[target_col].notna()].copy()
@@ -39,45 +56,138 @@ def fit_transform(df: pd.DataFrame, target_col: str):
 
     cat_cols = list(Xdf.select_dtypes(include=["object"]).columns)
     num_cols = [c for c in Xdf.columns if c not in cat_cols]
+    return Xdf, y, num_cols, cat_cols
+
+def category_values(col: pd.Series) -> pd.Series:
+    return col.replace({"nan": np.nan, "None": np.nan}).fillna("inconnu")
+
+def build_artifacts(
+    num_cols: list[str],
+    cat_levels: dict[str, list[str]],
+    num_means: dict[str, float],
+    num_stds: dict[str, float],
+    num_medians: dict[str, float],
+) -> PreprocessArtifacts:
+    feature_names = list(num_cols)
+    for c in cat_levels:
+        feature_names.extend(f"{c}__{lvl}" for lvl in cat_levels[c])
+    return PreprocessArtifacts(feature_names, num_means, num_stds, cat_levels, num_medians)
+
+def fit_transform(df: pd.DataFrame, target_col: str):
+    Xdf, y, num_cols, cat_cols = prepare_frame(df, target_col)
 
-    # impute numeric
+    # impute numeric + standardize stats
+    num_medians, num_means, num_stds = {}, {}, {}
     for c in num_cols:
-        Xdf[c] = pd.to_numeric(Xdf[c], errors="coerce")
-        med = float(Xdf[c].median())
-        Xdf[c] = Xdf[c].fillna(med)
+        col = pd.to_numeric(Xdf[c], errors="coerce")
+        med = float(col.median())
+        values = col.fillna(med).astype(float).to_numpy()
+        std = float(values.std())
+        num_medians[c] = med
+        num_means[c] = float(values.mean())
+        num_stds[c] = std if std != 0 else 1.0
 
     # impute categorical
-    for c in cat_cols:
-        Xdf[c] = Xdf[c].replace({"nan": np.nan, "None": np.nan}).fillna("inconnu")
-
-    cat_levels = {c: sorted(Xdf[c].unique().tolist()) for c in cat_cols}
-
-    # standardize numeric
-    num_matrix = Xdf[num_cols].astype(float).to_numpy() if num_cols else np.zeros((len(Xdf), 0), dtype=float)
-    num_means, num_stds = {}, {}
-    feature_names = []
-    if num_cols:
-        means = num_matrix.mean(axis=0)
-        stds = num_matrix.std(axis=0)
-        stds = np.where(stds == 0, 1.0, stds)
-        for i, c in enumerate(num_cols):
-            num_means[c] = float(means[i])
-            num_stds[c] = float(stds[i])
-        num_matrix = (num_matrix - means) / stds
-        feature_names.extend(num_cols)
-
-    one_hots = []
-    for c in cat_cols:
-        for lvl in cat_levels[c]:
-            one_hots.append((Xdf[c] == lvl).astype(float).to_numpy()[:, None])
-            feature_names.append(f"{c}__{lvl}")
-
-    X = num_matrix
-    if one_hots:
-        X = np.concatenate([num_matrix] + one_hots, axis=1)
-
-    artifacts = PreprocessArtifacts(feature_names, num_means, num_stds, cat_levels)
-    return X.astype(np.float32), y.astype(np.float32), artifacts
+    cat_levels = {c: sorted(category_values(Xdf[c]).unique().tolist()) for c in cat_cols}
+
+    artifacts = build_artifacts(num_cols, cat_levels, num_means, num_stds, num_medians)
+    return _encode(Xdf, artifacts), y.astype(np.float32), artifacts
+
+def extend_levels(artifacts: PreprocessArtifacts, cat_levels: dict[str, Any]) -> PreprocessArtifacts:
+    """Ajoute de nouveaux niveaux sans toucher a la standardisation des numeriques
+    (fine-tuning: les poids appris restent valables pour les features existantes)."""
+    levels = {c: sorted(set(old) | set(cat_levels.get(c, ()))) for c, old in artifacts.cat_levels.items()}
+    return build_artifacts(
+        list(artifacts.num_means), levels, artifacts.num_means, artifacts.num_stds, artifacts.num_medians,
+    )
+
+def transform(df: pd.DataFrame, artifacts: PreprocessArtifacts) -> np.ndarray:
+    """Applique des artefacts deja ajustes (inference): pas de re-calcul des stats."""
+    return _encode(df, artifacts)
+
+def iter_transform(df: pd.DataFrame, artifacts: PreprocessArtifacts, chunk_rows: int = 65_536):
+    """transform() par tranches: la matrice dense d'un gros lot ne tient pas en memoire
+    (n_lignes x n_features float32)."""
+    for start in range(0, len(df), chunk_rows):
+        yield transform(df.iloc[start:start + chunk_rows], artifacts)
+
+def _numeric_values(df: pd.DataFrame, c: str) -> np.ndarray:
+    if c not in df.columns:
+        return np.full(len(df), np.nan)
+    col = df[c]
+    if col.dtype.kind in "biuf":
+        values = col.to_numpy(dtype=float, na_value=np.nan, copy=True)
+    else:
+        values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float, na_value=np.nan, copy=True)
+    if c in ANOMALY_COLS:
+        values = np.where(values < 0, np.nan, values)
+    return values
+
+def _clean_level(v: Any) -> str:
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return "inconnu"
+    v = str(v).strip()
+    return "inconnu" if v in MISSING_TOKENS else v
+
+def clean_levels(df: pd.DataFrame, c: str) -> np.ndarray:
+    """Niveaux nettoyes (strip, manquants -> "inconnu"), comme a l'entrainement."""
+    if c not in df.columns:
+        return np.full(len(df), "inconnu", dtype=object)
+    col = df[c]
+    if len(col) <= SMALL_BATCH:
+        return np.array([_clean_level(v) for v in col.tolist()], dtype=object)
+    values = col.astype(str).str.strip()
+    values = values.where(~values.isin(MISSING_TOKENS), "inconnu").fillna("inconnu")
+    return values.to_numpy(dtype=object)
+
+def _category_codes(df: pd.DataFrame, c: str, index: pd.Index, lookup: dict[str, int]) -> np.ndarray:
+    """Code entier du niveau de chaque ligne; -1 si niveau inconnu a l'entrainement."""
+    if c not in df.columns:
+        return np.full(len(df), lookup.get("inconnu", -1), dtype=np.intp)
+    if len(df) <= SMALL_BATCH:
+        return np.fromiter((lookup.get(_clean_level(v), -1) for v in df[c].tolist()), dtype=np.intp, count=len(df))
+    return index.get_indexer(clean_levels(df, c))
+
+def encode_columns(
+    n: int,
+    artifacts: PreprocessArtifacts,
+    numeric: Callable[[str], np.ndarray],
+    codes: Callable[[str], np.ndarray],
+) -> np.ndarray:
+    """Ecrit directement dans une matrice float32 pre-allouee.
+
+    Numeriques: une colonne par feature (imputation mediane + standardisation).
+    Categorielles: bloc one-hot rempli par indexation avec les codes entiers,
+    sans materialiser une colonne par niveau.
+
+    `numeric(c)` renvoie les valeurs brutes (NaN si manquant, copie modifiable),
+    `codes(c)` la position de chaque ligne dans artifacts.cat_levels[c] (-1 si inconnu).
+    """
+    X = np.zeros((n, len(artifacts.feature_names)), dtype=np.float32)
+
+    j = 0
+    for c, mean in artifacts.num_means.items():
+        values = numeric(c)
+        values[np.isnan(values)] = artifacts.num_medians.get(c, mean)
+        X[:, j] = (values - mean) / artifacts.num_stds[c]
+        j += 1
+
+    rows = np.arange(n)
+    for c, levels in artifacts.cat_levels.items():
+        col_codes = codes(c)
+        known = col_codes >= 0
+        X[rows[known], j + col_codes[known]] = 1.0
+        j += len(levels)
+
+    return X
+
+def _encode(df: pd.DataFrame, artifacts: PreprocessArtifacts) -> np.ndarray:
+    return encode_columns(
+        len(df),
+        artifacts,
+        lambda c: _numeric_values(df, c),
+        lambda c: _category_codes(df, c, *artifacts.level_index[c]),
+    )
 
 def save_artifacts(artifacts: PreprocessArtifacts, path: str):
     payload: dict[str, Any] = {
@@ -85,6 +195,16 @@ def save_artifacts(artifacts: PreprocessArtifacts, path: str):
         "num_means": artifacts.num_means,
         "num_stds": artifacts.num_stds,
         "cat_levels": artifacts.cat_levels,
+        "num_medians": artifacts.num_medians,
     }
-    with open(path, "w", encoding="utf-8") as f:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def load_artifacts(path: str) -> PreprocessArtifacts:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    # anciens fichiers: pas de medianes -> on retombe sur les moyennes
+    payload.setdefault("num_medians", dict(payload["num_means"]))
+    return PreprocessArtifacts(**payload)
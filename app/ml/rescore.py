@@ -0,0 +1,185 @@
+"""Rescoring en masse: score de chaque client ecrit dans `client_predictions`.
+
+La table est decoupee en tranches d'ids consecutifs. Chaque tranche est lue,
+transformee avec les PreprocessArtifacts du run et scoree dans un worker d'un
+pool de processus (lecture depuis le feature store s'il est a jour). Le processus
+parent ecrit les resultats dans l'ordre des ids, une transaction par tranche
+(upsert: une ligne par client, version du modele + date).
+
+Reprise: une tranche est commitee seulement si les precedentes le sont; une
+relance pour la meme version repart donc de MAX(client_id) de cette version.
+Un passage `full` sur une version deja complete ne deplace pas ce repere: s'il
+est interrompu, le relancer en `full`.
+"""
+from __future__ import annotations
+import multiprocessing, os, time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+import numpy as np
+from sqlalchemy import Connection, Engine, delete, func, select
+
+from ..database import engine as default_engine, table_exists, upsert
+from ..models import Client, ClientPrediction
+
+CHUNK_SIZE = int(os.getenv("FASTIA_RESCORE_CHUNK", "20000"))
+MAX_WORKERS = int(os.getenv("FASTIA_RESCORE_WORKERS", "0"))  # 0 = un par coeur
+IN_CHUNK = 900
+
+ChunkCallback = Callable[[int, int], None]
+
+_predictions = ClientPrediction.__table__
+
+def enabled(conn: Connection) -> bool:
+    """Table migree (revision 0004); voir database.table_exists."""
+    return table_exists(conn, _predictions.name)
+
+def delete_rows(conn: Connection, client_ids: list[int]) -> None:
+    if not client_ids or not enabled(conn):
+        return
+    for i in range(0, len(client_ids), IN_CHUNK):
+        conn.execute(delete(_predictions).where(_predictions.c.client_id.in_(client_ids[i:i + IN_CHUNK])))
+
+def resume_after(version: str, engine: Engine | None = None) -> int:
+    """Dernier id commite pour `version` (0 si aucun)."""
+    engine = engine or default_engine
+    with engine.connect() as conn:
+        stmt = select(func.coalesce(func.max(_predictions.c.client_id), 0))
+        return int(conn.execute(stmt.where(_predictions.c.model_version == version)).scalar_one())
+
+def chunk_bounds(after: int, chunk_size: int, engine: Engine | None = None) -> list[tuple[int, int]]:
+    """Intervalles (lo, hi] de `chunk_size` clients au plus, au-dela de `after`."""
+    engine = engine or default_engine
+    with engine.connect() as conn:
+        stmt = select(Client.id).where(Client.id > after).order_by(Client.id).execution_options(yield_per=100_000)
+        ids = np.fromiter((i for part in conn.execute(stmt).scalars().partitions() for i in part), dtype=np.int64)
+    if not len(ids):
+        return []
+    ends = np.append(ids[chunk_size - 1::chunk_size], ids[-1])
+    ends = np.unique(ends)
+    starts = np.concatenate(([after], ends[:-1]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+# etat d'un worker (rempli par _init_worker)
+_worker: dict[str, Any] = {}
+
+def _init_worker(model_dir: str, use_store: bool, threads: int) -> None:
+    import torch
+    from .inference import load_model
+
+    torch.set_num_threads(threads)
+    _worker["state"] = load_model(Path(model_dir))
+    _worker["use_store"] = use_store
+
+def _score_range(lo: int, hi: int) -> tuple[np.ndarray, np.ndarray]:
+    """(client_ids, scores) des clients d'id dans (lo, hi]."""
+    import torch
+    from . import feature_store
+    from .loader import FEATURE_COLUMNS, fetch_feature_frame
+    from .preprocessing import transform
+
+    state = _worker["state"]
+    if _worker["use_store"]:
+        column = feature_store._features.c.client_id
+        ids, X, _ = feature_store.load_matrix(state.artifacts, where=(column > lo) & (column <= hi))
+    else:
+        df = fetch_feature_frame(columns=[Client.__table__.c.id, *FEATURE_COLUMNS], where=(Client.id > lo) & (Client.id <= hi))
+        ids, X = df["id"].to_numpy(dtype=np.int64), transform(df, state.artifacts)
+    with torch.inference_mode():
+        scores = state.model(torch.from_numpy(X)).numpy()
+    return ids, scores
+
+class _InlineExecutor:
+    """Meme interface que le pool, dans le processus courant (un seul worker)."""
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        pass
+
+def _write_chunk(engine: Engine, version: str, ids: np.ndarray, scores: np.ndarray) -> None:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [
+        {"client_id": i, "model_version": version, "score": s, "scored_at": now}
+        for i, s in zip(ids.tolist(), scores.astype(float).tolist())
+    ]
+    with engine.begin() as conn:
+        upsert(conn, _predictions, rows, ["client_id"])
+
+def rescore(
+    model_dir: Path | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    max_workers: int | None = None,
+    full: bool = False,
+    engine: Engine | None = None,
+    on_chunk: ChunkCallback | None = None,
+) -> dict:
+    """Score tous les clients avec le run `model_dir` (defaut: run promu).
+
+    `full`: repart du debut meme si une partie est deja ecrite pour cette version.
+    """
+    from . import feature_store
+    from .artifacts import latest_dir
+    from .inference import ModelNotReady, load_model
+
+    engine = engine or default_engine
+    model_dir = Path(model_dir) if model_dir is not None else latest_dir()
+    state = load_model(model_dir)
+    if state is None:
+        raise ModelNotReady("Modele non entraine. Lancer POST /train")
+    version = state.version
+    del state
+
+    t0 = time.perf_counter()
+    after = 0 if full else resume_after(version, engine)
+    bounds = chunk_bounds(after, chunk_size, engine)
+    use_store = feature_store.is_current(engine)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(max_workers or MAX_WORKERS or cpus, len(bounds) or 1))
+    init_args = (str(model_dir), use_store, max(1, cpus // workers))
+    if workers == 1:
+        _init_worker(*init_args)
+        pool = _InlineExecutor()
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=init_args)
+
+    n_rows = n_done = 0
+    pending: deque[Future] = deque()
+    todo = iter(bounds)
+    try:
+        # au plus 2 tranches d'avance par worker; ecriture dans l'ordre des ids
+        for lo, hi in todo:
+            pending.append(pool.submit(_score_range, lo, hi))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            ids, scores = pending.popleft().result()
+            _write_chunk(engine, version, ids, scores)
+            n_rows += len(ids)
+            n_done += 1
+            if on_chunk is not None:
+                on_chunk(n_done, len(bounds))
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(pool.submit(_score_range, *nxt))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    seconds = time.perf_counter() - t0
+    return {
+        "status": "ok",
+        "model_version": version,
+        "resumed_after": after,
+        "n_chunks": len(bounds),
+        "n_rows": n_rows,
+        "workers": workers,
+        "source": "feature_store" if use_store else "clients",
+        "seconds": seconds,
+        "rows_per_s": n_rows / seconds if seconds > 0 else None,
+    }
@@ -0,0 +1,105 @@
+"""Instantanes de la matrice d'entrainement (X.npy, y.npy + artefacts) sur disque.
+
+Cle = empreinte SQL des lignes source + version du pretraitement: deux
+entrainements sur les memes donnees (balayage d'hyperparametres) relisent la
+matrice par np.load(mmap_mode="r") au lieu de refaire extraction + encodage.
+
+L'empreinte agrege en une passe (sans transfert de lignes): nombre, somme et max
+des ids, somme de chaque colonne numerique, longueur totale des colonnes texte,
+et la date de derniere ecriture du feature store. Une modification qui laisse
+toutes ces sommes inchangees n'est pas detectee: full_refit force le recalcul.
+"""
+from __future__ import annotations
+import hashlib, json, os, shutil, time, uuid
+from pathlib import Path
+import numpy as np
+from sqlalchemy import Engine, String, func, select
+
+from ..database import engine as default_engine
+from ..models import Client, ClientFeatures
+from . import feature_store
+from .artifacts import ARTIFACTS_DIR
+from .loader import FEATURE_COLUMNS
+from .preprocessing import PreprocessArtifacts, load_artifacts, save_artifacts
+from .stats import PreprocessStats, load_stats, save_stats
+
+SNAPSHOTS = os.getenv("FASTIA_SNAPSHOTS", "1") == "1"
+SNAPSHOTS_DIR = ARTIFACTS_DIR / "snapshots"
+# une matrice dense par instantane: on n'en garde que quelques-unes
+SNAPSHOTS_KEEP = int(os.getenv("FASTIA_SNAPSHOTS_KEEP", "2"))
+# a incrementer si le format du dossier change
+SNAPSHOT_FORMAT = 1
+
+def source_fingerprint(engine: Engine | None = None) -> dict:
+    engine = engine or default_engine
+    aggregates = [func.count(), func.coalesce(func.sum(Client.id), 0), func.coalesce(func.max(Client.id), 0)]
+    for c in FEATURE_COLUMNS:
+        if isinstance(c.type, String):
+            aggregates.append(func.coalesce(func.sum(func.length(c)), 0))
+        else:
+            aggregates.append(func.coalesce(func.sum(c), 0))
+    with engine.connect() as conn:
+        values = conn.execute(select(*aggregates)).one()
+        features_at = None
+        if feature_store.enabled(conn):
+            features_at = conn.execute(select(func.max(ClientFeatures.updated_at))).scalar()
+    return {
+        "n_rows": int(values[0]),
+        "aggregates": [float(v) for v in values],
+        "features_updated_at": str(features_at) if features_at is not None else None,
+    }
+
+def snapshot_key(fingerprint: dict, target_col: str) -> str:
+    payload = {
+        "fingerprint": fingerprint,
+        "target_col": target_col,
+        "feature_version": feature_store.FEATURE_VERSION,
+        "format": SNAPSHOT_FORMAT,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:20]
+
+def load(key: str) -> tuple[np.ndarray, np.ndarray, PreprocessArtifacts, PreprocessStats] | None:
+    """X et y memory-mappes (lecture seule, sans copie), ou None si absent."""
+    path = SNAPSHOTS_DIR / key
+    try:
+        X = np.load(path / "X.npy", mmap_mode="r")
+        y = np.load(path / "y.npy", mmap_mode="r")
+        prep = load_artifacts(str(path / "preprocessing.json"))
+    except FileNotFoundError:
+        return None
+    stats = load_stats(path / "preprocessing_stats.json")
+    if stats is None:
+        return None
+    os.utime(path)  # pour prune(): dernier usage
+    return X, y, prep, stats
+
+def save(key: str, X: np.ndarray, y: np.ndarray, prep: PreprocessArtifacts, stats: PreprocessStats, meta: dict) -> Path:
+    """Ecrit dans un dossier temporaire puis renommage atomique."""
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOTS_DIR / key
+    tmp = SNAPSHOTS_DIR / f".{key}.{uuid.uuid4().hex[:6]}.tmp"
+    tmp.mkdir()
+    try:
+        np.save(tmp / "X.npy", np.ascontiguousarray(X, dtype=np.float32))
+        np.save(tmp / "y.npy", np.ascontiguousarray(y, dtype=np.float32))
+        save_artifacts(prep, str(tmp / "preprocessing.json"))
+        save_stats(stats, tmp / "preprocessing_stats.json")
+        meta = {**meta, "key": key, "shape": list(X.shape), "created_at": time.time()}
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        # meme cle ecrite entre-temps par un autre run: contenu identique
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not path.exists():
+            raise
+    prune()
+    return path
+
+def prune(keep: int = SNAPSHOTS_KEEP) -> None:
+    snapshots = sorted(
+        (p for p in SNAPSHOTS_DIR.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for p in snapshots[keep:]:
+        shutil.rmtree(p, ignore_errors=True)
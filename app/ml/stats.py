@@ -0,0 +1,242 @@
+"""Statistiques de pretraitement fusionnables, mises a jour par lots de lignes.
+
+- numeriques: moments de Welford (count/mean/M2, fusion de Chan) sur les valeurs
+  observees + nombre de manquants + echantillon "bottom-k" pour la mediane;
+- categorielles: ensemble des niveaux rencontres.
+
+Mediane approchee: l'echantillon garde les k valeurs de plus petite cle aleatoire,
+soit un tirage uniforme sans remise de k valeurs parmi n (fusion exacte entre
+deux echantillons). Par l'inegalite de Dvoretzky-Kiefer-Wolfowitz, avec une
+probabilite >= 1 - delta, la fonction de repartition empirique de l'echantillon
+s'ecarte de la vraie d'au plus eps = sqrt(ln(2 / delta) / (2k)) : la mediane
+estimee a un rang compris dans [n/2 - eps*n, n/2 + eps*n]. Pour k = 4096 et
+delta = 1%, eps ~ 2.5% du nombre de lignes. Tant que n <= k la mediane est exacte.
+
+Les suppressions ne sont pas retranchees (un echantillon ne se "defusionne" pas):
+un re-calcul complet (full_refit) remet les statistiques a plat.
+"""
+from __future__ import annotations
+import json, math, os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+import numpy as np
+import pandas as pd
+
+from .preprocessing import PreprocessArtifacts, build_artifacts, category_values, prepare_frame
+
+STATS_FILE = "preprocessing_stats.json"
+SKETCH_SIZE = int(os.getenv("FASTIA_STATS_SKETCH_SIZE", "4096"))
+
+@dataclass
+class RunningMoments:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def merge(self, other: RunningMoments) -> RunningMoments:
+        if other.count == 0:
+            return RunningMoments(self.count, self.mean, self.m2)
+        if self.count == 0:
+            return RunningMoments(other.count, other.mean, other.m2)
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / n
+        m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / n
+        return RunningMoments(n, mean, m2)
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        batch = RunningMoments(len(values), mean, float(((values - mean) ** 2).sum()))
+        merged = self.merge(batch)
+        self.count, self.mean, self.m2 = merged.count, merged.mean, merged.m2
+
+    @property
+    def std(self) -> float:
+        # ecart-type de population (ddof=0), comme ndarray.std()
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+@dataclass
+class QuantileSketch:
+    k: int = SKETCH_SIZE
+    n: int = 0
+    values: np.ndarray = field(default_factory=lambda: np.empty(0))
+    keys: np.ndarray = field(default_factory=lambda: np.empty(0))
+
+    def _keep(self, values: np.ndarray, keys: np.ndarray) -> None:
+        if len(keys) > self.k:
+            idx = np.argpartition(keys, self.k - 1)[:self.k]
+            values, keys = values[idx], keys[idx]
+        self.values, self.keys = values, keys
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+        # cles independantes d'un echantillon a l'autre, sinon la fusion serait biaisee
+        keys = np.random.default_rng().random(len(values))
+        self.n += len(values)
+        self._keep(np.concatenate([self.values, values]), np.concatenate([self.keys, keys]))
+
+    def merge(self, other: QuantileSketch) -> QuantileSketch:
+        out = QuantileSketch(min(self.k, other.k), self.n + other.n)
+        out._keep(np.concatenate([self.values, other.values]), np.concatenate([self.keys, other.keys]))
+        return out
+
+    def quantile(self, q: float) -> float:
+        return float(np.quantile(self.values, q)) if len(self.values) else float("nan")
+
+    def median(self) -> float:
+        return float(np.median(self.values)) if len(self.values) else float("nan")
+
+    def rank_error(self, delta: float = 0.01) -> float:
+        """Erreur de rang relative maximale (fraction de n) avec probabilite 1 - delta."""
+        if self.n <= self.k:
+            return 0.0
+        return math.sqrt(math.log(2 / delta) / (2 * self.k))
+
+@dataclass
+class NumericStats:
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    n_missing: int = 0
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def update(self, values: np.ndarray) -> None:
+        missing = np.isnan(values)
+        observed = values[~missing]
+        self.n_missing += int(missing.sum())
+        self.moments.update(observed)
+        self.sketch.update(observed)
+
+    def merge(self, other: NumericStats) -> NumericStats:
+        return NumericStats(
+            self.moments.merge(other.moments),
+            self.n_missing + other.n_missing,
+            self.sketch.merge(other.sketch),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.moments.count,
+            "mean": self.moments.mean,
+            "m2": self.moments.m2,
+            "n_missing": self.n_missing,
+            "sketch": {
+                "k": self.sketch.k,
+                "n": self.sketch.n,
+                "values": self.sketch.values.tolist(),
+                "keys": self.sketch.keys.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, s: dict[str, Any]) -> NumericStats:
+        sk = s["sketch"]
+        return cls(
+            RunningMoments(s["count"], s["mean"], s["m2"]),
+            s["n_missing"],
+            QuantileSketch(sk["k"], sk["n"], np.asarray(sk["values"], dtype=float), np.asarray(sk["keys"], dtype=float)),
+        )
+
+    def fitted(self) -> tuple[float, float, float]:
+        """(moyenne, ecart-type, mediane) apres imputation des manquants par la mediane,
+        comme fit_transform: les manquants forment un groupe de variance nulle."""
+        med = self.sketch.median()
+        imputed = self.moments.merge(RunningMoments(self.n_missing, med, 0.0))
+        std = imputed.std
+        return imputed.mean, std if std != 0 else 1.0, med
+
+@dataclass
+class PreprocessStats:
+    target_col: str
+    num_cols: list[str] = field(default_factory=list)
+    cat_cols: list[str] = field(default_factory=list)
+    numeric: dict[str, NumericStats] = field(default_factory=dict)
+    categories: dict[str, set[str]] = field(default_factory=dict)
+    n_rows: int = 0
+    last_client_id: int = 0
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Ajoute des lignes `clients` (colonne `id` comprise pour le filigrane).
+
+        Leve ValueError si les colonnes ne correspondent plus aux statistiques."""
+        if df.empty:
+            return
+        last_id = int(df["id"].max()) if "id" in df.columns else self.last_client_id
+        Xdf, y, num_cols, cat_cols = prepare_frame(df, self.target_col)
+        if self.n_rows and (num_cols, cat_cols) != (self.num_cols, self.cat_cols):
+            raise ValueError("Colonnes differentes des statistiques existantes")
+        self.num_cols, self.cat_cols = num_cols, cat_cols
+        for c in num_cols:
+            values = pd.to_numeric(Xdf[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan, copy=True)
+            self.numeric.setdefault(c, NumericStats()).update(values)
+        for c in cat_cols:
+            self.categories.setdefault(c, set()).update(category_values(Xdf[c]).unique().tolist())
+        self.n_rows += len(y)
+        self.last_client_id = max(self.last_client_id, last_id)
+
+    def merge(self, other: PreprocessStats) -> PreprocessStats:
+        if other.n_rows == 0:
+            return self
+        if self.n_rows == 0:
+            return other
+        if (self.num_cols, self.cat_cols) != (other.num_cols, other.cat_cols):
+            raise ValueError("Colonnes differentes des statistiques existantes")
+        return PreprocessStats(
+            self.target_col,
+            self.num_cols,
+            self.cat_cols,
+            {c: self.numeric[c].merge(other.numeric[c]) for c in self.num_cols},
+            {c: self.categories[c] | other.categories[c] for c in self.cat_cols},
+            self.n_rows + other.n_rows,
+            max(self.last_client_id, other.last_client_id),
+        )
+
+    def to_artifacts(self) -> PreprocessArtifacts:
+        num_means, num_stds, num_medians = {}, {}, {}
+        for c in self.num_cols:
+            num_means[c], num_stds[c], num_medians[c] = self.numeric[c].fitted()
+        cat_levels = {c: sorted(self.categories[c]) for c in self.cat_cols}
+        return build_artifacts(self.num_cols, cat_levels, num_means, num_stds, num_medians)
+
+    def median_rank_error(self, delta: float = 0.01) -> dict[str, float]:
+        return {c: self.numeric[c].sketch.rank_error(delta) for c in self.num_cols}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "target_col": self.target_col,
+            "num_cols": self.num_cols,
+            "cat_cols": self.cat_cols,
+            "n_rows": self.n_rows,
+            "last_client_id": self.last_client_id,
+            "median_rank_error": self.median_rank_error(),
+            "numeric": {c: s.to_dict() for c, s in self.numeric.items()},
+            "categories": {c: sorted(levels) for c, levels in self.categories.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> PreprocessStats:
+        numeric = {c: NumericStats.from_dict(s) for c, s in payload["numeric"].items()}
+        return cls(
+            payload["target_col"],
+            payload["num_cols"],
+            payload["cat_cols"],
+            numeric,
+            {c: set(levels) for c, levels in payload["categories"].items()},
+            payload["n_rows"],
+            payload["last_client_id"],
+        )
+
+def save_stats(stats: PreprocessStats, path: str | Path) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def load_stats(path: str | Path) -> PreprocessStats | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return PreprocessStats.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,245 @@
+"""Recherche d'hyperparametres (grille ou tirage aleatoire) sur un pool de processus.
+
+La matrice de features est preparee une fois (instantane si disponible) puis
+copiee dans des segments de memoire partagee: chaque worker l'attache sans copie.
+Chaque essai s'arrete tot (patience) quand la perte de validation stagne; le
+classement (RMSE puis MAE) est ecrit dans leaderboard.json et le meilleur essai
+devient le contenu du run (model.pt, optimizer.pt, preprocessing.json...).
+"""
+from __future__ import annotations
+import itertools, json, math, multiprocessing, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Callable
+import numpy as np
+
+from .artifacts import ARTIFACTS_DIR
+
+# parametres explorables et valeurs par defaut (celles de POST /train)
+PARAMS: dict[str, type] = {"lr": float, "batch_size": int, "epochs": int, "patience": int}
+DEFAULTS: dict[str, Any] = {"lr": 1e-3, "batch_size": 256, "epochs": 25, "patience": 3}
+MAX_WORKERS = int(os.getenv("FASTIA_SWEEP_WORKERS", "0"))  # 0 = un par coeur
+THREADS_PER_WORKER = int(os.getenv("FASTIA_SWEEP_THREADS", "0"))  # 0 = coeurs / workers
+# essais au plus par balayage (grille comprise; SweepRequest.n_trials pour le mode random)
+MAX_TRIALS = 200
+
+TrialCallback = Callable[[dict, list[dict]], None]
+
+def _check_trial(trial: dict[str, Any]) -> None:
+    """Memes bornes que POST /train (TrainRequest); ValueError sinon."""
+    from pydantic import ValidationError
+    from ..schemas import TrainRequest
+
+    try:
+        TrainRequest(**trial)
+    except ValidationError as e:
+        details = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        raise ValueError(f"Essai invalide {trial}: {details}") from None
+
+def expand_space(space: dict[str, Any], mode: str = "grid", n_trials: int = 8, seed: int = 0) -> list[dict]:
+    """Liste d'essais. Valeur d'un parametre: liste de choix, ou (aleatoire seulement)
+    {"low", "high", "log"} pour un intervalle continu. Chaque essai respecte les
+    bornes de TrainRequest; au plus MAX_TRIALS essais."""
+    unknown = set(space) - PARAMS.keys()
+    if unknown:
+        raise ValueError(f"Parametre inconnu: {', '.join(sorted(unknown))}")
+    if mode == "grid":
+        if any(not isinstance(v, list) or not v for v in space.values()):
+            raise ValueError("En mode grid, chaque parametre est une liste de valeurs")
+        if math.prod(len(v) for v in space.values()) > MAX_TRIALS:
+            raise ValueError(f"Grille de plus de {MAX_TRIALS} essais")
+        names = list(space)
+        combos = itertools.product(*(space[n] for n in names))
+        trials = [dict(zip(names, values)) for values in combos]
+    elif mode == "random":
+        if n_trials > MAX_TRIALS:
+            raise ValueError(f"Plus de {MAX_TRIALS} essais")
+        for name, spec in space.items():
+            if isinstance(spec, list):
+                continue
+            if spec["low"] > spec["high"]:
+                raise ValueError(f"{name}: low > high")
+            if spec.get("log") and spec["low"] <= 0:
+                raise ValueError(f"{name}: intervalle log avec low <= 0")
+            # bornes de TrainRequest = intervalles: des extremites valides suffisent
+            for bound in (spec["low"], spec["high"]):
+                _check_trial({name: PARAMS[name](bound)})
+        rng = np.random.default_rng(seed)
+        trials = []
+        for _ in range(n_trials):
+            trial = {}
+            for name, spec in space.items():
+                if isinstance(spec, list):
+                    trial[name] = spec[rng.integers(len(spec))]
+                elif spec.get("log"):
+                    trial[name] = math.exp(rng.uniform(math.log(spec["low"]), math.log(spec["high"])))
+                else:
+                    trial[name] = rng.uniform(spec["low"], spec["high"])
+            trials.append(trial)
+    else:
+        raise ValueError(f"Mode inconnu: {mode}")
+    trials = [{name: PARAMS[name]({**DEFAULTS, **t}[name]) for name in PARAMS} for t in trials]
+    for trial in trials:
+        _check_trial(trial)
+    return trials
+
+def _share(a: np.ndarray) -> tuple[SharedMemory, dict]:
+    shm = SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+    return shm, {"name": shm.name, "shape": a.shape, "dtype": a.dtype.str}
+
+# etat d'un worker (rempli par _init_worker)
+_worker: dict[str, Any] = {}
+
+def _init_worker(specs: dict[str, dict], threads: int) -> None:
+    import torch
+
+    torch.set_num_threads(threads)
+    for key, spec in specs.items():
+        shm = SharedMemory(name=spec["name"])
+        _worker[f"{key}_shm"] = shm  # garder la reference: le buffer vit avec elle
+        _worker[key] = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=shm.buf)
+
+def _run_trial(trial_id: int, params: dict[str, Any], out_dir: Path) -> dict:
+    import torch
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    from .model import MLP
+    from .training import fit_model
+
+    t0 = time.perf_counter()
+    X, y, train_idx, val_idx = _worker["X"], _worker["y"], _worker["train_idx"], _worker["val_idx"]
+    torch.manual_seed(trial_id)
+    model = MLP(X.shape[1])
+    opt = torch.optim.Adam(model.parameters(), lr=params["lr"])
+    train_losses, val_losses, val_pred = fit_model(
+        model, X, y, train_idx, val_idx, params["epochs"], params["lr"], params["batch_size"],
+        opt=opt, patience=params["patience"],
+    )
+    y_val = y[val_idx]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    torch.save(model.state_dict(), out_dir / "model.pt")
+    torch.save(opt.state_dict(), out_dir / "optimizer.pt")
+    result = {
+        "trial": trial_id,
+        "params": params,
+        "MAE": float(mean_absolute_error(y_val, val_pred)),
+        "RMSE": float(np.sqrt(mean_squared_error(y_val, val_pred))),
+        "epochs_run": len(train_losses),
+        "seconds": time.perf_counter() - t0,
+    }
+    with open(out_dir / "metrics.json", "w", encoding="utf-8") as f:
+        json.dump({**result, "train_losses": train_losses, "val_losses": val_losses}, f, indent=2)
+    return result
+
+def _rank(results: list[dict]) -> list[dict]:
+    return sorted(results, key=lambda r: (r["RMSE"], r["MAE"]))
+
+def run_sweep(
+    space: dict[str, Any],
+    mode: str = "grid",
+    n_trials: int = 8,
+    seed: int = 0,
+    max_workers: int | None = None,
+    threads_per_worker: int | None = None,
+    out_dir: Path | None = None,
+    on_trial: TrialCallback | None = None,
+) -> dict:
+    """Execute le balayage; meme forme de resultat que train_from_db + leaderboard."""
+    import torch
+    from sklearn.model_selection import train_test_split
+    from .export import export_model
+    from .model import MLP
+    from .training import _load_training_data
+    from .preprocessing import save_artifacts
+    from .stats import STATS_FILE, save_stats
+
+    trials = expand_space(space, mode, n_trials, seed)
+    out_dir = Path(out_dir) if out_dir is not None else ARTIFACTS_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    fitted = _load_training_data()
+    if fitted is None:
+        return {"status":"error","n_rows_used":0,"metrics":{"error":"Base vide. Ingerer data-all.csv"},"artifacts":{},"leaderboard":[]}
+    X, y, prep, stats = fitted
+    n = len(y)
+    if n < 50:
+        return {"status":"error","n_rows_used":int(n),"metrics":{"error":"Pas assez de lignes avec score_credit"},"artifacts":{},"leaderboard":[]}
+    # meme partition que train_from_db: classement comparable aux runs simples
+    train_idx, val_idx = train_test_split(np.arange(n), test_size=0.2, random_state=42)
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(max_workers or MAX_WORKERS or cpus, len(trials)))
+    threads = threads_per_worker or THREADS_PER_WORKER or max(1, cpus // workers)
+
+    shared = {}
+    arrays = {
+        "X": np.ascontiguousarray(X, dtype=np.float32),
+        "y": np.ascontiguousarray(y, dtype=np.float32),
+        "train_idx": np.asarray(train_idx, dtype=np.int64),
+        "val_idx": np.asarray(val_idx, dtype=np.int64),
+    }
+    results: list[dict] = []
+    try:
+        for key, a in arrays.items():
+            shared[key] = _share(a)
+        del arrays
+        ctx = multiprocessing.get_context("spawn")
+        specs = {key: spec for key, (_, spec) in shared.items()}
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(specs, threads)) as pool:
+            futures = [pool.submit(_run_trial, i, t, out_dir / "trials" / f"{i:03d}") for i, t in enumerate(trials)]
+            for future in as_completed(futures):
+                results.append(future.result())
+                if on_trial is not None:
+                    on_trial(results[-1], _rank(results))
+    finally:
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+
+    leaderboard = _rank(results)
+    best = leaderboard[0]
+    best_dir = out_dir / "trials" / f"{best['trial']:03d}"
+    model_path, opt_path = out_dir / "model.pt", out_dir / "optimizer.pt"
+    # copie puis renommage: le serveur de prediction peut recharger a tout moment
+    for src, dst in ((best_dir / "model.pt", model_path), (best_dir / "optimizer.pt", opt_path)):
+        shutil.copyfile(src, dst.with_suffix(".pt.tmp"))
+        os.replace(dst.with_suffix(".pt.tmp"), dst)
+    for r in leaderboard[1:]:
+        # seuls les poids du meilleur essai sont conserves
+        for name in ("model.pt", "optimizer.pt"):
+            (out_dir / "trials" / f"{r['trial']:03d}" / name).unlink(missing_ok=True)
+
+    prep_path, stats_path = out_dir / "preprocessing.json", out_dir / STATS_FILE
+    metrics_path, leaderboard_path = out_dir / "metrics.json", out_dir / "leaderboard.json"
+    save_artifacts(prep, str(prep_path))
+    save_stats(stats, stats_path)
+    best_model = MLP(X.shape[1])
+    best_model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    exported = export_model(best_model, prep, out_dir)
+    metrics = {
+        "MAE": best["MAE"],
+        "RMSE": best["RMSE"],
+        "epochs": best["epochs_run"],
+        "n_features": int(X.shape[1]),
+        "mode": "sweep",
+        "best_trial": best["trial"],
+        "params": best["params"],
+        "n_trials": len(trials),
+        "workers": workers,
+        "threads_per_worker": threads,
+    }
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    with open(leaderboard_path, "w", encoding="utf-8") as f:
+        json.dump(leaderboard, f, ensure_ascii=False, indent=2)
+
+    return {"status":"ok","n_rows_used":int(n),"metrics":metrics,"leaderboard":leaderboard,"artifacts":{
+        "model": str(model_path),
+        "optimizer": str(opt_path),
+        "preprocessing": str(prep_path),
+        "preprocessing_stats": str(stats_path),
+        "metrics": str(metrics_path),
+        "leaderboard": str(leaderboard_path),
+        **{f"model_{fmt}": path for fmt, path in exported.items()},
+    }}
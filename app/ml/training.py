@@ -1,122 +1,352 @@
 from __future__ import annotations
-import json, os
+import json, os, warnings
 from pathlib import Path
-import matplotlib.pyplot as plt
+from typing import Callable
 import numpy as np
-import pandas as pd
 import torch
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 
-from ..database import SessionLocal
+from ..metrics import PhaseTimer
 from ..models import Client
-from .preprocessing import fit_transform, save_artifacts
+from . import feature_store, snapshot
+from .artifacts import ARTIFACTS_DIR, latest_dir
+from .export import export_model
+from .loader import FEATURE_COLUMNS, fetch_feature_frame, fetch_finetune_frame
+from .model import MLP
+from .preprocessing import extend_levels, fit_transform, load_artifacts, prepare_frame, save_artifacts, transform
+from .stats import STATS_FILE, PreprocessStats, load_stats, save_stats
 
-ARTIFACTS_DIR = Path(os.getenv("FASTIA_ARTIFACTS_DIR", "artifacts"))
-ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 TARGET_COL = "score_credit"
 
-class MLP(torch.nn.Module):
-    def __init__(self, in_dim: int):
-        super().__init__()
-        self.net = torch.nn.Sequential(
-            torch.nn.Linear(in_dim, 64),
-            torch.nn.ReLU(),
-            torch.nn.Linear(64, 32),
-            torch.nn.ReLU(),
-            torch.nn.Linear(32, 1),
-        )
-    def forward(self, x):
-        return self.net(x).squeeze(-1)
-
-def _fetch_df():
-    db = SessionLocal()
-    try:
-        rows = db.query(Client).all()
-        if not rows:
-            return pd.DataFrame()
-        data = []
-        for r in rows:
-            d = r.__dict__.copy()
-            d.pop("_sa_instance_state", None)
-            data.append(d)
-        return pd.DataFrame(data)
-    finally:
-        db.close()
-
-def train_from_db(epochs: int = 25, lr: float = 1e-3, batch_size: int = 256):
-    df = _fetch_df()
-    if df.empty:
-        return {"status":"error","n_rows_used":0,"metrics":{"error":"Base vide. Ingerer data-all.csv"},"artifacts":{}}
+EpochCallback = Callable[[int, float, float], None]
 
-    X, y, prep = fit_transform(df, TARGET_COL)
-    n = len(y)
-    if n < 50:
-        return {"status":"error","n_rows_used":int(n),"metrics":{"error":"Pas assez de lignes avec score_credit"},"artifacts":{}}
+# 0 = laisser torch choisir (un thread par coeur physique)
+TORCH_THREADS = int(os.getenv("FASTIA_TORCH_THREADS", "0"))
+# "": eager, "script": TorchScript, "compile": torch.compile
+MODEL_COMPILE = os.getenv("FASTIA_MODEL_COMPILE", "")
 
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+# fine-tuning: lignes recentes reprises en plus des nouvelles, taille du rejeu
+# d'anciennes lignes (contre l'oubli) et arret apres `patience` epoques sans gain
+FINETUNE_RECENT_ROWS = int(os.getenv("FASTIA_FINETUNE_RECENT_ROWS", "2000"))
+FINETUNE_REPLAY_RATIO = float(os.getenv("FASTIA_FINETUNE_REPLAY_RATIO", "1.0"))
+FINETUNE_REPLAY_MIN = int(os.getenv("FASTIA_FINETUNE_REPLAY_MIN", "2000"))
+FINETUNE_PATIENCE = int(os.getenv("FASTIA_FINETUNE_PATIENCE", "3"))
+OPTIMIZER_FILE = "optimizer.pt"
+# poids de la premiere couche: premier parametre du MLP (index 0 dans l'etat Adam)
+INPUT_LAYER = "net.0.weight"
 
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = MLP(X.shape[1]).to(device)
-    opt = torch.optim.Adam(model.parameters(), lr=lr)
-    loss_fn = torch.nn.MSELoss()
+def configure_threads(n: int = TORCH_THREADS) -> None:
+    if n > 0:
+        torch.set_num_threads(n)
+
+def _compiled(model: torch.nn.Module, mode: str | None = None):
+    mode = MODEL_COMPILE if mode is None else mode
+    if mode == "script":
+        return torch.jit.script(model)
+    if mode == "compile":
+        return torch.compile(model)
+    return model
+
+def _to_device(a: np.ndarray, device: str) -> torch.Tensor:
+    a = np.ascontiguousarray(a, dtype=np.float32)  # sans copie si deja float32 contigu
+    with warnings.catch_warnings():
+        # tableau en lecture seule (np.load mmap_mode="r"): jamais ecrit par l'entrainement
+        warnings.filterwarnings("ignore", message="The given NumPy array is not writable")
+        t = torch.from_numpy(a)
+    if device == "cuda":
+        t = t.pin_memory().to(device, non_blocking=True)
+    return t
 
-    def batches(Xa, ya):
-        idx = np.arange(len(ya))
-        np.random.shuffle(idx)
-        for i in range(0, len(idx), batch_size):
-            j = idx[i:i+batch_size]
-            yield Xa[j], ya[j]
+def fit_model(
+    model: MLP,
+    X: np.ndarray,
+    y: np.ndarray,
+    train_idx: np.ndarray,
+    val_idx: np.ndarray,
+    epochs: int,
+    lr: float,
+    batch_size: int,
+    device: str = "cpu",
+    on_epoch: EpochCallback | None = None,
+    opt: torch.optim.Optimizer | None = None,
+    patience: int | None = None,
+):
+    """Boucle d'entrainement: donnees chargees une fois en tenseurs, mini-lots
+    tires par index (torch.randperm), pertes accumulees sur le device et lues
+    une seule fois par epoque. X n'est pas copie (il peut etre memory-mappe): les
+    lignes des mini-lots sont lues via les index train_idx / val_idx.
 
+    Avec `patience`, arret apres autant d'epoques sans baisse de la perte de
+    validation et retour aux meilleurs poids."""
+    X_t, y_t = _to_device(X, device), _to_device(y, device)
+    train_t = torch.from_numpy(np.asarray(train_idx, dtype=np.int64)).to(device)
+    val_t = torch.from_numpy(np.asarray(val_idx, dtype=np.int64)).to(device)
+    X_val_t, y_val_t = X_t.index_select(0, val_t), y_t.index_select(0, val_t)
+    n = len(train_t)
+    n_batches = (n + batch_size - 1) // batch_size
+
+    forward = _compiled(model)
+    opt = opt or torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = torch.nn.MSELoss()
     train_losses, val_losses = [], []
-    X_val_t = torch.tensor(X_val, device=device)
-    y_val_t = torch.tensor(y_val, device=device)
+    best, best_state, stale = float("inf"), None, 0
 
-    for _ in range(epochs):
+    for epoch in range(epochs):
         model.train()
-        bl = []
-        for xb, yb in batches(X_train, y_train):
-            xb_t = torch.tensor(xb, device=device)
-            yb_t = torch.tensor(yb, device=device)
-            pred = model(xb_t)
-            loss = loss_fn(pred, yb_t)
-            opt.zero_grad()
+        perm = torch.randperm(n, device=device)
+        total = torch.zeros((), device=device)
+        for i in range(0, n, batch_size):
+            idx = train_t.index_select(0, perm[i:i + batch_size])
+            loss = loss_fn(forward(X_t.index_select(0, idx)), y_t.index_select(0, idx))
+            opt.zero_grad(set_to_none=True)
             loss.backward()
             opt.step()
-            bl.append(float(loss.detach().cpu().numpy()))
-        train_losses.append(float(np.mean(bl)))
+            total += loss.detach()
+        train_losses.append(total.item() / n_batches)
 
         model.eval()
+        # no_grad et non inference_mode: un module TorchScript garde en cache des
+        # tenseurs du dernier appel, qui ne doivent pas etre des "inference tensors"
         with torch.no_grad():
-            vpred = model(X_val_t)
-            val_losses.append(float(loss_fn(vpred, y_val_t).detach().cpu().numpy()))
+            val_losses.append(loss_fn(forward(X_val_t), y_val_t).item())
+        if on_epoch is not None:
+            on_epoch(epoch + 1, train_losses[-1], val_losses[-1])
+        if patience is not None:
+            if val_losses[-1] < best:
+                best, stale = val_losses[-1], 0
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+            else:
+                stale += 1
+                if stale >= patience:
+                    break
 
+    if best_state is not None:
+        model.load_state_dict(best_state)
     model.eval()
     with torch.no_grad():
-        val_pred = model(X_val_t).detach().cpu().numpy()
+        val_pred = forward(X_val_t).cpu().numpy()
+    return train_losses, val_losses, val_pred
+
+def fit_preprocessing(full_refit: bool = False, timer: PhaseTimer | None = None):
+    """(X, y, artefacts, statistiques a persister), ou None si la table est vide.
+
+    Si le dernier run a laisse ses statistiques, seules les lignes d'id superieur
+    a son filigrane sont integrees; la matrice vient alors du feature store s'il
+    couvre tous les clients. Sinon (ou full_refit) calcul exact sur la table brute."""
+    timer = timer or PhaseTimer()
+    columns = [Client.__table__.c.id, *FEATURE_COLUMNS]
+    stats = None if full_refit else load_stats(latest_dir() / STATS_FILE)
+    if stats is not None and feature_store.is_current():
+        try:
+            with timer.phase("fetch"):
+                new_rows = fetch_feature_frame(columns=columns, where=Client.id > stats.last_client_id)
+            with timer.phase("preprocess"):
+                stats.update(new_rows)
+                prep = stats.to_artifacts()
+            with timer.phase("fetch"):
+                _, X, y = feature_store.load_matrix(prep, labelled=True)
+            return X, y, prep, stats
+        except ValueError:
+            stats = None
+
+    with timer.phase("fetch"):
+        df = fetch_feature_frame(columns=columns)
+    if df.empty:
+        return None
+    with timer.phase("preprocess"):
+        if stats is not None:
+            try:
+                stats.update(df[df["id"] > stats.last_client_id])
+            except ValueError:
+                stats = None
+        if stats is None:
+            X, y, prep = fit_transform(df, TARGET_COL)
+            stats = PreprocessStats(TARGET_COL)
+            stats.update(df)
+            return X, y, prep, stats
+
+        prep = stats.to_artifacts()
+        Xdf, y, _, _ = prepare_frame(df, TARGET_COL)
+        return transform(Xdf, prep), y.astype(np.float32), prep, stats
+
+def _load_training_data(full_refit: bool = False, timer: PhaseTimer | None = None):
+    """fit_preprocessing() avec un instantane disque par etat des donnees source:
+    les runs suivants sur les memes lignes relisent X/y memory-mappes."""
+    timer = timer or PhaseTimer()
+    if not snapshot.SNAPSHOTS:
+        return fit_preprocessing(full_refit, timer)
+    with timer.phase("fetch"):
+        fingerprint = snapshot.source_fingerprint()
+        key = snapshot.snapshot_key(fingerprint, TARGET_COL)
+        hit = None if full_refit else snapshot.load(key)
+    if hit is not None:
+        return hit
+    fitted = fit_preprocessing(full_refit, timer)
+    if fitted is not None:
+        X, y, prep, stats = fitted
+        with timer.phase("snapshot"):
+            snapshot.save(key, X, y, prep, stats, {"fingerprint": fingerprint, "full_refit": full_refit})
+    return fitted
+
+def _expand_columns(t: torch.Tensor, src: torch.Tensor) -> torch.Tensor:
+    out = t.new_zeros((t.shape[0], len(src)))
+    keep = src >= 0
+    out[:, keep] = t[:, src[keep]]
+    return out
+
+def expand_input_layer(model_state: dict, opt_state: dict | None, old_names: list[str], new_names: list[str]):
+    """Reporte les colonnes de la premiere couche (et les moments Adam associes)
+    feature par feature; les nouvelles features partent de poids nuls, donc les
+    predictions ne changent pas avant le premier pas."""
+    pos = {name: i for i, name in enumerate(old_names)}
+    src = torch.tensor([pos.get(name, -1) for name in new_names], dtype=torch.long)
+    model_state = dict(model_state)
+    model_state[INPUT_LAYER] = _expand_columns(model_state[INPUT_LAYER], src)
+    state = (opt_state or {}).get("state", {}).get(0)
+    if state:
+        for key in ("exp_avg", "exp_avg_sq"):
+            state[key] = _expand_columns(state[key], src)
+    return model_state, opt_state
+
+def _previous_run(prev_dir: Path):
+    """(poids, etat Adam ou None, artefacts, statistiques) du dernier run, ou None."""
+    model_path, prep_path = prev_dir / "model.pt", prev_dir / "preprocessing.json"
+    stats = load_stats(prev_dir / STATS_FILE)
+    if stats is None or not model_path.exists() or not prep_path.exists():
+        return None
+    opt_path = prev_dir / OPTIMIZER_FILE
+    opt_state = torch.load(opt_path, map_location="cpu") if opt_path.exists() else None
+    return torch.load(model_path, map_location="cpu"), opt_state, load_artifacts(str(prep_path)), stats
+
+def _finetune_setup(previous, lr: float, device: str, timer: PhaseTimer):
+    """Donnees et modele d'un fine-tuning; None si le schema a change (entrainement complet)."""
+    model_state, opt_state, old_prep, stats = previous
+    watermark = stats.last_client_id
+    with timer.phase("fetch"):
+        df = fetch_finetune_frame(watermark, FINETUNE_RECENT_ROWS, FINETUNE_REPLAY_RATIO, FINETUNE_REPLAY_MIN)
+    with timer.phase("preprocess"):
+        try:
+            stats.update(df[df["id"] > watermark])
+        except ValueError:
+            return None
+        prep = extend_levels(old_prep, stats.categories)
+        Xdf, y, num_cols, _ = prepare_frame(df, TARGET_COL)
+        if num_cols != list(old_prep.num_means):
+            return None
+        X = transform(Xdf, prep)
+
+    with timer.phase("model_init"):
+        model_state, opt_state = expand_input_layer(model_state, opt_state, old_prep.feature_names, prep.feature_names)
+        model = MLP(len(prep.feature_names))
+        model.load_state_dict(model_state)
+        model.to(device)
+        opt = torch.optim.Adam(model.parameters(), lr=lr)
+        if opt_state is not None:
+            opt.load_state_dict(opt_state)
+            for group in opt.param_groups:
+                group["lr"] = lr
+    return X, y.astype(np.float32), prep, stats, model, opt
+
+def train_from_db(
+    epochs: int = 25,
+    lr: float = 1e-3,
+    batch_size: int = 256,
+    out_dir: Path | None = None,
+    on_epoch: EpochCallback | None = None,
+    full_refit: bool = False,
+    warm_start: bool = False,
+    patience: int | None = None,
+):
+    """Entrainement complet, ou fine-tuning du dernier modele (`warm_start`) sur les
+    clients ajoutes depuis, les plus recents et un echantillon de rejeu."""
+    # imports lourds seulement a l'entrainement (pas au chargement de l'API)
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+    from sklearn.model_selection import train_test_split
+
+    timer = PhaseTimer()
+    out_dir = Path(out_dir) if out_dir is not None else ARTIFACTS_DIR
+    out_dir.mkdir(parents=True, exist_ok=True)
+    configure_threads()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    setup = None
+    if warm_start and not full_refit:
+        with timer.phase("fetch"):
+            previous = _previous_run(latest_dir())
+        setup = _finetune_setup(previous, lr, device, timer) if previous is not None else None
+    if setup is not None:
+        mode = "finetune"
+        X, y, prep, stats, model, opt = setup
+        patience = patience or FINETUNE_PATIENCE
+    else:
+        mode = "full"
+        fitted = _load_training_data(full_refit, timer)
+        if fitted is None:
+            return {"status":"error","n_rows_used":0,"metrics":{"error":"Base vide. Ingerer data-all.csv"},"artifacts":{}}
+        X, y, prep, stats = fitted
+        # premier Adam du processus: importe torch._dynamo (plusieurs secondes)
+        with timer.phase("model_init"):
+            model = MLP(X.shape[1]).to(device)
+            opt = torch.optim.Adam(model.parameters(), lr=lr)
+
+    n = len(y)
+    if n < 50:
+        return {"status":"error","n_rows_used":int(n),"metrics":{"error":"Pas assez de lignes avec score_credit"},"artifacts":{}}
+
+    # meme partition que train_test_split(X, y, ...), sans copier X
+    train_idx, val_idx = train_test_split(np.arange(n), test_size=0.2, random_state=42)
+    y_val = y[val_idx]
+
+    with timer.phase("epochs"):
+        train_losses, val_losses, val_pred = fit_model(
+            model, X, y, train_idx, val_idx, epochs, lr, batch_size, device, on_epoch, opt, patience,
+        )
 
     mae = float(mean_absolute_error(y_val, val_pred))
     rmse = float(np.sqrt(mean_squared_error(y_val, val_pred)))
 
-    loss_path = ARTIFACTS_DIR / "loss_curve.png"
-    model_path = ARTIFACTS_DIR / "model.pt"
-    prep_path = ARTIFACTS_DIR / "preprocessing.json"
-    metrics_path = ARTIFACTS_DIR / "metrics.json"
-
-    plt.figure()
-    plt.plot(train_losses, label="train")
-    plt.plot(val_losses, label="val")
-    plt.xlabel("epoch")
-    plt.ylabel("MSE loss")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(loss_path)
-    plt.close()
-
-    torch.save(model.state_dict(), model_path)
-    save_artifacts(prep, str(prep_path))
-
-    metrics = {"MAE": mae, "RMSE": rmse, "epochs": epochs, "device": device, "n_features": int(X.shape[1])}
+    loss_path = out_dir / "loss_curve.png"
+    model_path = out_dir / "model.pt"
+    prep_path = out_dir / "preprocessing.json"
+    stats_path = out_dir / STATS_FILE
+    opt_path = out_dir / OPTIMIZER_FILE
+    metrics_path = out_dir / "metrics.json"
+
+    with timer.phase("plot"):
+        plt.figure()
+        plt.plot(train_losses, label="train")
+        plt.plot(val_losses, label="val")
+        plt.xlabel("epoch")
+        plt.ylabel("MSE loss")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(loss_path)
+        plt.close()
+
+    with timer.phase("save"):
+        # ecriture atomique: le serveur de prediction peut recharger a tout moment
+        tmp_model_path = model_path.with_suffix(".pt.tmp")
+        torch.save(model.state_dict(), tmp_model_path)
+        os.replace(tmp_model_path, model_path)
+        tmp_opt_path = opt_path.with_suffix(".pt.tmp")
+        torch.save(opt.state_dict(), tmp_opt_path)
+        os.replace(tmp_opt_path, opt_path)
+        save_artifacts(prep, str(prep_path))
+        save_stats(stats, stats_path)
+    with timer.phase("export"):
+        exported = export_model(model, prep, out_dir)
+
+    metrics = {
+        "MAE": mae,
+        "RMSE": rmse,
+        "epochs": len(train_losses),
+        "device": device,
+        "n_features": int(X.shape[1]),
+        "mode": mode,
+        # secondes par phase (fetch, preprocess, epochs, plot, save, export...) et total
+        "phases": timer.as_dict(),
+        "epoch_s": timer.phases["epochs"] / max(len(train_losses), 1),
+    }
     with open(metrics_path, "w", encoding="utf-8") as f:
         json.dump(metrics, f, ensure_ascii=False, indent=2)
 
@@ -124,5 +354,8 @@ def train_from_db(epochs: int = 25, lr: float = 1e-3, batch_size: int = 256):
         "loss_curve": str(loss_path),
         "model": str(model_path),
         "preprocessing": str(prep_path),
+        "preprocessing_stats": str(stats_path),
+        "optimizer": str(opt_path),
         "metrics": str(metrics_path),
+        **{f"model_{fmt}": path for fmt, path in exported.items()},
     }}
@@ -1,10 +1,18 @@
 from __future__ import annotations
-from sqlalchemy import Integer, Float, String, ForeignKey, UniqueConstraint
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, Float, LargeBinary, String, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # GET /clients/search: egalite puis ORDER BY id / curseur after_id sans tri
+        Index("ix_clients_region_id", "region", "id"),
+        Index("ix_clients_niveau_etude_id", "niveau_etude", "id"),
+        # GET /clients/stats: index couvrant (regroupements region, niveau_etude, tranche_age)
+        Index("ix_clients_segment_stats", "region", "niveau_etude", "age", "revenu_estime_mois", "score_credit"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -53,3 +61,32 @@ class ClientSensitive(Base):
     orientation_sexuelle: Mapped[str | None] = mapped_column(String(50), nullable=True)
 
     client: Mapped[Client] = relationship(back_populates="sensitive")
+
+class ClientFeatures(Base):
+    """Vecteur de features pre-calcule (voir app/ml/feature_store.py)."""
+    __tablename__ = "client_features"
+
+    client_id: Mapped[int] = mapped_column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    feature_version: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+    target: Mapped[float | None] = mapped_column(Float, nullable=True)
+    vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+class FeatureLevel(Base):
+    """Dictionnaire des modalites: code entier stable (ajout seulement) par (colonne, niveau)."""
+    __tablename__ = "feature_levels"
+    __table_args__ = (UniqueConstraint("column_name", "level", name="uq_feature_levels_column_level"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    column_name: Mapped[str] = mapped_column(String(80), nullable=False)
+    level: Mapped[str] = mapped_column(String(120), nullable=False)
+
+class ClientPrediction(Base):
+    """Dernier score calcule par le rescoring en masse (voir app/ml/rescore.py)."""
+    __tablename__ = "client_predictions"
+    __table_args__ = (Index("ix_client_predictions_model_version", "model_version", "client_id"),)
+
+    client_id: Mapped[int] = mapped_column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    model_version: Mapped[str] = mapped_column(String(40), nullable=False)
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    scored_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
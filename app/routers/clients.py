@@ -1,26 +1,182 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import csv, io, json
+from typing import Any, Literal, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from .. import crud
-from ..schemas import ClientCreate, ClientRead
+from ..cache import client_cache, stats_cache
+from ..models import Client
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from ..schemas import (
+    BulkCreateResponse, BulkDeleteRequest, BulkDeleteResponse, CacheStats, ClientCreate, ClientFilters, ClientRead,
+    ClientStats,
+)
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
+MAX_BULK_ITEMS = 10_000
+EXPORT_COLUMNS = [c.name for c in Client.__table__.columns]
+GroupBy = Literal[tuple(crud.STATS_GROUP_COLUMNS)]
+StatsField = Literal[tuple(crud.STATS_FIELDS)]
+DEFAULT_STATS_FIELDS = ["revenu_estime_mois", "score_credit"]
+MAX_GROUP_BY = 3
+
 @router.get("", response_model=list[ClientRead])
 def get_clients(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0, description="curseur: id du dernier client de la page precedente"),
+    db: Session = Depends(get_db),
+):
+    rows = crud.list_clients(db, skip=skip, limit=limit, after_id=after_id)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+def ndjson_lines(part) -> str:
+    return "".join(json.dumps(dict(r), ensure_ascii=False) + "\n" for r in part)
+
+def _export_ndjson(chunk_size: int):
+    db = SessionLocal()
+    try:
+        for part in crud.iter_clients(db, chunk_size):
+            yield ndjson_lines(part)
+    finally:
+        db.close()
+
+def _export_csv(chunk_size: int):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    db = SessionLocal()
+    try:
+        for part in crud.iter_clients(db, chunk_size):
+            writer.writerows(part)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    finally:
+        db.close()
+    if buf.tell():
+        yield buf.getvalue()
+
+def export_response(format: str, ndjson_stream, csv_stream) -> StreamingResponse:
+    if format == "csv":
+        return StreamingResponse(csv_stream, media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=clients.csv"})
+    return StreamingResponse(ndjson_stream, media_type="application/x-ndjson")
+
+@router.get("/export")
+def export_clients(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(5000, ge=100, le=100_000),
+):
+    # session propre au flux: elle doit vivre jusqu'a la fin de l'envoi
+    return export_response(format, _export_ndjson(chunk_size), _export_csv(chunk_size))
+
+def client_filters(
+    region: Optional[list[str]] = Query(None),
+    niveau_etude: Optional[list[str]] = Query(None),
+    situation_familiale: Optional[list[str]] = Query(None),
+    sexe: Optional[str] = None,
+    smoker: Optional[str] = None,
+    sport_licence: Optional[str] = None,
+    nationalite_francaise: Optional[str] = None,
+    age_min: Optional[int] = None,
+    age_max: Optional[int] = None,
+    revenu_min: Optional[int] = None,
+    revenu_max: Optional[int] = None,
+    score_min: Optional[float] = None,
+    score_max: Optional[float] = None,
+    nom: Optional[str] = Query(None, description="prefixe, sensible a la casse"),
+    prenom: Optional[str] = Query(None, description="prefixe, sensible a la casse"),
+) -> ClientFilters:
+    # bornes et coherence min <= max verifiees par le schema (422 comme la validation FastAPI)
+    try:
+        return ClientFilters.model_validate(locals())
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("query", *err["loc"])}
+                                      for err in e.errors(include_url=False, include_context=False)])
+
+@router.get("/search", response_model=list[ClientRead])
+def search_clients(
+    response: Response,
+    filters: ClientFilters = Depends(client_filters),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0, description="curseur: id du dernier client de la page precedente"),
+    db: Session = Depends(get_db),
+):
+    rows = crud.search_clients(db, filters, limit=limit, after_id=after_id)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+def stats_key(filters: ClientFilters, group_by: list[str], fields: list[str]) -> str:
+    f = {k: sorted(v) if isinstance(v, list) else v for k, v in filters.model_dump(exclude_none=True).items()}
+    return json.dumps({"filters": f, "group_by": group_by, "fields": sorted(fields)}, sort_keys=True)
+
+def stats_params(
+    group_by: list[GroupBy] = Query([], max_length=MAX_GROUP_BY),
+    fields: list[StatsField] = Query(DEFAULT_STATS_FIELDS, min_length=1),
+) -> tuple[list[str], list[str]]:
+    return list(dict.fromkeys(group_by)), list(dict.fromkeys(fields))
+
+@router.get("/stats", response_model=ClientStats)
+def get_clients_stats(
+    filters: ClientFilters = Depends(client_filters),
+    params: tuple[list[str], list[str]] = Depends(stats_params),
     db: Session = Depends(get_db),
 ):
-    return crud.list_clients(db, skip=skip, limit=limit)
+    # agregats en cache jusqu'a la prochaine ecriture (ou FASTIA_CACHE_TTL)
+    key = stats_key(filters, *params)
+    cached = stats_cache.get(key)
+    if cached is None:
+        cached = ClientStats.model_validate(crud.client_stats(db, filters, *params)).model_dump_json().encode()
+        stats_cache.set(key, cached)
+    return Response(content=cached, media_type="application/json")
+
+def validate_bulk(items: list[Any]) -> tuple[list[ClientCreate], list[dict]]:
+    """Valide chaque element separement: un element invalide n'annule pas le lot."""
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Maximum {MAX_BULK_ITEMS} clients par requete")
+    valid, errors = [], []
+    for i, item in enumerate(items):
+        try:
+            valid.append(ClientCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append({"index": i, "errors": json.loads(e.json(include_url=False))})
+    return valid, errors
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+def create_clients_bulk(items: list[Any] = Body(...), db: Session = Depends(get_db)):
+    valid, errors = validate_bulk(items)
+    return {"created_ids": crud.create_clients_bulk(db, valid), "errors": errors}
+
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+def remove_clients_bulk(payload: BulkDeleteRequest, db: Session = Depends(get_db)):
+    deleted = crud.delete_clients_bulk(db, payload.ids)
+    found = set(deleted)
+    return {"deleted_ids": deleted, "not_found": [i for i in dict.fromkeys(payload.ids) if i not in found]}
+
+@router.get("/cache/stats", response_model=CacheStats)
+def get_cache_stats():
+    return client_cache.stats()
 
 @router.get("/{client_id}", response_model=ClientRead)
 def get_client(client_id: int, db: Session = Depends(get_db)):
-    obj = crud.get_client(db, client_id)
-    if not obj:
-        raise HTTPException(status_code=404, detail="Client introuvable")
-    return obj
+    cached = client_cache.get(client_id)
+    if cached is None:
+        obj = crud.get_client(db, client_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Client introuvable")
+        cached = ClientRead.model_validate(obj).model_dump_json().encode()
+        client_cache.set(client_id, cached)
+    return Response(content=cached, media_type="application/json")
 
 @router.post("", response_model=ClientRead, status_code=status.HTTP_201_CREATED)
 def create_client(payload: ClientCreate, db: Session = Depends(get_db)):
@@ -0,0 +1,120 @@
+"""Routes /clients en `async def` sur AsyncSession (FASTIA_DB_ASYNC=1).
+
+Memes chemins, parametres et reponses que routers/clients.py.
+"""
+from __future__ import annotations
+import csv, io
+from typing import Any, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud_async
+from ..cache import client_cache, stats_cache
+from ..database import AsyncSessionLocal, get_async_db
+from ..schemas import (
+    BulkCreateResponse, BulkDeleteRequest, BulkDeleteResponse, CacheStats, ClientCreate, ClientFilters, ClientRead,
+    ClientStats,
+)
+from .clients import EXPORT_COLUMNS, client_filters, export_response, ndjson_lines, stats_key, stats_params, validate_bulk
+
+router = APIRouter(prefix="/clients", tags=["clients"])
+
+@router.get("", response_model=list[ClientRead])
+async def get_clients(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0, description="curseur: id du dernier client de la page precedente"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = await crud_async.list_clients(db, skip=skip, limit=limit, after_id=after_id)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+async def _export_ndjson(chunk_size: int):
+    async with AsyncSessionLocal() as db:
+        async for part in crud_async.iter_clients(db, chunk_size):
+            yield ndjson_lines(part)
+
+async def _export_csv(chunk_size: int):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async with AsyncSessionLocal() as db:
+        async for part in crud_async.iter_clients(db, chunk_size):
+            writer.writerows(part)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+@router.get("/export")
+async def export_clients(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(5000, ge=100, le=100_000),
+):
+    return export_response(format, _export_ndjson(chunk_size), _export_csv(chunk_size))
+
+@router.get("/search", response_model=list[ClientRead])
+async def search_clients(
+    response: Response,
+    filters: ClientFilters = Depends(client_filters),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = Query(None, ge=0, description="curseur: id du dernier client de la page precedente"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = await crud_async.search_clients(db, filters, limit=limit, after_id=after_id)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+@router.get("/stats", response_model=ClientStats)
+async def get_clients_stats(
+    filters: ClientFilters = Depends(client_filters),
+    params: tuple[list[str], list[str]] = Depends(stats_params),
+    db: AsyncSession = Depends(get_async_db),
+):
+    key = stats_key(filters, *params)
+    cached = stats_cache.get(key)
+    if cached is None:
+        cached = ClientStats.model_validate(await crud_async.client_stats(db, filters, *params)).model_dump_json().encode()
+        stats_cache.set(key, cached)
+    return Response(content=cached, media_type="application/json")
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_clients_bulk(items: list[Any] = Body(...), db: AsyncSession = Depends(get_async_db)):
+    valid, errors = validate_bulk(items)
+    return {"created_ids": await crud_async.create_clients_bulk(db, valid), "errors": errors}
+
+@router.delete("/bulk", response_model=BulkDeleteResponse)
+async def remove_clients_bulk(payload: BulkDeleteRequest, db: AsyncSession = Depends(get_async_db)):
+    deleted = await crud_async.delete_clients_bulk(db, payload.ids)
+    found = set(deleted)
+    return {"deleted_ids": deleted, "not_found": [i for i in dict.fromkeys(payload.ids) if i not in found]}
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def get_cache_stats():
+    return client_cache.stats()
+
+@router.get("/{client_id}", response_model=ClientRead)
+async def get_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
+    cached = client_cache.get(client_id)
+    if cached is None:
+        obj = await crud_async.get_client(db, client_id)
+        if not obj:
+            raise HTTPException(status_code=404, detail="Client introuvable")
+        cached = ClientRead.model_validate(obj).model_dump_json().encode()
+        client_cache.set(client_id, cached)
+    return Response(content=cached, media_type="application/json")
+
+@router.post("", response_model=ClientRead, status_code=status.HTTP_201_CREATED)
+async def create_client(payload: ClientCreate, db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_client(db, payload)
+
+@router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
+    ok = await crud_async.delete_client(db, client_id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Client introuvable")
+    return None
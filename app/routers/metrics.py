@@ -0,0 +1,46 @@
+from __future__ import annotations
+import json, time
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from .. import metrics
+from ..cache import client_cache
+from ..database import async_engine, engine
+from ..ml.artifacts import latest_dir, latest_run_id
+from ..schemas import MetricsRead, ProfileSummary
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def _training() -> dict | None:
+    # phases du dernier run promu (les entrainements tournent dans des processus du pool)
+    try:
+        with open(latest_dir() / "metrics.json", "r", encoding="utf-8") as f:
+            m = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return {"run_id": latest_run_id(), "mode": m.get("mode"), "epochs": m.get("epochs"), "phases": m.get("phases", {})}
+
+@router.get("", response_model=MetricsRead)
+def get_metrics():
+    return {
+        "uptime_s": time.time() - metrics.registry.started_at,
+        **metrics.registry.snapshot(),
+        "pool_status": (async_engine.sync_engine if async_engine is not None else engine).pool.status(),
+        "cache": client_cache.stats(),
+        "training": _training(),
+    }
+
+@router.delete("", status_code=status.HTTP_204_NO_CONTENT)
+def reset_metrics():
+    metrics.registry.reset()
+
+@router.get("/profiles", response_model=list[ProfileSummary])
+def list_profiles():
+    return metrics.list_profiles()
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+def get_profile(profile_id: str):
+    """Piles echantillonnees au format folded: `flamegraph.pl` ou speedscope."""
+    profile = metrics.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable (FASTIA_PROFILING=1 et en-tete X-Profile)")
+    return profile["folded"]
@@ -0,0 +1,35 @@
+from __future__ import annotations
+from fastapi import APIRouter, HTTPException, status
+from ..ml.artifacts import ModelNotReady
+from ..ml.batching import MicroBatcher
+from ..schemas import BatchPredictResponse, ClientCreate, PredictResponse
+
+router = APIRouter(prefix="/predict", tags=["ml"])
+
+def _predict_records(records: list[dict]):
+    # pandas, torch et modele charges au premier scoring, pas au demarrage de l'API
+    import pandas as pd
+    from ..ml.inference import predictor
+
+    return predictor.predict(pd.DataFrame(records))
+
+# requetes concurrentes regroupees en un transform + une passe avant
+batcher = MicroBatcher(_predict_records)
+
+async def _score(payloads: list[ClientCreate]):
+    try:
+        return await batcher.submit([p.model_dump() for p in payloads])
+    except ModelNotReady as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+@router.post("", response_model=PredictResponse)
+async def predict(payload: ClientCreate):
+    scores, version = await _score([payload])
+    return {"score": float(scores[0]), "model_version": version}
+
+@router.post("/batch", response_model=BatchPredictResponse)
+async def predict_batch(payloads: list[ClientCreate]):
+    if not payloads:
+        return {"scores": [], "model_version": None}
+    scores, version = await _score(payloads)
+    return {"scores": scores.tolist(), "model_version": version}
@@ -1,9 +1,65 @@
-from fastapi import APIRouter
-from ..ml.training import train_from_db
-from ..schemas import TrainResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status
+from ..ml.jobs import TrainJob, jobs
+from ..schemas import RescoreJobRead, RescoreRequest, SweepJobRead, SweepRequest, TrainJobRead, TrainRequest
 
 router = APIRouter(tags=["ml"])
 
-@router.post("/train", response_model=TrainResponse)
-def train():
-    return train_from_db()
+def _job_read(job: TrainJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "params": job.params,
+        "created_at": job.created_at,
+        "progress": job.progress(),
+        "result": job.result,
+        "error": job.error,
+    }
+
+@router.post("/train", response_model=TrainJobRead, status_code=status.HTTP_202_ACCEPTED)
+def train(payload: Optional[TrainRequest] = None):
+    params = (payload or TrainRequest()).model_dump()
+    return _job_read(jobs.submit(params))
+
+@router.post("/train/sweep", response_model=SweepJobRead, status_code=status.HTTP_202_ACCEPTED)
+def sweep(payload: Optional[SweepRequest] = None):
+    from ..ml.sweep import expand_space
+
+    params = (payload or SweepRequest()).model_dump()
+    try:
+        expand_space(params["space"], params["mode"], params["n_trials"], params["seed"])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _job_read(jobs.submit(params, kind="sweep"))
+
+@router.get("/train/sweep/{job_id}", response_model=SweepJobRead)
+def get_sweep_job(job_id: str):
+    job = jobs.get(job_id, kind="sweep")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return _job_read(job)
+
+@router.post("/rescore", response_model=RescoreJobRead, status_code=status.HTTP_202_ACCEPTED)
+def rescore(payload: Optional[RescoreRequest] = None):
+    from ..ml.inference import ModelNotReady, predictor
+
+    try:
+        predictor.current()
+    except ModelNotReady as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    params = (payload or RescoreRequest()).model_dump()
+    return _job_read(jobs.submit(params, kind="rescore"))
+
+@router.get("/rescore/{job_id}", response_model=RescoreJobRead)
+def get_rescore_job(job_id: str):
+    job = jobs.get(job_id, kind="rescore")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return _job_read(job)
+
+@router.get("/train/{job_id}", response_model=TrainJobRead)
+def get_train_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return _job_read(job)
@@ -1,6 +1,6 @@
 from __future__ import annotations
-from typing import Optional
-from pydantic import BaseModel, ConfigDict, Field
+from typing import Literal, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 class ClientCreate(BaseModel):
     nom: str
@@ -38,8 +38,200 @@ class ClientRead(ClientCreate):
     model_config = ConfigDict(from_attributes=True)
     id: int
 
+class ClientFilters(BaseModel):
+    """Filtres de GET /clients/search et /clients/stats (parametres de requete)."""
+    region: Optional[list[str]] = None
+    niveau_etude: Optional[list[str]] = None
+    situation_familiale: Optional[list[str]] = None
+    sexe: Optional[str] = None
+    smoker: Optional[str] = None
+    sport_licence: Optional[str] = None
+    nationalite_francaise: Optional[str] = None
+    age_min: Optional[int] = Field(None, ge=0, le=120)
+    age_max: Optional[int] = Field(None, ge=0, le=120)
+    revenu_min: Optional[int] = Field(None, ge=0)
+    revenu_max: Optional[int] = Field(None, ge=0)
+    score_min: Optional[float] = None
+    score_max: Optional[float] = None
+    # prefixes, sensibles a la casse (index nom / prenom)
+    nom: Optional[str] = Field(None, min_length=1, max_length=120)
+    prenom: Optional[str] = Field(None, min_length=1, max_length=120)
+
+    @model_validator(mode="after")
+    def _check_ranges(self):
+        for lo, hi in (("age_min", "age_max"), ("revenu_min", "revenu_max"), ("score_min", "score_max")):
+            if getattr(self, lo) is not None and getattr(self, hi) is not None and getattr(self, lo) > getattr(self, hi):
+                raise ValueError(f"{lo} doit etre inferieur ou egal a {hi}")
+        return self
+
+class FieldStats(BaseModel):
+    count: int
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class StatsGroup(BaseModel):
+    group: dict[str, Union[str, int, None]]
+    count: int
+    fields: dict[str, FieldStats]
+
+class ClientStats(BaseModel):
+    group_by: list[str]
+    total: int
+    groups: list[StatsGroup]
+
+class BulkItemError(BaseModel):
+    index: int
+    errors: list[dict]
+
+class BulkCreateResponse(BaseModel):
+    created_ids: list[int]
+    errors: list[BulkItemError]
+
+class BulkDeleteRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=10_000)
+
+class BulkDeleteResponse(BaseModel):
+    deleted_ids: list[int]
+    not_found: list[int]
+
+class CacheStats(BaseModel):
+    backend: str
+    hits: int
+    misses: int
+    hit_rate: float
+    size: Optional[int] = None
+
 class TrainResponse(BaseModel):
     status: str
     n_rows_used: int
     metrics: dict
     artifacts: dict
+
+class TrainRequest(BaseModel):
+    epochs: int = Field(25, ge=1, le=1000)
+    lr: float = Field(1e-3, gt=0, le=1.0)
+    batch_size: int = Field(256, ge=1, le=65536)
+    # recalcule les statistiques de pretraitement sur toute la table
+    full_refit: bool = False
+    # reprend le dernier modele sur les clients ajoutes depuis (+ recents et rejeu)
+    warm_start: bool = False
+    patience: Optional[int] = Field(None, ge=1, le=1000)
+
+class TrainProgress(BaseModel):
+    epoch: int
+    epochs: int
+    train_losses: list[float]
+    val_losses: list[float]
+
+class TrainJobRead(BaseModel):
+    job_id: str
+    status: str
+    params: dict
+    created_at: float
+    progress: Optional[TrainProgress] = None
+    result: Optional[TrainResponse] = None
+    error: Optional[str] = None
+
+class SweepRange(BaseModel):
+    low: float
+    high: float
+    log: bool = False
+
+class SweepRequest(BaseModel):
+    # parametres: lr, batch_size, epochs, patience; liste de valeurs ou intervalle (random)
+    space: dict[str, Union[list[float], SweepRange]] = Field(
+        default_factory=lambda: {"lr": [1e-3, 3e-3], "batch_size": [128, 256]}
+    )
+    mode: Literal["grid", "random"] = "grid"
+    n_trials: int = Field(8, ge=1, le=200)
+    seed: int = 0
+    max_workers: Optional[int] = Field(None, ge=1, le=64)
+    threads_per_worker: Optional[int] = Field(None, ge=1, le=64)
+
+class SweepResponse(TrainResponse):
+    leaderboard: list[dict]
+
+class SweepProgress(BaseModel):
+    trials_done: int
+    n_trials: int
+    best: Optional[dict] = None
+
+class SweepJobRead(BaseModel):
+    job_id: str
+    status: str
+    params: dict
+    created_at: float
+    progress: Optional[SweepProgress] = None
+    result: Optional[SweepResponse] = None
+    error: Optional[str] = None
+
+class RescoreRequest(BaseModel):
+    chunk_size: int = Field(20_000, ge=100, le=1_000_000)
+    max_workers: Optional[int] = Field(None, ge=1, le=64)
+    # ignorer les tranches deja ecrites pour la version courante
+    full: bool = False
+
+class RescoreResponse(BaseModel):
+    status: str
+    model_version: str
+    resumed_after: int
+    n_chunks: int
+    n_rows: int
+    workers: int
+    source: str
+    seconds: float
+    rows_per_s: Optional[float] = None
+
+class RescoreProgress(BaseModel):
+    chunks_done: int
+    n_chunks: int
+
+class RescoreJobRead(BaseModel):
+    job_id: str
+    status: str
+    params: dict
+    created_at: float
+    progress: Optional[RescoreProgress] = None
+    result: Optional[RescoreResponse] = None
+    error: Optional[str] = None
+
+class PredictResponse(BaseModel):
+    score: float
+    model_version: str
+
+class BatchPredictResponse(BaseModel):
+    scores: list[float]
+    model_version: Optional[str] = None
+
+class LatencyStats(BaseModel):
+    count: int = 0
+    mean_ms: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+
+class TrainingMetrics(BaseModel):
+    run_id: Optional[str] = None
+    mode: Optional[str] = None
+    epochs: Optional[int] = None
+    phases: dict[str, float] = {}
+
+class MetricsRead(BaseModel):
+    uptime_s: float
+    http: dict[str, LatencyStats]
+    sql: dict[str, LatencyStats]
+    pool: dict[str, LatencyStats]
+    pool_status: Optional[str] = None
+    cache: CacheStats
+    training: Optional[TrainingMetrics] = None
+
+class ProfileSummary(BaseModel):
+    id: str
+    route: str
+    status: int
+    duration_ms: float
+    samples: int
+    interval_ms: float
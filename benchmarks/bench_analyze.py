@@ -0,0 +1,99 @@
+"""Benchmark: profilage en flux (scripts/analyze_data_all.py) contre un pd.read_csv complet.
+
+CSV synthetiques (benchmarks/synthetic.py) de tailles croissantes; chaque mesure
+dans un processus neuf (pic de memoire: VmHWM de /proc/self/status, workers
+compris pour le profilage). Compteurs (lignes, manquants, anomalies) compares a
+la lecture complete, medianes a la mediane exacte (erreur de rang).
+
+Usage:
+    python -m benchmarks.bench_analyze --rows 100000 1000000 [--workers 1 2]
+"""
+from __future__ import annotations
+import argparse, json, os, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _peak_mib() -> float:
+    with open("/proc/self/status", encoding="utf-8") as f:
+        kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+    return kb / 1024
+
+def _children_peak_mib() -> float:
+    import resource
+
+    # ru_maxrss des workers termines (Ko sous Linux): le plus gros d'entre eux
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+def _child_full(path: Path) -> dict:
+    import pandas as pd
+    from app.ml.preprocessing import ANOMALY_COLS
+
+    t0 = time.perf_counter()
+    df = pd.read_csv(path)
+    out = {"seconds": 0.0, "n_rows": len(df), "missing": {c: int(v) for c, v in df.isna().sum().items()},
+           "negative": {c: int((df[c] < 0).sum()) for c in ANOMALY_COLS}}
+    out["medians"] = {c: float(df[c].where(df[c] >= 0).median()) if c in ANOMALY_COLS else float(df[c].median())
+                      for c in ("age", "revenu_estime_mois", "quotient_caf", "score_credit")}
+    out["seconds"] = time.perf_counter() - t0
+    out["peak_mib"] = _peak_mib()
+    return out
+
+def _child_stream(path: Path, workers: int) -> dict:
+    from scripts.analyze_data_all import profile_file
+
+    report = profile_file(path, workers=workers)
+    cols = report["columns"]
+    return {"seconds": report["seconds"], "n_rows": report["n_rows"], "workers": report["workers"],
+            "missing": {c: p["n_missing"] for c, p in cols.items()},
+            "negative": {c: p["n_negative"] for c, p in cols.items() if "n_negative" in p},
+            "medians": {c: cols[c]["quantiles"]["0.5"] for c in ("age", "revenu_estime_mois", "quotient_caf", "score_credit")},
+            "peak_mib": max(_peak_mib(), _children_peak_mib())}
+
+def _run(*args: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    out = subprocess.run([sys.executable, "-m", "benchmarks.bench_analyze", "--child", *args], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def _rank(path: Path, column: str, value: float) -> float:
+    import pandas as pd
+
+    s = pd.read_csv(path, usecols=[column])[column]
+    s = s[s >= 0]  # valeurs valides: sans manquants ni anomalies negatives
+    return float((s <= value).mean())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--child", nargs="+", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        kind, path = args.child[0], Path(args.child[1])
+        print(json.dumps(_child_full(path) if kind == "full" else _child_stream(path, int(args.child[2]))))
+        return
+
+    from .synthetic import write_csv
+
+    tmp = Path(tempfile.mkdtemp(prefix="fastia-analyze-"))
+    print(f"{'lignes':>10} {'Mio':>7} {'mode':<16} {'temps (s)':>10} {'pic (Mio)':>10}  verification")
+    for rows in args.rows:
+        path = write_csv(tmp / f"data-{rows}.csv", rows, seed=1)
+        size = path.stat().st_size / 2 ** 20
+        full = _run("full", str(path))
+        print(f"{rows:>10} {size:7.0f} {'read_csv complet':<16} {full['seconds']:10.2f} {full['peak_mib']:10.0f}")
+        for workers in args.workers:
+            stream = _run("stream", str(path), str(workers))
+            same = (stream["n_rows"] == full["n_rows"] and stream["missing"] == full["missing"]
+                    and stream["negative"] == full["negative"])
+            # rang de la mediane estimee dans les donnees (0.5 si exacte)
+            ranks = {c: _rank(path, c, v) for c, v in stream["medians"].items()}
+            worst = max(abs(r - 0.5) for r in ranks.values())
+            label = f"flux, {stream['workers']} worker(s)"
+            print(f"{rows:>10} {size:7.0f} {label:<16} "
+                  f"{stream['seconds']:10.2f} {stream['peak_mib']:10.0f}  compteurs {'identiques' if same else 'DIFFERENTS'}, "
+                  f"ecart de rang des medianes {worst * 100:.2f} %")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark de charge: routes /clients sync (threadpool) vs async (AsyncSession).
+
+Lance un serveur uvicorn par mode (FASTIA_DB_ASYNC=0/1) sur une base SQLite
+synthetique, puis envoie des GET /clients/{id} et des pages keyset avec N
+requetes concurrentes.
+
+Usage:
+    python -m benchmarks.bench_async_load --rows 100000 --concurrency 16 64 256 --seconds 10
+"""
+from __future__ import annotations
+import argparse, asyncio, os, random, subprocess, sys, tempfile, time
+from pathlib import Path
+import httpx
+import numpy as np
+
+from .common import build_sqlite_db
+
+async def _wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                await client.get("/clients?limit=1")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"serveur {base_url} indisponible")
+
+async def _load(base_url: str, n_rows: int, concurrency: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    stop = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def user(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < stop:
+                if rng.random() < 0.8:
+                    url = f"/clients/{rng.randint(1, n_rows)}"
+                else:
+                    url = f"/clients?after_id={rng.randint(0, n_rows)}&limit=50"
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(url)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    return {
+        "rps": len(latencies) / seconds,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1e3,
+        "errors": errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        build_sqlite_db(db_path, args.rows).dispose()
+        for mode in ["0", "1"]:
+            env = dict(os.environ, FASTIA_DB_URL=f"sqlite:///{db_path}", FASTIA_DB_ASYNC=mode,
+                       FASTIA_ARTIFACTS_DIR=str(Path(tmp) / "artifacts"))
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+                env=env,
+            )
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                asyncio.run(_wait_ready(base_url))
+                for c in args.concurrency:
+                    r = asyncio.run(_load(base_url, args.rows, c, args.seconds))
+                    label = "async" if mode == "1" else "sync/threadpool"
+                    print(f"{label:16s} concurrency={c:4d} req/s={r['rps']:8.0f} p50={r['p50_ms']:7.1f} ms "
+                          f"p99={r['p99_ms']:7.1f} ms errors={r['errors']}")
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main()
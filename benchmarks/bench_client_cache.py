@@ -0,0 +1,62 @@
+"""Benchmark: GET /clients/{id} avec et sans cache, acces zipfien.
+
+Appelle directement le handler de la route (session neuve par requete, comme
+en production) pour isoler base + serialisation du cout HTTP.
+
+Usage:
+    python -m benchmarks.bench_client_cache --rows 100000 --requests 50000 --zipf 1.2
+"""
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.cache import Cache, LocalTTLCache, NullCache
+from app.routers import clients as clients_router
+from .common import build_sqlite_db
+
+def run(Session, ids: np.ndarray, cache: Cache) -> tuple[float, np.ndarray]:
+    clients_router.client_cache = cache
+    latencies = np.empty(len(ids))
+    t_start = time.perf_counter()
+    for i, client_id in enumerate(ids.tolist()):
+        t0 = time.perf_counter()
+        with Session() as db:
+            clients_router.get_client(client_id, db)
+        latencies[i] = time.perf_counter() - t0
+    return time.perf_counter() - t_start, latencies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--zipf", type=float, default=1.2, help="exposant de la loi de Zipf (> 1)")
+    parser.add_argument("--max-entries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ranks = rng.zipf(args.zipf, size=args.requests * 2)
+    ranks = ranks[ranks <= args.rows][:args.requests]
+    # rang -> id: les clients "chauds" sont disperses dans la table
+    ids = rng.permutation(args.rows)[ranks - 1] + 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_sqlite_db(Path(tmp) / "bench.db", args.rows)
+        Session = sessionmaker(bind=engine, autoflush=False, future=True)
+        original = clients_router.client_cache
+        try:
+            for label, cache in [
+                ("sans cache", Cache(NullCache(), "bench")),
+                ("cache local", Cache(LocalTTLCache(args.max_entries, ttl=3600), "bench")),
+            ]:
+                elapsed, lat = run(Session, ids, cache)
+                s = cache.stats()
+                print(f"{label:12s} req/s={len(ids) / elapsed:9.0f} p50={np.percentile(lat, 50) * 1e3:6.3f} ms "
+                      f"p99={np.percentile(lat, 99) * 1e3:6.3f} ms hit_rate={s['hit_rate']:.3f}")
+        finally:
+            clients_router.client_cache = original
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
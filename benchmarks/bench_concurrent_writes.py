@@ -0,0 +1,113 @@
+"""Benchmark / verification: ecritures concurrentes sur POST /clients/bulk et POST /clients.
+
+Lance un serveur uvicorn par mode (FASTIA_DB_ASYNC=0/1) sur une base SQLite
+synthetique; N ecrivains envoient chacun M lots en parallele (plus des creations
+unitaires). Echec (code 1) si une reponse est en 5xx, si des ids sont attribues
+deux fois ou si le nombre de clients en base ne correspond pas.
+
+Usage:
+    python -m benchmarks.bench_concurrent_writes --writers 8 --batches 10 --batch-size 50
+"""
+from __future__ import annotations
+import argparse, asyncio, math, os, subprocess, sys, tempfile, time
+from collections import Counter
+from pathlib import Path
+import httpx
+import numpy as np
+
+from .bench_async_load import _wait_ready
+from .common import build_sqlite_db
+
+def _payload(n: int, seed: int) -> list[dict]:
+    from app.schemas import ClientCreate
+    from scripts.ingest_data_all import _normalize
+    from .synthetic import generate
+
+    df = _normalize(generate(n, seed))
+    keep = [c for c in df.columns if c in ClientCreate.model_fields]
+    return [{k: None if isinstance(v, float) and math.isnan(v) else v for k, v in r.items()}
+            for r in df[keep].to_dict("records")]
+
+async def _write(base_url: str, writers: int, batches: int, batch: list[dict]) -> dict:
+    statuses: Counter = Counter()
+    ids: list[int] = []
+    latencies: list[float] = []
+    limits = httpx.Limits(max_connections=writers * 2)
+
+    async def _post(client: httpx.AsyncClient, url: str, body) -> httpx.Response | None:
+        try:
+            r = await client.post(url, json=body)
+        except httpx.TransportError:
+            statuses[599] += 1  # connexion coupee par le serveur: comptee en 5xx
+            return None
+        statuses[r.status_code] += 1
+        return r
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def writer(k: int):
+            for i in range(batches):
+                t0 = time.perf_counter()
+                r = await _post(client, "/clients/bulk", batch)
+                latencies.append(time.perf_counter() - t0)
+                if r is not None and r.status_code == 200:
+                    ids.extend(r.json()["created_ids"])
+                # creation unitaire (id attribue par SQLite) intercalee avec les lots
+                r = await _post(client, "/clients", batch[(k + i) % len(batch)])
+                if r is not None and r.status_code < 300:
+                    ids.append(r.json()["id"])
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(writer(k) for k in range(writers)))
+        seconds = time.perf_counter() - t0
+    return {"statuses": dict(statuses), "ids": ids, "seconds": seconds,
+            "p50_ms": float(np.percentile(latencies, 50)) * 1e3, "p99_ms": float(np.percentile(latencies, 99)) * 1e3}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    batch = _payload(args.batch_size, seed=3)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        for mode in ["0", "1"]:
+            engine = build_sqlite_db(db_path, args.rows, synthetic=True)
+            engine.dispose()
+            env = dict(os.environ, FASTIA_DB_URL=f"sqlite:///{db_path}", FASTIA_DB_ASYNC=mode,
+                       FASTIA_ARTIFACTS_DIR=str(Path(tmp) / "artifacts"))
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+                env=env,
+            )
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                asyncio.run(_wait_ready(base_url))
+                r = asyncio.run(_write(base_url, args.writers, args.batches, batch))
+            finally:
+                server.terminate()
+                server.wait()
+
+            from sqlalchemy import create_engine, text
+
+            engine = create_engine(f"sqlite:///{db_path}")
+            with engine.connect() as conn:
+                n_clients = conn.execute(text("SELECT count(*) FROM clients")).scalar_one()
+            engine.dispose()
+            server_errors = sum(n for s, n in r["statuses"].items() if s >= 500)
+            duplicates = len(r["ids"]) - len(set(r["ids"]))
+            ok = server_errors == 0 and duplicates == 0 and n_clients == args.rows + len(r["ids"])
+            failed |= not ok
+            label = "async" if mode == "1" else "sync/threadpool"
+            print(f"{label:16s} writers={args.writers} lots={args.writers * args.batches} "
+                  f"statuts={dict(sorted(r['statuses'].items()))} 5xx={server_errors} ids en double={duplicates} "
+                  f"clients={n_clients} (attendu {args.rows + len(r['ids'])}) "
+                  f"lot p50={r['p50_ms']:.0f} ms p99={r['p99_ms']:.0f} ms  {'OK' if ok else 'ECHEC'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
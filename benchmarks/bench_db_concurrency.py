@@ -0,0 +1,105 @@
+"""Benchmark: lectures/ecritures concurrentes selon le profil du moteur SQLite.
+
+Des threads lecteurs (GET par id + page keyset) tournent pendant que des
+threads ecrivains inserent un client par transaction. Chaque profil part
+d'une copie fraiche de la meme base (le journal_mode WAL est persistant).
+
+Usage:
+    python -m benchmarks.bench_db_concurrency --rows 200000 --readers 8 --writers 2 --seconds 10
+"""
+from __future__ import annotations
+import argparse, random, shutil, tempfile, threading, time
+from pathlib import Path
+import numpy as np
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import create_db_engine
+from app.schemas import ClientCreate
+from .common import build_sqlite_db
+
+NEW_CLIENT = ClientCreate(
+    nom="Bench", prenom="Client", age=40, sexe="F", sport_licence="non", niveau_etude="bac",
+    region="Bretagne", smoker="non", nationalite_francaise="oui", revenu_estime_mois=2500,
+    risque_personnel=0.3, date_creation_compte="2024-01-01",
+)
+
+def run_profile(db_path: Path, profile: str, n_rows: int, readers: int, writers: int, seconds: float) -> dict:
+    engine = create_db_engine(f"sqlite:///{db_path}", profile)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+    stop = time.perf_counter() + seconds
+    read_lat, write_lat, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        local = []
+        with Session() as db:
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    crud.get_client(db, rng.randint(1, n_rows))
+                    crud.list_clients(db, after_id=rng.randint(0, n_rows), limit=50)
+                    db.rollback()
+                    db.expunge_all()
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+                local.append(time.perf_counter() - t0)
+        with lock:
+            read_lat.extend(local)
+
+    def writer():
+        local = []
+        with Session() as db:
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    crud.create_client(db, NEW_CLIENT)
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+                local.append(time.perf_counter() - t0)
+        with lock:
+            write_lat.extend(local)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    def p99(values):
+        return float(np.percentile(values, 99)) * 1e3 if values else float("nan")
+
+    return {
+        "reads_per_s": len(read_lat) / seconds, "read_p99_ms": p99(read_lat),
+        "writes_per_s": len(write_lat) / seconds, "write_p99_ms": p99(write_lat),
+        "errors": errors[0],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = Path(tmp) / "template.db"
+        build_sqlite_db(template, args.rows).dispose()
+        for profile in ["legacy", "production"]:
+            db_path = Path(tmp) / f"{profile}.db"
+            shutil.copy(template, db_path)
+            r = run_profile(db_path, profile, args.rows, args.readers, args.writers, args.seconds)
+            print(f"{profile:11s} reads/s={r['reads_per_s']:9.0f} read_p99={r['read_p99_ms']:8.2f} ms  "
+                  f"writes/s={r['writes_per_s']:7.0f} write_p99={r['write_p99_ms']:8.2f} ms  errors={r['errors']}")
+
+if __name__ == "__main__":
+    main()
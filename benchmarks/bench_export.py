@@ -0,0 +1,129 @@
+"""Benchmark: variantes d'artefact d'inference (app/ml/export.py).
+
+Pour chaque variante (torch eager + model.pt, TorchScript, TorchScript int8,
+NumPy model.npz, ONNX si onnxruntime est installe): latence de scoring par
+taille de lot, ecart aux scores eager, et dans un processus neuf le temps de
+demarrage (imports + chargement + premier score) et le pic de RSS.
+
+Usage:
+    python -m benchmarks.bench_export --rows 20000 --epochs 3
+"""
+from __future__ import annotations
+import argparse, json, os, subprocess, sys, tempfile, time
+from pathlib import Path
+
+TMP = Path(os.environ.get("FASTIA_BENCH_TMP") or tempfile.mkdtemp(prefix="fastia-export-"))
+os.environ["FASTIA_BENCH_TMP"] = str(TMP)
+# avant tout import de app: moteur et dossier d'artefacts lus a l'import
+os.environ["FASTIA_DB_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["FASTIA_ARTIFACTS_DIR"] = str(TMP / "artifacts")
+
+VARIANTS = ["eager", "torchscript", "int8", "numpy", "onnx"]
+# cle de train_from_db()["artifacts"] par variante
+KEYS = {"eager": "model", "torchscript": "model_torchscript", "int8": "model_int8", "numpy": "model_npz", "onnx": "model_onnx"}
+
+def _records(n: int) -> list[dict]:
+    import sqlite3
+
+    with sqlite3.connect(TMP / "bench.db") as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(r) for r in conn.execute("SELECT * FROM clients ORDER BY id LIMIT ?", (n,))]
+
+def _scorer(variant: str):
+    """Fonction records -> scores; n'importe que ce que la variante exige."""
+    art = TMP / "artifacts"
+    if variant in ("numpy", "onnx"):
+        from app.ml import portable
+
+        model = portable.load(art / ("model.npz" if variant == "numpy" else "model.onnx"))
+        return model.predict
+    import torch
+    if variant == "eager":
+        import pandas as pd
+        from app.ml.inference import load_model
+
+        state = load_model(art)
+        def score(records):
+            from app.ml.preprocessing import transform
+            with torch.inference_mode():
+                return state.model(torch.from_numpy(transform(pd.DataFrame(records), state.artifacts))).numpy()
+        return score
+    from app.ml import portable
+
+    extra = {"preprocessing.json": ""}
+    module = torch.jit.load(str(art / ("model.ts" if variant == "torchscript" else "model_int8.ts")), _extra_files=extra)
+    # meme pretraitement NumPy que le scorer portable (spec embarquee)
+    prep = portable.PortableModel(json.loads(extra["preprocessing.json"]), None, variant)
+    def score(records):
+        with torch.inference_mode():
+            return module(torch.from_numpy(prep.transform(records))).numpy()
+    return score
+
+def _peak_rss_mib() -> float:
+    # VmHWM: pic du processus courant (ru_maxrss peut refleter celui du parent)
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _child(variant: str) -> None:
+    t0 = time.perf_counter()
+    score = _scorer(variant)
+    score(_records(1))
+    startup = time.perf_counter() - t0
+    print(json.dumps({"startup_s": startup, "max_rss_mib": _peak_rss_mib()}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--child", default=None)
+    args = parser.parse_args()
+    if args.child:
+        return _child(args.child)
+
+    import numpy as np
+    from app.ml.training import train_from_db
+    from .common import build_sqlite_db
+
+    build_sqlite_db(TMP / "bench.db", args.rows).dispose()
+    exported = train_from_db(epochs=args.epochs)["artifacts"]
+    variants = [v for v in VARIANTS if KEYS[v] in exported]
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        variants = [v for v in variants if v != "onnx"]
+    skipped = sorted(set(VARIANTS) - set(variants))
+    for v in variants:
+        print(f"{v:<12} {Path(exported[KEYS[v]]).stat().st_size / 1024:8.0f} Kio")
+
+    records = _records(2048)
+    scorers = {v: _scorer(v) for v in variants}
+    reference = scorers["eager"](records)
+    print(f"\n{'variante':<12} {'1 ligne':>10} {'64 lignes':>10} {'2048 lignes':>12} {'ecart max':>10} {'ecart moy':>10} {'relatif':>9}")
+    for v, score in scorers.items():
+        timings = []
+        for n in (1, 64, 2048):
+            batch = records[:n]
+            score(batch)
+            reps = max(3, 2000 // n)
+            t0 = time.perf_counter()
+            for _ in range(reps):
+                score(batch)
+            timings.append((time.perf_counter() - t0) / reps * 1e3)
+        drift = np.abs(score(records) - reference)
+        print(f"{v:<12} {timings[0]:8.3f}ms {timings[1]:8.3f}ms {timings[2]:10.3f}ms {drift.max():10.2e} {drift.mean():10.2e} {drift.mean() / np.abs(reference).mean():9.1e}")
+
+    print(f"\n{'variante':<12} {'demarrage':>10} {'RSS max':>10}  (processus neuf)")
+    for v in variants:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--child", v],
+                             capture_output=True, text=True, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{v:<12} {r['startup_s']:9.2f}s {r['max_rss_mib']:8.0f}Mio")
+    if skipped:
+        print(f"\nnon disponibles ici: {', '.join(skipped)}")
+
+if __name__ == "__main__":
+    main()
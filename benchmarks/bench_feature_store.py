@@ -0,0 +1,51 @@
+"""Benchmark: matrice d'entrainement depuis la table brute (fetch + nettoyage des
+chaines + encodage) vs depuis le feature store (BLOBs + standardisation).
+
+Usage:
+    python -m benchmarks.bench_feature_store --rows 200000
+"""
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+import numpy as np
+
+from app.ml import feature_store
+from app.ml.loader import FEATURE_COLUMNS, fetch_feature_frame
+from app.ml.preprocessing import fit_transform, prepare_frame, transform
+from app.models import Client
+from .common import build_sqlite_db, timeit
+
+TARGET_COL = "score_credit"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_sqlite_db(Path(tmp) / "bench.db", args.rows)
+        columns = [Client.__table__.c.id, *FEATURE_COLUMNS]
+        t0 = time.perf_counter()
+        n = feature_store.rebuild(engine)
+        build = time.perf_counter() - t0
+        print(f"rebuild: {n} lignes en {build:.2f} s ({n / build:,.0f} lignes/s, cout d'ecriture a l'ingestion)")
+
+        _, _, prep = fit_transform(fetch_feature_frame(engine, columns=columns), TARGET_COL)
+
+        def raw():
+            Xdf, y, _, _ = prepare_frame(fetch_feature_frame(engine, columns=columns), TARGET_COL)
+            return transform(Xdf, prep), y
+
+        def store():
+            _, X, y = feature_store.load_matrix(prep, engine, labelled=True)
+            return X, y
+
+        X_raw, y_raw = raw()
+        X_store, y_store = store()
+        assert np.array_equal(X_raw, X_store) and np.array_equal(y_raw.astype(np.float32), y_store)
+        t_raw, t_store = timeit(raw, args.repeat), timeit(store, args.repeat)
+        print(f"matrice {X_raw.shape}: table brute {t_raw:.2f} s  feature store {t_store:.2f} s  x{t_raw / t_store:.1f}")
+
+if __name__ == "__main__":
+    main()
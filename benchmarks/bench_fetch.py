@@ -0,0 +1,60 @@
+"""Benchmark: lecture de la table clients pour l'entrainement.
+
+Compare l'ancien chemin ORM (`query(Client).all()` + `__dict__` + DataFrame)
+a `fetch_feature_frame` (curseur Core par tranches vers buffers NumPy).
+Rapporte lignes/s et pic memoire Python (tracemalloc, run separe).
+
+Usage:
+    python -m benchmarks.bench_fetch --rows 500000
+"""
+from __future__ import annotations
+import argparse, tempfile, time, tracemalloc
+from pathlib import Path
+import pandas as pd
+from sqlalchemy.orm import sessionmaker
+
+from app.ml.loader import fetch_feature_frame
+from app.models import Client
+from .common import build_sqlite_db
+
+def legacy_fetch(engine) -> pd.DataFrame:
+    db = sessionmaker(bind=engine, future=True)()
+    try:
+        data = []
+        for r in db.query(Client).all():
+            d = r.__dict__.copy()
+            d.pop("_sa_instance_state", None)
+            data.append(d)
+        return pd.DataFrame(data)
+    finally:
+        db.close()
+
+def measure(fn):
+    # tracemalloc ralentit fortement les allocations: temps et memoire mesures separement
+    t0 = time.perf_counter()
+    n = len(fn())
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return n, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_sqlite_db(Path(tmp) / "bench.db", args.rows)
+        for name, fn in [
+            ("orm (legacy)", lambda: legacy_fetch(engine)),
+            ("core streaming", lambda: fetch_feature_frame(engine, chunk_size=args.chunk_size)),
+        ]:
+            n, elapsed, peak = measure(fn)
+            print(f"{name:16s} rows={n}  {n / elapsed:12,.0f} rows/s  {elapsed:7.2f} s  peak={peak / 2**20:8.1f} MiB")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: demarrage a froid de l'API (import de app.main) dans un processus neuf.
+
+Mesure le temps d'import, le pic de RSS et les modules lourds charges, avec et
+sans routes ML (FASTIA_ENABLE_ML), puis apres la premiere requete GET /clients.
+Echoue (code 1) si un seuil est depasse ou si un module lourd est importe au
+demarrage: a lancer en CI pour detecter les regressions.
+
+Usage:
+    python -m benchmarks.bench_import [--max-import-s 2.0] [--max-rss-mib 150]
+"""
+from __future__ import annotations
+import argparse, json, os, subprocess, sys, tempfile
+from pathlib import Path
+
+HEAVY_MODULES = ["torch", "pandas", "sklearn", "matplotlib"]
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+def rss():
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+out = {"import_s": elapsed, "rss_mib": rss(), "heavy": [m for m in HEAVY if m in sys.modules]}
+if FIRST_REQUEST:
+    from fastapi.testclient import TestClient
+    t0 = time.perf_counter()
+    TestClient(app.main.app).get("/clients", params={"limit": 1}).raise_for_status()
+    out.update(first_request_s=time.perf_counter() - t0, rss_after_mib=rss())
+print(json.dumps(out))
+"""
+
+def _run(env: dict, first_request: bool) -> dict:
+    code = f"HEAVY = {HEAVY_MODULES!r}\nFIRST_REQUEST = {first_request!r}\n{CHILD}"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-import-s", type=float, default=None)
+    parser.add_argument("--max-rss-mib", type=float, default=None)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="fastia-import-"))
+    base = dict(os.environ, FASTIA_DB_URL=f"sqlite:///{tmp / 'bench.db'}", FASTIA_ARTIFACTS_DIR=str(tmp / "artifacts"))
+    subprocess.run([sys.executable, "-c", "from app.database import Base, engine; import app.models; Base.metadata.create_all(engine)"],
+                   env=base, check=True)
+
+    failures = []
+    for label, extra in (("API complete", {"FASTIA_ENABLE_ML": "1"}), ("sans ML", {"FASTIA_ENABLE_ML": "0"})):
+        env = dict(base, **extra)
+        runs = [_run(env, first_request=False) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["import_s"])
+        first = _run(env, first_request=True)
+        print(f"{label:<14} import {best['import_s']:6.2f} s  RSS {best['rss_mib']:6.0f} Mio  "
+              f"1re requete /clients {first['first_request_s'] * 1e3:6.0f} ms (RSS {first['rss_after_mib']:.0f} Mio)  "
+              f"lourds: {', '.join(best['heavy']) or '-'}")
+        if best["heavy"]:
+            failures.append(f"{label}: modules lourds importes au demarrage ({', '.join(best['heavy'])})")
+        if args.max_import_s is not None and best["import_s"] > args.max_import_s:
+            failures.append(f"{label}: import {best['import_s']:.2f} s > {args.max_import_s} s")
+        if args.max_rss_mib is not None and best["rss_mib"] > args.max_rss_mib:
+            failures.append(f"{label}: RSS {best['rss_mib']:.0f} Mio > {args.max_rss_mib} Mio")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark: statistiques de pretraitement recalculees sur toute la table vs mises a
+jour avec les seules nouvelles lignes, et precision de la mediane approchee.
+
+Usage:
+    python -m benchmarks.bench_incremental_stats --rows 1000000 --new-rows 1000
+"""
+from __future__ import annotations
+import argparse
+import numpy as np
+import pandas as pd
+
+from app.ml.preprocessing import category_values, prepare_frame
+from app.ml.stats import PreprocessStats
+from .common import load_sample, timeit
+
+TARGET_COL = "score_credit"
+
+def full_stats(df: pd.DataFrame):
+    """Partie statistiques de fit_transform (medianes, moyennes, ecarts-types, niveaux)."""
+    Xdf, _, num_cols, cat_cols = prepare_frame(df, TARGET_COL)
+    out = {}
+    for c in num_cols:
+        col = pd.to_numeric(Xdf[c], errors="coerce")
+        med = float(col.median())
+        values = col.fillna(med).astype(float).to_numpy()
+        out[c] = (med, float(values.mean()), float(values.std()))
+    levels = {c: sorted(category_values(Xdf[c]).unique().tolist()) for c in cat_cols}
+    return out, levels
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--new-rows", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--delta", type=float, default=0.01)
+    args = parser.parse_args()
+
+    df = load_sample(args.rows + args.new_rows)
+    base, new = df.iloc[:args.rows], df.iloc[args.rows:]
+    stats = PreprocessStats(TARGET_COL)
+    stats.update(base)
+
+    full = timeit(lambda: full_stats(df), args.repeat)
+
+    def incremental():
+        s = PreprocessStats.from_dict(stats.to_dict())
+        s.update(new)
+        return s.to_artifacts()
+
+    incr = timeit(incremental, args.repeat)
+    roundtrip = timeit(lambda: PreprocessStats.from_dict(stats.to_dict()).to_artifacts(), args.repeat)
+    print(f"rows={args.rows} new={args.new_rows}")
+    print(f"full recompute          {full * 1e3:10.1f} ms")
+    print(f"incremental (+reload)   {incr * 1e3:10.1f} ms  (dont relecture/artefacts {roundtrip * 1e3:.1f} ms)")
+
+    exact, _ = full_stats(df)
+    merged = PreprocessStats.from_dict(stats.to_dict())
+    merged.update(new)
+    prep = merged.to_artifacts()
+    Xdf, _, _, _ = prepare_frame(df, TARGET_COL)
+    bounds = merged.median_rank_error(args.delta)
+    print(f"\n{'colonne':22s} {'mediane exacte':>15s} {'approchee':>12s} {'|rang-0.5|':>11s} {'borne DKW':>10s}")
+    for c, (med, mean, std) in exact.items():
+        observed = np.sort(pd.to_numeric(Xdf[c], errors="coerce").dropna().to_numpy(dtype=float))
+        approx = prep.num_medians[c]
+        # rang normalise de la mediane approchee parmi les valeurs observees
+        lo, hi = np.searchsorted(observed, approx, "left"), np.searchsorted(observed, approx, "right")
+        n = len(observed)
+        rank_err = 0.0 if lo <= n / 2 <= hi else min(abs(lo / n - 0.5), abs(hi / n - 0.5))
+        print(f"{c:22s} {med:15.3f} {approx:12.3f} {rank_err:11.4f} {bounds[c]:10.4f}")
+
+if __name__ == "__main__":
+    main()
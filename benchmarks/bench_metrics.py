@@ -0,0 +1,79 @@
+"""Benchmark: cout de l'instrumentation (app/metrics.py) par requete.
+
+Dans un processus neuf par variante (FASTIA_METRICS lu a l'import): N appels
+GET /clients/{id} en ASGI direct (httpx.ASGITransport, sans reseau), avec et sans
+middleware + evenements SQL + pool chronometre, puis une requete profilee
+(FASTIA_PROFILING=1, en-tete X-Profile) sur GET /clients/export.
+
+Usage:
+    python -m benchmarks.bench_metrics --rows 20000 --requests 3000
+"""
+from __future__ import annotations
+import argparse, json, os, subprocess, sys, tempfile
+from pathlib import Path
+
+CHILD = r"""
+import asyncio, json, sys, time
+import httpx
+from app.main import app
+from app.metrics import registry
+
+async def main(n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):
+            await client.get(f"/clients/{i + 1}")
+        t0 = time.perf_counter()
+        for i in range(n):
+            (await client.get(f"/clients/{i % 1000 + 1}")).raise_for_status()
+        elapsed = time.perf_counter() - t0
+        out = {"us_per_request": elapsed / n * 1e6}
+        if PROFILE:
+            r = await client.get("/clients/export", headers={"X-Profile": "1"})
+            profile_id = r.headers["x-profile-id"]
+            folded = (await client.get(f"/metrics/profiles/{profile_id}")).text
+            out["profile_stacks"] = len(folded.splitlines())
+            out["profile_top"] = folded.splitlines()[0].rsplit(";", 1)[-1] if folded else ""
+        out["metrics"] = (await client.get("/metrics")).json()
+    print(json.dumps(out))
+
+asyncio.run(main(N))
+"""
+
+def _child(tmp: Path, n: int, enabled: bool, profile: bool) -> dict:
+    env = dict(os.environ, FASTIA_DB_URL=f"sqlite:///{tmp / 'bench.db'}", FASTIA_ARTIFACTS_DIR=str(tmp / "artifacts"),
+               FASTIA_METRICS="1" if enabled else "0", FASTIA_PROFILING="1" if profile else "0",
+               FASTIA_CACHE_BACKEND="none", FASTIA_ENABLE_ML="0")
+    code = f"N = {n}\nPROFILE = {profile!r}\n{CHILD}"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    from .common import build_sqlite_db
+
+    tmp = Path(tempfile.mkdtemp(prefix="fastia-metrics-"))
+    build_sqlite_db(tmp / "bench.db", args.rows).dispose()
+
+    # meilleur de 3 processus alternes: l'ecart attendu est du meme ordre que le bruit
+    runs = [(_child(tmp, args.requests, False, False), _child(tmp, args.requests, True, True)) for _ in range(3)]
+    off = min((r[0] for r in runs), key=lambda r: r["us_per_request"])
+    on = min((r[1] for r in runs), key=lambda r: r["us_per_request"])
+    print(f"GET /clients/{{id}} sans metriques   {off['us_per_request']:8.0f} us/requete")
+    print(f"GET /clients/{{id}} avec metriques   {on['us_per_request']:8.0f} us/requete "
+          f"({on['us_per_request'] - off['us_per_request']:+.0f} us, "
+          f"{(on['us_per_request'] / off['us_per_request'] - 1) * 100:+.1f} %)")
+    m = on["metrics"]
+    route = m["http"]["GET /clients/{client_id}"]
+    select = m["sql"].get("SELECT", {})
+    print(f"\n/metrics: {route['count']} requetes, p50 {route['p50_ms']} ms, p99 {route['p99_ms']} ms; "
+          f"{select.get('count', 0)} SELECT, moyenne {select.get('mean_ms', 0):.3f} ms; "
+          f"checkout pool p99 {m['pool']['checkout']['p99_ms']} ms")
+    print(f"profil /clients/export: {on['profile_stacks']} piles distinctes, la plus frequente finit par {on['profile_top']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Benchmark: revision 0002 (colonnes de clients) sur une grosse base SQLite, avec un
+ecrivain concurrent qui mesure combien de temps ses transactions restent bloquees.
+
+Scenarios (downgrade = suppression des 2 colonnes, upgrade = ajout):
+- batch_alter_table: l'ancienne revision (table recreee et recopiee en une transaction);
+- natif: app/migration_utils.py, ALTER TABLE ADD/DROP COLUMN;
+- copie par tranches: meme revision avec FASTIA_MIGRATION_FORCE_COPY=1;
+- reprise: copie par tranches tuee en cours de route puis relancee.
+
+Usage:
+    python -m benchmarks.bench_migrations --rows 2000000 [--chunk-size 50000]
+"""
+from __future__ import annotations
+import argparse, json, os, re, signal, sqlite3, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+WRITER = r"""
+import json, random, sqlite3, sys, time
+from pathlib import Path
+db, stop = sys.argv[1], Path(sys.argv[2])
+conn = sqlite3.connect(db, timeout=600, isolation_level=None)
+# pas de checkpoint dans l'ecrivain: sa latence ne mesure que l'attente du verrou et sa propre ecriture
+conn.execute("PRAGMA wal_autocheckpoint=0")
+latencies = []
+rng = random.Random(0)
+while not stop.exists():
+    t0 = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE clients SET poids = poids WHERE id = ?", (rng.randint(1, 1000),))
+    conn.execute("COMMIT")
+    latencies.append(time.perf_counter() - t0)
+    time.sleep(0.005)
+latencies.sort()
+print(json.dumps({"n": len(latencies), "max_s": latencies[-1] if latencies else 0.0,
+                  "p99_s": latencies[int(0.99 * (len(latencies) - 1))] if latencies else 0.0}))
+"""
+
+class Writer:
+    """Processus separe: UPDATE d'une ligne toutes les 5 ms, latence de chaque transaction."""
+
+    def __init__(self, db: Path, tmp: Path):
+        self.stop = tmp / "stop-writer"
+        self.stop.unlink(missing_ok=True)
+        self.proc = subprocess.Popen([sys.executable, "-c", WRITER, str(db), str(self.stop)],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        time.sleep(0.3)
+
+    def result(self) -> dict:
+        self.stop.touch()
+        out, _ = self.proc.communicate()
+        return json.loads(out.strip().splitlines()[-1])
+
+def _alembic(db: Path, *args: str, **env: str) -> subprocess.Popen:
+    env = dict(os.environ, FASTIA_DB_URL=f"sqlite:///{db}", PYTHONPATH=str(ROOT), **env)
+    log = open(db.with_name("alembic.log"), "w")
+    return subprocess.Popen([sys.executable, "-m", "alembic", "-c", str(ROOT / "alembic.ini"), *args],
+                            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+def _run(db: Path, *args: str, **env: str) -> None:
+    if _alembic(db, *args, **env).wait() != 0:
+        log = db.with_name("alembic.log").read_text()
+        raise RuntimeError(f"alembic {' '.join(args)} a echoue:\n{log[-2000:]}")
+
+def _columns(db: Path) -> list[str]:
+    with sqlite3.connect(db) as conn:
+        return [r[1] for r in conn.execute("PRAGMA table_info(clients)")]
+
+def _indexes(db: Path) -> list[str]:
+    with sqlite3.connect(db) as conn:
+        return sorted(r[1] for r in conn.execute("PRAGMA index_list(clients)") if not r[1].startswith("sqlite_"))
+
+def _count(db: Path) -> int:
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+
+def _batch_alter(db: Path, drop: bool) -> None:
+    # ancienne revision 0002, telle quelle
+    import sqlalchemy as sa
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    engine = sa.create_engine(f"sqlite:///{db}")
+    with engine.begin() as conn:
+        ops = Operations(MigrationContext.configure(conn))
+        with ops.batch_alter_table("clients") as batch:
+            if drop:
+                batch.drop_column("quotient_caf")
+                batch.drop_column("nb_enfants")
+            else:
+                batch.add_column(sa.Column("nb_enfants", sa.Integer(), nullable=True))
+                batch.add_column(sa.Column("quotient_caf", sa.Float(), nullable=True))
+    engine.dispose()
+
+def _measure(label: str, db: Path, tmp: Path, fn) -> None:
+    writer = Writer(db, tmp)
+    t0 = time.perf_counter()
+    try:
+        fn()
+    finally:
+        elapsed = time.perf_counter() - t0
+        w = writer.result()
+    log = db.with_name("alembic.log")
+    found = re.findall(r"transaction max ([\d.]+) s", log.read_text()) if log.exists() else []
+    migration = f"{float(found[-1]) * 1e3:7.0f} ms" if found else "      -"
+    log.unlink(missing_ok=True)
+    print(f"{label:<34} {elapsed:7.2f} s  {migration}   {w['max_s'] * 1e3:9.1f} ms {w['p99_s'] * 1e3:7.1f} ms  {w['n']:>6}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="fastia-migr-"))
+    db = tmp / "bench.db"
+    from .common import build_sqlite_db
+
+    t0 = time.perf_counter()
+    build_sqlite_db(db, args.rows).dispose()
+    with sqlite3.connect(db) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+    print(f"base: {args.rows} clients, {db.stat().st_size / 2**20:.0f} Mio ({time.perf_counter() - t0:.0f} s)\n")
+    # schema courant = revision 0002 appliquee (les tables des revisions suivantes sont ignorees)
+    _run(db, "stamp", "0002")
+    chunk = str(args.chunk_size)
+    print(f"{'scenario':<34} {'duree':>9}  {'tx max':>10}   {'ecrivain max':>12} {'p99':>7}  {'ecrit.':>6}")
+
+    _measure("batch_alter_table  drop colonnes", db, tmp, lambda: _batch_alter(db, drop=True))
+    _measure("batch_alter_table  add colonnes", db, tmp, lambda: _batch_alter(db, drop=False))
+    _measure("natif              downgrade", db, tmp, lambda: _run(db, "downgrade", "base"))
+    _measure("natif              upgrade", db, tmp, lambda: _run(db, "upgrade", "0002"))
+    _measure("copie par tranches downgrade", db, tmp, lambda: _run(
+        db, "downgrade", "base", FASTIA_MIGRATION_FORCE_COPY="1", FASTIA_MIGRATION_CHUNK=chunk))
+    _measure("natif              upgrade", db, tmp, lambda: _run(db, "upgrade", "0002"))
+
+    # reprise: processus tue apres quelques tranches, puis relance
+    proc = _alembic(db, "downgrade", "base", FASTIA_MIGRATION_FORCE_COPY="1", FASTIA_MIGRATION_CHUNK=chunk)
+    last_id = 0
+    with sqlite3.connect(db, timeout=60) as conn:
+        while proc.poll() is None and last_id < args.rows // 3:
+            time.sleep(0.05)
+            try:
+                last_id = conn.execute("SELECT last_id FROM _fastia_migration_progress").fetchone()[0]
+            except (sqlite3.OperationalError, TypeError):
+                pass
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+    _measure(f"reprise apres id {last_id:<12}", db, tmp, lambda: _run(
+        db, "downgrade", "base", FASTIA_MIGRATION_FORCE_COPY="1", FASTIA_MIGRATION_CHUNK=chunk))
+    cols = _columns(db)
+    print(f"  -> {_count(db)} lignes, nb_enfants/quotient_caf presentes: {'nb_enfants' in cols}/{'quotient_caf' in cols}, "
+          f"index: {', '.join(_indexes(db))}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Benchmark: latence d'une page de GET /clients selon la profondeur.
+
+Compare OFFSET/LIMIT (skip) et la pagination par curseur (after_id) via
+crud.list_clients, sur une base SQLite synthetique.
+
+Usage:
+    python -m benchmarks.bench_pagination --rows 1000000
+"""
+from __future__ import annotations
+import argparse, tempfile
+from pathlib import Path
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from .common import build_sqlite_db, timeit
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_sqlite_db(Path(tmp) / "bench.db", args.rows)
+        db = sessionmaker(bind=engine, future=True)()
+        depths = [d for d in [0, 1_000, 10_000, 100_000, 500_000, args.rows - args.limit] if d < args.rows]
+        print(f"{'profondeur':>12} {'offset (ms)':>12} {'keyset (ms)':>12}")
+        for depth in depths:
+            # ids contigus depuis 1: la page a la profondeur d commence apres l'id d
+            offset = timeit(lambda: (crud.list_clients(db, skip=depth, limit=args.limit), db.expunge_all()), 5)
+            keyset = timeit(lambda: (crud.list_clients(db, after_id=depth, limit=args.limit), db.expunge_all()), 5)
+            print(f"{depth:>12} {offset * 1e3:12.2f} {keyset * 1e3:12.2f}")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark: debit / latence de POST /predict selon le regroupement (micro-batching).
+
+Entraine un petit modele sur une base synthetique puis, pour chaque configuration
+FASTIA_BATCH_MAX_ROWS:FASTIA_BATCH_MAX_WAIT_MS ("0:0" = une passe avant par requete):
+- en processus: N appelants concurrents de MicroBatcher.submit (ordonnanceur seul);
+- en HTTP (sauf --no-http): un serveur uvicorn et N clients httpx. Sur une machine
+  a peu de coeurs, le generateur de charge concurrence le serveur.
+
+Usage:
+    python -m benchmarks.bench_predict_batching --configs 0:0 64:1 256:2 256:5 --concurrency 1 8 32 128
+"""
+from __future__ import annotations
+import argparse, asyncio, os, random, subprocess, sys, tempfile, time
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="fastia-batch-"))
+# avant tout import de app: moteur et dossier d'artefacts lus a l'import
+os.environ["FASTIA_DB_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["FASTIA_ARTIFACTS_DIR"] = str(TMP / "artifacts")
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+from app.ml.batching import MicroBatcher  # noqa: E402
+from app.ml.training import train_from_db  # noqa: E402
+from app.routers.predict import _predict_records  # noqa: E402
+from app.schemas import ClientCreate  # noqa: E402
+from scripts.ingest_data_all import _normalize  # noqa: E402
+from .common import build_sqlite_db, load_sample  # noqa: E402
+
+def _payloads(n: int) -> list[dict]:
+    df = _normalize(load_sample(n, seed=3))
+    fields = list(ClientCreate.model_fields)
+    out = []
+    for rec in df.to_dict("records"):
+        rec = {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in rec.items() if k in fields}
+        out.append(ClientCreate(**rec).model_dump())
+    return out
+
+async def _wait_ready(base_url: str, payload: dict, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                (await client.post("/predict", json=payload)).raise_for_status()
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"serveur {base_url} indisponible")
+
+def _summary(latencies: list[float], seconds: float, errors: int = 0) -> dict:
+    return {
+        "rps": len(latencies) / seconds,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+        "p99_ms": float(np.percentile(latencies, 99)) * 1e3,
+        "errors": errors,
+    }
+
+async def _direct(batcher: MicroBatcher, payloads: list[dict], concurrency: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    stop = time.perf_counter() + seconds
+
+    async def user(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            await batcher.submit([rng.choice(payloads)])
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return _summary(latencies, seconds)
+
+async def _load(base_url: str, payloads: list[dict], concurrency: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    stop = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def user(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                try:
+                    (await client.post("/predict", json=rng.choice(payloads))).raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    return _summary(latencies, seconds, errors)
+
+def _print(mode: str, max_rows: str, max_wait: str, c: int, r: dict, extra: str = "") -> None:
+    print(f"{mode:<5} rows<={max_rows:>4} wait={max_wait:>3} ms concurrency={c:4d} req/s={r['rps']:7.0f} "
+          f"p50={r['p50_ms']:7.1f} ms p99={r['p99_ms']:7.1f} ms{extra}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--configs", nargs="+", default=["0:0", "64:1", "256:2", "256:5"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--no-http", action="store_true")
+    args = parser.parse_args()
+
+    build_sqlite_db(TMP / "bench.db", args.rows).dispose()
+    train_from_db(epochs=1)
+    payloads = _payloads(500)
+
+    for config in args.configs:
+        max_rows, max_wait = config.split(":")
+        for c in args.concurrency:
+            batcher = MicroBatcher(_predict_records, int(max_rows), float(max_wait))
+            r = asyncio.run(_direct(batcher, payloads, c, args.seconds))
+            mean = batcher.rows / batcher.batches if batcher.batches else 1
+            _print("proc", max_rows, max_wait, c, r, f" lot moyen={mean:6.1f}")
+
+    for config in ([] if args.no_http else args.configs):
+        max_rows, max_wait = config.split(":")
+        env = dict(os.environ, FASTIA_BATCH_MAX_ROWS=max_rows, FASTIA_BATCH_MAX_WAIT_MS=max_wait)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            asyncio.run(_wait_ready(base_url, payloads[0]))
+            for c in args.concurrency:
+                r = asyncio.run(_load(base_url, payloads, c, args.seconds))
+                _print("http", max_rows, max_wait, c, r, f" errors={r['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark: one-hot par boucle (ancien fit_transform) vs transform() vectorise.
+
+Usage:
+    python -m benchmarks.bench_preprocessing --rows 1000000
+"""
+from __future__ import annotations
+import argparse
+import numpy as np
+import pandas as pd
+
+from app.ml.preprocessing import _sanitize, fit_transform, iter_transform, transform
+from .common import load_sample, timeit
+
+TARGET_COL = "score_credit"
+
+def legacy_transform(df: pd.DataFrame, artifacts) -> np.ndarray:
+    """Construction historique: une colonne (n,1) par niveau puis np.concatenate."""
+    df = _sanitize(df)
+    num_cols = list(artifacts.num_means)
+    num = np.stack([
+        (pd.to_numeric(df[c], errors="coerce").fillna(artifacts.num_medians[c]).astype(float).to_numpy()
+         - artifacts.num_means[c]) / artifacts.num_stds[c]
+        for c in num_cols
+    ], axis=1)
+    one_hots = []
+    for c, levels in artifacts.cat_levels.items():
+        col = df[c].replace({"nan": np.nan, "None": np.nan}).fillna("inconnu")
+        for lvl in levels:
+            one_hots.append((col == lvl).astype(float).to_numpy()[:, None])
+    return np.concatenate([num] + one_hots, axis=1).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-rows", type=int, default=65_536)
+    parser.add_argument("--legacy-max-rows", type=int, default=50_000,
+                        help="au-dela, l'ancienne boucle sature la memoire (float64 + copies)")
+    args = parser.parse_args()
+
+    base = load_sample(10_000)
+    _, _, artifacts = fit_transform(base, TARGET_COL)
+    print(f"features: {len(artifacts.feature_names)}")
+
+    for n in [1, 100, 10_000, args.rows]:
+        df = load_sample(n, seed=1)
+        repeat = args.repeat if n > 1 else 200
+        if n > args.chunk_rows:
+            new = timeit(lambda: sum(X.shape[0] for X in iter_transform(df, artifacts, args.chunk_rows)), repeat)
+        else:
+            new = timeit(lambda: transform(df, artifacts), repeat)
+        assert np.array_equal(transform(df.head(100), artifacts), legacy_transform(df.head(100), artifacts))
+        if n > args.legacy_max_rows:
+            print(f"rows={n:>9}  legacy=       n/a     transform={new * 1e3:10.2f} ms")
+            continue
+        old = timeit(lambda: legacy_transform(df, artifacts), 1 if n > 10_000 else repeat)
+        print(f"rows={n:>9}  legacy={old * 1e3:10.2f} ms  transform={new * 1e3:10.2f} ms  speedup={old / new:6.1f}x")
+
+if __name__ == "__main__":
+    main()
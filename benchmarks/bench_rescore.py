@@ -0,0 +1,79 @@
+"""Benchmark: rescoring de toute la table (client_predictions).
+
+Compare un scoring client par client (predict() sur une ligne, extrapole) au
+pipeline par tranches, lecture brute puis feature store, avec 1 puis N workers;
+verifie ensuite la reprise apres une interruption.
+
+Usage:
+    python -m benchmarks.bench_rescore --rows 200000 [--workers 4]
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+from pathlib import Path
+
+# les workers (spawn) re-importent ce module: ils reprennent le dossier du parent
+TMP = Path(os.environ.get("FASTIA_BENCH_TMP") or tempfile.mkdtemp(prefix="fastia-rescore-"))
+os.environ["FASTIA_BENCH_TMP"] = str(TMP)
+# avant tout import de app: moteur et dossier d'artefacts lus a l'import
+os.environ["FASTIA_DB_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["FASTIA_ARTIFACTS_DIR"] = str(TMP / "artifacts")
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import delete, func, select  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.ml import feature_store  # noqa: E402
+from app.ml.inference import predictor  # noqa: E402
+from app.ml.rescore import rescore  # noqa: E402
+from app.ml.training import train_from_db  # noqa: E402
+from app.models import Client, ClientPrediction  # noqa: E402
+from .common import build_sqlite_db  # noqa: E402
+
+class _Interrupt(Exception):
+    pass
+
+def _report(label: str, result: dict) -> None:
+    print(f"{label:<28} {result['seconds']:7.2f} s  {result['rows_per_s']:9.0f} lignes/s  "
+          f"({result['n_chunks']} tranches, {result['workers']} worker(s))")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    build_sqlite_db(TMP / "bench.db", args.rows).dispose()
+    train_from_db(epochs=1)
+
+    sample = pd.read_sql(select(Client).limit(1000), engine)
+    t0 = time.perf_counter()
+    for i in range(len(sample)):
+        predictor.predict(sample.iloc[i:i + 1])
+    per_row = (time.perf_counter() - t0) / len(sample)
+    print(f"{'un predict() par client':<28} {per_row * args.rows:7.2f} s  {1 / per_row:9.0f} lignes/s  (extrapole)")
+
+    _report("tranches, lecture brute", rescore(chunk_size=args.chunk_size, max_workers=1, full=True))
+    feature_store.rebuild()
+    _report("tranches, feature store", rescore(chunk_size=args.chunk_size, max_workers=1, full=True))
+    if args.workers > 1:
+        _report(f"feature store, {args.workers} workers", rescore(chunk_size=args.chunk_size, max_workers=args.workers, full=True))
+
+    def interrupt(done: int, total: int) -> None:
+        if done == 2:
+            raise _Interrupt
+
+    # premier passage d'un nouveau modele, interrompu apres 2 tranches
+    with engine.begin() as conn:
+        conn.execute(delete(ClientPrediction))
+    try:
+        rescore(chunk_size=args.chunk_size, max_workers=1, on_chunk=interrupt)
+    except _Interrupt:
+        pass
+    resumed = rescore(chunk_size=args.chunk_size, max_workers=1)
+    with engine.connect() as conn:
+        n = conn.execute(select(func.count()).select_from(ClientPrediction)).scalar_one()
+    print(f"reprise apres id {resumed['resumed_after']}: {resumed['n_rows']} lignes rescorees, "
+          f"{n}/{args.rows} predictions en table")
+
+if __name__ == "__main__":
+    main()
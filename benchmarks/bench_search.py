@@ -0,0 +1,103 @@
+"""Benchmark: GET /clients/search et /clients/stats, avec et sans les index de la
+migration 0005, puis agregats servis par le cache.
+
+Base SQLite de clients synthetiques; chaque requete est executee par les
+fonctions de app/crud.py (meilleur de 3), le plan SQLite est affiche.
+
+Usage:
+    python -m benchmarks.bench_search --rows 1000000
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+from pathlib import Path
+
+def _cases():
+    from app.schemas import ClientFilters as F
+
+    search = {
+        "region + age": (F(region=["Bretagne"], age_min=30, age_max=40), None),
+        "niveau_etude": (F(niveau_etude=["master"]), None),
+        "2 regions + niveau + revenu": (F(region=["Bretagne", "Occitanie"], niveau_etude=["bac"], revenu_min=3000), None),
+        "selectif (region+niveau+age+revenu)": (F(region=["Corse"], niveau_etude=["doctorat"], age_min=60, age_max=65,
+                                                    revenu_min=5000), None),
+        "prefixe nom": (F(nom="Mar"), None),
+        "region, page profonde": (F(region=["Bretagne"]), None),
+    }
+    stats = {
+        "par region": (F(), ["region"]),
+        "par region, niveau": (F(), ["region", "niveau_etude"]),
+        "par niveau, tranche | region": (F(region=["Bretagne"]), ["niveau_etude", "tranche_age"]),
+        "par region | age 30-40": (F(age_min=30, age_max=40), ["region"]),
+    }
+    return search, stats
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+def _plan(conn, stmt) -> str:
+    sql = str(stmt.compile(conn.engine, compile_kwargs={"literal_binds": True}))
+    return " | ".join(r[3] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def _run(engine, rows: int) -> dict[str, float]:
+    from sqlalchemy.orm import Session
+    from app import crud
+
+    search, stats = _cases()
+    fields = ["revenu_estime_mois", "score_credit"]
+    out = {}
+    with Session(engine) as db:
+        conn = db.connection()
+        for name, (f, after) in search.items():
+            after = rows * 9 // 10 if "profonde" in name else after
+            out[f"search {name}"] = _best(lambda: crud.search_clients(db, f, 50, after))
+            print(f"  search {name:<36} {out[f'search {name}']:8.1f} ms  {_plan(conn, crud.search_stmt(f, 50, after))}")
+        for name, (f, group_by) in stats.items():
+            out[f"stats {name}"] = _best(lambda: crud.client_stats(db, f, group_by, fields))
+            print(f"  stats  {name:<36} {out[f'stats {name}']:8.1f} ms  {_plan(conn, crud.stats_stmt(f, group_by, fields))}")
+    return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="fastia-search-"))
+    os.environ.setdefault("FASTIA_DB_URL", f"sqlite:///{tmp / 'bench.db'}")
+    from .common import build_sqlite_db
+    from app.models import Client
+
+    engine = build_sqlite_db(tmp / "bench.db", args.rows, synthetic=True)
+    indexes = [ix for ix in Client.__table__.indexes if ix.name in
+               ("ix_clients_region_id", "ix_clients_niveau_etude_id", "ix_clients_segment_stats")]
+    for ix in indexes:
+        ix.drop(engine)
+    print(f"{args.rows} clients, sans les index 0005:")
+    before = _run(engine, args.rows)
+
+    t0 = time.perf_counter()
+    for ix in indexes:
+        ix.create(engine)
+    print(f"\ncreation des index: {time.perf_counter() - t0:.1f} s")
+    print("avec les index 0005:")
+    after = _run(engine, args.rows)
+    print("\ngain:")
+    for name in before:
+        print(f"  {name:<44} x{before[name] / after[name]:6.1f}")
+
+    from app.cache import stats_cache
+    from app.routers.clients import stats_key
+    from app.schemas import ClientFilters
+
+    f, group_by = ClientFilters(), ["region", "niveau_etude"]
+    key = stats_key(f, group_by, ["revenu_estime_mois", "score_credit"])
+    stats_cache.set(key, b"{}")
+    print(f"\nstats en cache (backend {stats_cache.backend.name}): {_best(lambda: stats_cache.get(key), 1000) * 1e3:.1f} us")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
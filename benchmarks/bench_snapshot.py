@@ -0,0 +1,51 @@
+"""Benchmark: preparation des donnees d'un run d'entrainement, sans instantane
+(extraction + pretraitement) vs instantane memory-mappe (meme etat de la base).
+
+Usage:
+    python -m benchmarks.bench_snapshot --rows 200000
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="fastia-snap-"))
+# avant tout import de app: moteur et dossier d'artefacts lus a l'import
+os.environ["FASTIA_DB_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["FASTIA_ARTIFACTS_DIR"] = str(TMP / "artifacts")
+
+import numpy as np  # noqa: E402
+from app.ml import snapshot  # noqa: E402
+from app.ml.training import TARGET_COL, _load_training_data, fit_preprocessing  # noqa: E402
+from .common import build_sqlite_db  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    build_sqlite_db(TMP / "bench.db", args.rows)
+
+    t0 = time.perf_counter()
+    X, _, _, _ = fit_preprocessing(full_refit=True)
+    cold = time.perf_counter() - t0
+    print(f"sans instantane          {cold * 1e3:9.1f} ms  X={X.shape} ({X.nbytes / 2**20:.0f} Mio)")
+    del X
+
+    t0 = time.perf_counter()
+    _load_training_data(full_refit=True)
+    print(f"calcul + ecriture        {(time.perf_counter() - t0) * 1e3:9.1f} ms")
+
+    t0 = time.perf_counter()
+    key = snapshot.snapshot_key(snapshot.source_fingerprint(), TARGET_COL)
+    print(f"  dont empreinte SQL     {(time.perf_counter() - t0) * 1e3:9.1f} ms")
+    t0 = time.perf_counter()
+    X, y, _, _ = _load_training_data()
+    hit = time.perf_counter() - t0
+    assert isinstance(X, np.memmap), key
+    t0 = time.perf_counter()
+    batch = np.asarray(X[np.sort(np.random.default_rng(0).choice(len(X), 256, replace=False))])
+    first = time.perf_counter() - t0
+    print(f"instantane (mmap)        {hit * 1e3:9.1f} ms  premier mini-lot {first * 1e3:.2f} ms  x{cold / hit:.0f}")
+
+if __name__ == "__main__":
+    main()
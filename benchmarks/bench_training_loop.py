@@ -0,0 +1,67 @@
+"""Benchmark: epoques/s de l'ancienne boucle (copie NumPy -> torch.tensor par
+mini-lot, synchro a chaque pas) vs fit_model (tenseurs residents, randperm).
+
+Usage:
+    python -m benchmarks.bench_training_loop --rows 100000 --epochs 5 --threads 1 4
+"""
+from __future__ import annotations
+import argparse, time
+import numpy as np
+import torch
+
+from app.ml.preprocessing import fit_transform
+from app.ml.training import MLP, TARGET_COL, fit_model
+from .common import load_sample
+
+def legacy_fit(model, X_train, y_train, epochs, lr, batch_size):
+    opt = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = torch.nn.MSELoss()
+    for _ in range(epochs):
+        model.train()
+        idx = np.arange(len(y_train))
+        np.random.shuffle(idx)
+        bl = []
+        for i in range(0, len(idx), batch_size):
+            j = idx[i:i + batch_size]
+            pred = model(torch.tensor(X_train[j]))
+            loss = loss_fn(pred, torch.tensor(y_train[j]))
+            opt.zero_grad()
+            loss.backward()
+            opt.step()
+            bl.append(float(loss.detach().cpu().numpy()))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, torch.get_num_threads()])
+    parser.add_argument("--compile", nargs="+", default=["", "script"], help='"", "script", "compile"')
+    args = parser.parse_args()
+
+    df = load_sample(args.rows)
+    X, y, _ = fit_transform(df, TARGET_COL)
+    n_val = len(y) // 5
+    train_idx, val_idx = np.arange(n_val, len(y)), np.arange(n_val)
+    X_train, y_train = X[n_val:], y[n_val:]
+    print(f"train={X_train.shape} val={(n_val, X.shape[1])}")
+
+    import app.ml.training as training
+    for threads in dict.fromkeys(args.threads):
+        torch.set_num_threads(threads)
+        torch.manual_seed(0)
+        t0 = time.perf_counter()
+        legacy_fit(MLP(X.shape[1]), X_train, y_train, args.epochs, 1e-3, args.batch_size)
+        legacy = args.epochs / (time.perf_counter() - t0)
+        print(f"threads={threads:2d} legacy            {legacy:7.2f} epochs/s")
+        for mode in args.compile:
+            training.MODEL_COMPILE = mode
+            torch.manual_seed(0)
+            t0 = time.perf_counter()
+            fit_model(MLP(X.shape[1]), X, y, train_idx, val_idx, args.epochs, 1e-3, args.batch_size)
+            new = args.epochs / (time.perf_counter() - t0)
+            print(f"threads={threads:2d} fit_model[{mode or 'eager':7s}] {new:7.2f} epochs/s  x{new / legacy:.2f}"
+                  " (inclut la validation par epoque)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark: re-entrainement complet vs fine-tuning (warm_start) apres l'ajout de
+k clients. Le temps du fine-tuning doit suivre k, pas la taille de la table.
+
+Usage:
+    python -m benchmarks.bench_warm_start --rows 200000 --added 100 1000 10000
+"""
+from __future__ import annotations
+import argparse, os, tempfile, time
+from pathlib import Path
+
+TMP = Path(tempfile.mkdtemp(prefix="fastia-warm-"))
+# avant tout import de app: moteur et dossier d'artefacts lus a l'import
+os.environ["FASTIA_DB_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["FASTIA_ARTIFACTS_DIR"] = str(TMP / "artifacts")
+
+from app.ml.training import train_from_db  # noqa: E402
+from scripts.ingest_data_all import EXPECTED_CLIENT_COLS, _normalize  # noqa: E402
+from .common import build_sqlite_db, load_sample  # noqa: E402
+
+def add_clients(engine, n: int, seed: int) -> None:
+    df = _normalize(load_sample(n, seed))
+    df = df[[c for c in EXPECTED_CLIENT_COLS if c in df.columns]]
+    df.to_sql("clients", engine, if_exists="append", index=False)
+
+def run(**params):
+    t0 = time.perf_counter()
+    result = train_from_db(**params)
+    return time.perf_counter() - t0, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--added", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--epochs", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = build_sqlite_db(TMP / "bench.db", args.rows)
+    elapsed, result = run(epochs=args.epochs)
+    print(f"initial full   rows={result['n_rows_used']:>8}  {elapsed:7.2f} s  RMSE={result['metrics']['RMSE']:.2f}")
+
+    for i, k in enumerate(args.added, start=1):
+        add_clients(engine, k, seed=i)
+        elapsed, result = run(epochs=args.epochs, warm_start=True)
+        m = result["metrics"]
+        print(f"+{k:<7} {m['mode']:8s} rows={result['n_rows_used']:>8}  {elapsed:7.2f} s  "
+              f"RMSE={m['RMSE']:.2f} (val. recente)  epochs={m['epochs']}")
+
+    elapsed, result = run(epochs=args.epochs)
+    print(f"final full     rows={result['n_rows_used']:>8}  {elapsed:7.2f} s  RMSE={result['metrics']['RMSE']:.2f}")
+
+if __name__ == "__main__":
+    main()
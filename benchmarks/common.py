@@ -0,0 +1,47 @@
+"""Utilitaires partages par les benchmarks."""
+from __future__ import annotations
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from sqlalchemy import Engine
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "data-all.csv"
+
+def load_sample(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """data-all.csv re-echantillonne (avec remise) a n_rows lignes."""
+    df = pd.read_csv(DATA_PATH)
+    df = df.rename(columns={"nationalité_francaise": "nationalite_francaise"})
+    # comme en base: la donnee sensible n'entre pas dans les features
+    df = df.drop(columns=["orientation_sexuelle"], errors="ignore")
+    idx = np.random.default_rng(seed).integers(0, len(df), size=n_rows)
+    return df.iloc[idx].reset_index(drop=True)
+
+def build_sqlite_db(path: Path, n_rows: int, seed: int = 0, synthetic: bool = False) -> Engine:
+    """Base SQLite jetable avec le schema courant et n_rows clients: lignes de
+    data-all.csv re-echantillonnees, ou generees (benchmarks/synthetic.py)."""
+    from sqlalchemy import create_engine
+    from app.models import Base
+    from scripts.ingest_data_all import EXPECTED_CLIENT_COLS, _normalize
+
+    path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    Base.metadata.create_all(engine)
+    if synthetic:
+        from .synthetic import generate
+
+        df = _normalize(generate(n_rows, seed))
+    else:
+        df = _normalize(load_sample(n_rows, seed))
+    df = df[[c for c in EXPECTED_CLIENT_COLS if c in df.columns]]
+    df.to_sql("clients", engine, if_exists="append", index=False, chunksize=50_000)
+    return engine
+
+def timeit(fn, repeat: int = 5) -> float:
+    """Meilleur temps (s) sur `repeat` executions."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
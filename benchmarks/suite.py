@@ -0,0 +1,301 @@
+"""Suite de benchmarks reproductible sur donnees synthetiques (benchmarks/synthetic.py).
+
+Scenarios, chacun dans un processus neuf (base SQLite et artefacts jetables):
+- generator: fidelite du generateur (KS, variation totale, manquants, negatifs,
+  correlations de rang) et debit de generation;
+- ingest: scripts/ingest_data_all.ingest sur un CSV synthetique;
+- crud: serveur uvicorn sous charge concurrente mixte (GET /clients/{id}, pages
+  keyset, POST /clients, DELETE /clients/{id});
+- fit_transform: app.ml.preprocessing.fit_transform sur les lignes nettoyees;
+- train: train_from_db (instantanes desactives), avec ses phases (metrics.json).
+
+--scale: multiples des 10 000 lignes de data-all.csv (1 10 100).
+Chaque execution est ajoutee a l'historique JSON (--history). Chaque mesure est
+comparee a la mediane des --baseline-runs dernieres executions comparables (meme
+scenario, echelle et machine): seuils relatifs par metrique (THRESHOLDS, --threshold
+pour tous), ecarts absolus sous FLOORS ignores (bruit), bornes fixes (LIMITS).
+--check: code de sortie 1 si une regression est detectee.
+
+Usage:
+    python -m benchmarks.suite [--scale 1 10] [--scenarios generator ingest crud fit_transform train]
+        [--history benchmarks/results/history.json] [--check] [--no-save]
+"""
+from __future__ import annotations
+import argparse, json, os, platform, socket, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HISTORY = ROOT / "benchmarks" / "results" / "history.json"
+BASE_ROWS = 10_000  # taille de data-all.csv
+FIDELITY_ROWS = 100_000
+SCENARIOS = ["generator", "ingest", "crud", "fit_transform", "train"]
+
+HIGHER_IS_BETTER = {"rows_per_s", "rps"}
+# tolerance relative par metrique (suffixe du nom), avant de parler de regression
+THRESHOLDS = {"rows_per_s": 0.20, "rps": 0.20, "seconds": 0.20, "p50_ms": 0.30, "p99_ms": 0.50, "_s": 0.50}
+# ecarts absolus en deca desquels on ne conclut pas (mesures tres courtes)
+FLOORS = {"_ms": 2.0, "_s": 0.05, "seconds": 0.05}
+# bornes absolues, independantes de l'historique
+LIMITS = {
+    "generator": {"max_ks": 0.05, "max_tv": 0.05, "max_missing_gap": 0.02, "max_negative_gap": 0.01, "corr_max_gap": 0.10},
+    "crud": {"errors": 0},
+}
+
+# --- scenarios (executes dans le processus enfant) ---------------------------
+
+def _generator(rows: int, workdir: Path, args) -> dict:
+    import pandas as pd
+    from .synthetic import DATA_PATH, compare, generate, load_profile
+
+    profile = load_profile()
+    t0 = time.perf_counter()
+    generate(rows, seed=args.seed, profile=profile)
+    elapsed = time.perf_counter() - t0
+    # fidelite sur un echantillon fixe: a 10 000 lignes, le bruit d'echantillonnage
+    # des noms et prenoms (milliers de modalites) depasse deja la borne de LIMITS
+    report = compare(pd.read_csv(DATA_PATH), generate(FIDELITY_ROWS, seed=args.seed, profile=profile))
+    return {"seconds": elapsed, "rows_per_s": rows / elapsed,
+            **{k: report[k] for k in ("max_ks", "max_tv", "max_missing_gap", "max_negative_gap", "corr_max_gap")}}
+
+def _ingest(rows: int, workdir: Path, args) -> dict:
+    from .synthetic import write_csv
+
+    csv_path = write_csv(workdir / "data.csv", rows, seed=args.seed)
+    from app.database import engine
+    from app.models import Base
+    from scripts.ingest_data_all import ingest
+
+    Base.metadata.create_all(engine)
+    t0 = time.perf_counter()
+    n = ingest(csv_path, chunk_size=50_000, checkpoint=workdir / "ingest.json", resume=False)
+    elapsed = time.perf_counter() - t0
+    return {"seconds": elapsed, "rows_per_s": n / elapsed}
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _crud_load(base_url: str, rows: int, payloads: list[dict], concurrency: int, seconds: float) -> dict:
+    import asyncio, random
+    import httpx
+    import numpy as np
+
+    latencies: list[float] = []
+    errors = 0
+    stop = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        async def user(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            created: list[int] = []
+            while time.perf_counter() < stop:
+                op = rng.random()
+                t0 = time.perf_counter()
+                try:
+                    if op < 0.70:
+                        r = await client.get(f"/clients/{rng.randint(1, rows)}")
+                    elif op < 0.85:
+                        r = await client.get("/clients", params={"after_id": rng.randint(0, rows), "limit": 50})
+                    elif op < 0.95 or not created:
+                        r = await client.post("/clients", json=rng.choice(payloads))
+                        if r.status_code == 201:
+                            created.append(r.json()["id"])
+                    else:
+                        r = await client.delete(f"/clients/{created.pop()}")
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return {"rps": len(latencies) / seconds, "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+            "p99_ms": float(np.percentile(latencies, 99)) * 1e3, "errors": errors}
+
+def _crud(rows: int, workdir: Path, args) -> dict:
+    import asyncio
+    from scripts.ingest_data_all import _prepare_chunk
+    from .bench_async_load import _wait_ready
+    from .common import build_sqlite_db
+    from .synthetic import generate
+
+    build_sqlite_db(workdir / "bench.db", rows, seed=args.seed, synthetic=True).dispose()
+    payloads, _ = _prepare_chunk(generate(500, seed=args.seed + 1))
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_ready(base_url))
+        return asyncio.run(_crud_load(base_url, rows, payloads, args.concurrency, args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+def _fit_transform(rows: int, workdir: Path, args) -> dict:
+    from app.ml.preprocessing import fit_transform
+    from scripts.ingest_data_all import EXPECTED_CLIENT_COLS, _normalize
+    from .synthetic import generate
+
+    df = _normalize(generate(rows, seed=args.seed))
+    df = df[[c for c in EXPECTED_CLIENT_COLS if c in df.columns]]
+    best = float("inf")
+    for _ in range(3 if rows <= 100_000 else 1):
+        t0 = time.perf_counter()
+        fit_transform(df, "score_credit")
+        best = min(best, time.perf_counter() - t0)
+    return {"seconds": best, "rows_per_s": rows / best}
+
+def _train(rows: int, workdir: Path, args) -> dict:
+    from .common import build_sqlite_db
+
+    build_sqlite_db(workdir / "bench.db", rows, seed=args.seed, synthetic=True).dispose()
+    from app.ml.training import train_from_db
+
+    t0 = time.perf_counter()
+    result = train_from_db(epochs=args.epochs)
+    elapsed = time.perf_counter() - t0
+    if result["status"] != "ok":
+        raise RuntimeError(result["metrics"])
+    phases = result["metrics"].get("phases", {})
+    return {"seconds": elapsed, "rows_per_s": result["n_rows_used"] / elapsed,
+            **{f"phase_{k}_s": v for k, v in phases.items() if k != "total"}}
+
+RUNNERS = {"generator": _generator, "ingest": _ingest, "crud": _crud, "fit_transform": _fit_transform, "train": _train}
+
+# --- orchestration -----------------------------------------------------------
+
+def _run_child(scenario: str, rows: int, args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix=f"fastia-suite-{scenario}-"))
+    env = dict(
+        os.environ, PYTHONPATH=str(ROOT), FASTIA_DB_URL=f"sqlite:///{workdir / 'bench.db'}",
+        FASTIA_ARTIFACTS_DIR=str(workdir / "artifacts"), FASTIA_SNAPSHOTS="0", FASTIA_PROFILING="0",
+        FASTIA_RESCORE_AFTER_TRAIN="0",
+    )
+    cmd = [sys.executable, "-m", "benchmarks.suite", "--child", scenario, "--rows", str(rows), "--workdir", str(workdir),
+           "--seed", str(args.seed), "--epochs", str(args.epochs), "--concurrency", str(args.concurrency),
+           "--seconds", str(args.seconds)]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{scenario}: echec\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def machine() -> dict:
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu)
+    except OSError:
+        pass
+    return {"cpu": cpu, "cpus": os.cpu_count(), "python": platform.python_version(), "system": platform.system()}
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_history(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"runs": []}
+
+def save_history(path: Path, history: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(history, indent=1, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _suffix_lookup(table: dict, metric: str, default=None):
+    # cle exacte d'abord, puis suffixe le plus long ("phase_fetch_s" -> "_s")
+    if metric in table:
+        return table[metric]
+    matches = [k for k in table if metric.endswith(k)]
+    return table[max(matches, key=len)] if matches else default
+
+def baseline(history: dict, key: str, host: dict, n_runs: int) -> dict[str, float]:
+    """Mediane par metrique des `n_runs` dernieres executions comparables."""
+    same = [r["results"][key]["metrics"] for r in history["runs"]
+            if key in r["results"] and r["machine"]["cpu"] == host["cpu"] and r["machine"]["cpus"] == host["cpus"]]
+    same = same[-n_runs:]
+    metrics = {m for run in same for m in run}
+    return {m: statistics.median(run[m] for run in same if m in run) for m in metrics}
+
+def verdict(scenario: str, metric: str, value: float, base: float | None, tolerance: float | None) -> str:
+    limit = LIMITS.get(scenario, {}).get(metric)
+    if limit is not None and value > limit:
+        return "HORS BORNE"
+    if limit is not None:
+        return "ok"
+    if base is None:
+        return ""
+    tol = tolerance if tolerance is not None else _suffix_lookup(THRESHOLDS, metric, 0.25)
+    floor = _suffix_lookup(FLOORS, metric, 0.0)
+    if metric in HIGHER_IS_BETTER:
+        worse, better = value < base * (1 - tol), value > base * (1 + tol)
+    else:
+        worse = value > base * (1 + tol) and value - base > floor
+        better = value < base * (1 - tol) and base - value > floor
+    return "REGRESSION" if worse else "mieux" if better else "ok"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--baseline-runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=None, help="tolerance relative unique (defaut: THRESHOLDS)")
+    parser.add_argument("--check", action="store_true", help="code de sortie 1 si regression")
+    parser.add_argument("--no-save", action="store_true", help="ne pas ecrire l'historique")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    # usage interne: execution d'un scenario dans le processus enfant
+    parser.add_argument("--child", choices=SCENARIOS, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=Path, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(RUNNERS[args.child](args.rows, args.workdir, args)))
+        return
+
+    history = load_history(args.history)
+    host = machine()
+    run = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _commit(), "machine": host,
+           "params": {"seed": args.seed, "epochs": args.epochs, "concurrency": args.concurrency, "seconds": args.seconds},
+           "results": {}}
+    regressions = []
+    print(f"{'scenario':<22} {'metrique':<22} {'valeur':>12} {'reference':>12} {'ecart':>8}  verdict")
+    for scale in args.scale:
+        rows = int(BASE_ROWS * scale)
+        for scenario in args.scenarios:
+            key = f"{scenario}@{scale:g}x"
+            metrics = _run_child(scenario, rows, args)
+            run["results"][key] = {"rows": rows, "metrics": metrics}
+            base = baseline(history, key, host, args.baseline_runs)
+            for metric, value in metrics.items():
+                ref = base.get(metric)
+                status = verdict(scenario, metric, value, ref, args.threshold)
+                if status in ("REGRESSION", "HORS BORNE"):
+                    regressions.append(f"{key} {metric}")
+                delta = f"{(value / ref - 1) * 100:+7.1f}%" if ref else ""
+                ref_text = f"{ref:12.4g}" if ref is not None else f"{'-':>12}"
+                print(f"{key:<22} {metric:<22} {value:12.4g} {ref_text} {delta:>8}  {status}")
+
+    if not args.no_save:
+        history["runs"].append(run)
+        save_history(args.history, history)
+        print(f"\nhistorique: {args.history} ({len(history['runs'])} executions)")
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Generateur de clients synthetiques statistiquement proches de data-all.csv.
+
+Le profil (`fit_profile`) est appris sur le CSV reel, colonne par colonne:
+- taux de valeurs manquantes;
+- anomalies negatives (app.ml.preprocessing.ANOMALY_COLS): taux et valeurs
+  observees, pour que les deux nettoyages qui les ramenent a NaN aient le meme
+  travail qu'en vrai (scripts/ingest_data_all._normalize a l'ingestion,
+  preprocessing._sanitize a l'entrainement);
+- categorielles (noms, prenoms compris): frequences observees;
+- numeriques et dates: fonction quantile empirique (interpolee pour les valeurs
+  continues, en escalier pour les discretes) et dependance entre colonnes par une
+  copule gaussienne (correlations de rang conservees, score_credit compris).
+
+Les lignes produites ont le schema brut du CSV (nationalite accentuee,
+orientation_sexuelle): elles passent par les memes chemins d'ingestion.
+
+Usage:
+    python -m benchmarks.synthetic --rows 1000000 --out /tmp/data-synth.csv [--seed 0] [--check]
+"""
+from __future__ import annotations
+import argparse, time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "data-all.csv"
+DATE_COLS = ["date_creation_compte"]
+# au-dela: fonction quantile interpolee; en deca: valeurs observees seulement
+DISCRETE_MAX_LEVELS = 20
+N_KNOTS = 1001
+
+def _decimals(values: np.ndarray) -> int | None:
+    """Nombre de decimales des valeurs observees (None: pas d'arrondi apparent)."""
+    for d in range(7):
+        if np.allclose(values, np.round(values, d), rtol=0, atol=1e-9):
+            return d
+    return None
+
+def _days(dates: pd.Series) -> pd.Series:
+    return (dates - pd.Timestamp("1970-01-01")).dt.days.astype("float64")
+
+def _normal_scores(values: pd.Series) -> pd.Series:
+    from scipy.special import ndtri
+
+    ranks = values.rank(method="average")
+    return pd.Series(ndtri((ranks - 0.5) / values.notna().sum()), index=values.index)
+
+def _nearest_correlation(c: np.ndarray) -> np.ndarray:
+    # matrice estimee par paires (valeurs manquantes): rendue definie positive
+    w, v = np.linalg.eigh((c + c.T) / 2)
+    c = (v * np.clip(w, 1e-6, None)) @ v.T
+    d = np.sqrt(np.diag(c))
+    return c / np.outer(d, d)
+
+def fit_profile(df: pd.DataFrame) -> dict:
+    columns, scores = {}, {}
+    for c in df.columns:
+        s = df[c]
+        spec = {"missing": float(s.isna().mean())}
+        if c in DATE_COLS:
+            s = _days(pd.to_datetime(s, errors="coerce"))
+            spec["kind"] = "date"
+        elif pd.api.types.is_numeric_dtype(s):
+            spec["kind"] = "numeric"
+        else:
+            counts = s.dropna().value_counts()
+            columns[c] = {**spec, "kind": "categorical",
+                          "levels": counts.index.tolist(), "p": (counts / counts.sum()).tolist()}
+            continue
+        observed = s.dropna().to_numpy(dtype=np.float64)
+        negative = observed[observed < 0]
+        positive = np.sort(observed[observed >= 0])
+        spec["negative"] = float(len(negative) / len(s))
+        spec["negative_values"] = negative.tolist()
+        spec["decimals"] = 0 if spec["kind"] == "date" else _decimals(positive)
+        spec["discrete"] = bool(len(np.unique(positive)) <= DISCRETE_MAX_LEVELS)
+        spec["knots"] = np.quantile(positive, np.linspace(0, 1, N_KNOTS)).tolist()
+        columns[c] = spec
+        scores[c] = _normal_scores(s.where(s >= 0))
+    numeric = list(scores)
+    corr = pd.DataFrame(scores).corr().fillna(0.0).to_numpy(copy=True) if numeric else np.zeros((0, 0))
+    np.fill_diagonal(corr, 1.0)
+    return {"columns": columns, "order": list(df.columns), "copula": numeric,
+            "corr": _nearest_correlation(corr).tolist() if numeric else []}
+
+def load_profile(path: Path = DATA_PATH) -> dict:
+    return fit_profile(pd.read_csv(path))
+
+def _inverse_cdf(spec: dict, u: np.ndarray) -> np.ndarray:
+    knots = np.asarray(spec["knots"])
+    pos = u * (len(knots) - 1)
+    if spec["discrete"]:
+        # fonction quantile en escalier: seules les valeurs observees sortent
+        return knots[np.minimum(np.floor(pos).astype(np.intp), len(knots) - 1)]
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, len(knots) - 1)
+    return knots[lo] + (pos - lo) * (knots[hi] - knots[lo])
+
+def generate(n_rows: int, seed: int = 0, profile: dict | None = None) -> pd.DataFrame:
+    """`n_rows` clients synthetiques (schema brut de data-all.csv)."""
+    from scipy.special import ndtr
+
+    profile = profile or load_profile()
+    rng = np.random.default_rng(seed)
+    out: dict[str, object] = {}
+    copula = profile["copula"]
+    if copula:
+        chol = np.linalg.cholesky(np.asarray(profile["corr"]))
+        uniforms = ndtr(rng.standard_normal((n_rows, len(copula))) @ chol.T)
+    for c in profile["order"]:
+        spec = profile["columns"][c]
+        if spec["kind"] == "categorical":
+            levels = np.asarray(spec["levels"], dtype=object)
+            values = levels[rng.choice(len(levels), size=n_rows, p=spec["p"])]
+        else:
+            values = _inverse_cdf(spec, uniforms[:, copula.index(c)])
+            if spec["negative"]:
+                bad = rng.random(n_rows) < spec["negative"]
+                values[bad] = rng.choice(np.asarray(spec["negative_values"]), size=int(bad.sum()))
+            if spec["decimals"] is not None:
+                values = np.round(values, spec["decimals"])
+        missing = rng.random(n_rows) < spec["missing"]
+        if spec["kind"] == "date":
+            dates = pd.Series(pd.Timestamp("1970-01-01") + pd.to_timedelta(values, unit="D")).dt.strftime("%Y-%m-%d")
+            out[c] = dates.where(~missing, None).to_numpy(dtype=object)
+        elif spec["kind"] == "numeric":
+            values = values.astype(np.float64)
+            values[missing] = np.nan
+            out[c] = values
+        else:
+            values[missing] = None
+            out[c] = values
+    df = pd.DataFrame(out)
+    for c, spec in profile["columns"].items():
+        # entiers sans manquants: meme dtype que read_csv sur le fichier reel
+        if spec["kind"] == "numeric" and spec["decimals"] == 0 and not spec["missing"]:
+            df[c] = df[c].astype(np.int64)
+    return df
+
+def write_csv(path: Path, n_rows: int, seed: int = 0, chunk_rows: int = 200_000) -> Path:
+    """Ecrit le CSV par blocs (memoire bornee); chaque bloc a sa propre graine."""
+    profile = load_profile()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        part = generate(min(chunk_rows, n_rows - start), seed=seed * 1_000_003 + i, profile=profile)
+        part.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+def compare(real: pd.DataFrame, synth: pd.DataFrame) -> dict:
+    """Ecarts colonne par colonne: taux de manquants, taux de negatifs (colonnes
+    d'ANOMALY_COLS, celles que le nettoyage traite), distance de Kolmogorov-Smirnov (numeriques, dates) ou de variation totale (categorielles),
+    et plus grand ecart entre matrices de correlation de rang."""
+    from scipy.stats import ks_2samp
+    from app.ml.preprocessing import ANOMALY_COLS
+
+    report, numeric = {}, []
+    for c in real.columns:
+        r, s = real[c], synth[c]
+        row = {"missing": abs(r.isna().mean() - s.isna().mean())}
+        if c in DATE_COLS:
+            r, s = (_days(pd.to_datetime(v, errors="coerce")) for v in (r, s))
+        if c in ANOMALY_COLS:
+            r, s = (pd.to_numeric(v, errors="coerce") for v in (r, s))
+            row["negative"] = abs((r < 0).mean() - (s < 0).mean())
+        if pd.api.types.is_numeric_dtype(r):
+            row["ks"] = float(ks_2samp(r.dropna(), s.dropna()).statistic)
+            numeric.append(c)
+        else:
+            p = r.value_counts(normalize=True)
+            q = s.value_counts(normalize=True)
+            row["tv"] = float(p.subtract(q, fill_value=0).abs().sum() / 2)
+        report[c] = row
+    to_num = lambda df: df[numeric].apply(pd.to_numeric, errors="coerce")
+    corr_gap = (to_num(real).corr("spearman") - to_num(synth).corr("spearman")).abs().to_numpy()
+    return {"columns": report, "corr_max_gap": float(np.nanmax(corr_gap)),
+            "max_ks": max((v.get("ks", 0.0) for v in report.values()), default=0.0),
+            "max_tv": max((v.get("tv", 0.0) for v in report.values()), default=0.0),
+            "max_missing_gap": max(v["missing"] for v in report.values()),
+            "max_negative_gap": max((v.get("negative", 0.0) for v in report.values()), default=0.0)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="comparer un echantillon au fichier reel")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    write_csv(args.out, args.rows, args.seed)
+    elapsed = time.perf_counter() - t0
+    print(f"{args.rows} lignes -> {args.out} ({elapsed:.1f} s, {args.rows / elapsed:,.0f} lignes/s)")
+    if args.check:
+        real = pd.read_csv(DATA_PATH)
+        synth = pd.read_csv(args.out, nrows=max(len(real), min(args.rows, 200_000)))
+        report = compare(real, synth)
+        for c, row in report["columns"].items():
+            print(f"  {c:<24} " + "  ".join(f"{k} {v:.3f}" for k, v in row.items()))
+        print(f"  ecart max des correlations de rang: {report['corr_max_gap']:.3f}")
+
+if __name__ == "__main__":
+    main()
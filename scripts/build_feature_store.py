@@ -0,0 +1,25 @@
+"""(Re)construction de la table client_features (feature store).
+
+A lancer apres la migration 0003 sur une base existante, ou apres un changement
+de FEATURE_VERSION (colonnes / regles de nettoyage). Les ecritures de l'API et
+de l'ingestion tiennent ensuite la table a jour.
+
+Usage:
+    python -m scripts.build_feature_store [--chunk-size 20000]
+"""
+from __future__ import annotations
+import argparse, time
+
+from app.ml import feature_store
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    n = feature_store.rebuild(chunk_size=args.chunk_size)
+    print(f"OK: {n} vecteurs (version {feature_store.FEATURE_VERSION}) en {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,24 @@
 
 - Inserer les colonnes dans clients (y compris nb_enfants, quotient_caf)
 - Inserer orientation_sexuelle dans client_sensitive
+- Lecture par lots (memoire constante), reprise possible apres interruption
+- --profile: medianes globales du rapport de scripts/analyze_data_all pour les
+  champs obligatoires manquants (sinon mediane du lot)
 
 Usage:
-    python -m scripts.ingest_data_all
+    python -m scripts.ingest_data_all [--path data/data-all.csv] [--chunk-size 50000] [--no-resume]
+        [--profile data/data-all.profile.json]
 """
 from __future__ import annotations
+import argparse, hashlib, json, os, time
 from pathlib import Path
 import pandas as pd
 import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, OperationalError
 
-from app.database import SessionLocal, engine
+from app.crud import WRITE_RETRIES, WRITE_RETRY_DELAY, insert_clients
+from app.database import engine, is_transient_error
 from app.models import Client, ClientSensitive
 
 DATA_PATH = Path(__file__).resolve().parents[1] / "data" / "data-all.csv"
@@ -47,60 +55,162 @@ def _normalize(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def main():
-    df = pd.read_csv(DATA_PATH)
+REQUIRED_DEFAULTS = {
+    "nom": "UNKNOWN", "prenom": "UNKNOWN", "sexe": "U", "sport_licence": "non",
+    "niveau_etude": "inconnu", "region": "inconnu", "smoker": "non",
+    "nationalite_francaise": "non", "date_creation_compte": "1970-01-01",
+}
+# champs numeriques obligatoires: imputes par la mediane globale (rapport de profil) ou du lot
+REQUIRED_MEDIAN_COLS = ["age", "revenu_estime_mois", "risque_personnel"]
+INT_COLS = ["age", "revenu_estime_mois"]
+
+def _prepare_chunk(df: pd.DataFrame, medians: dict[str, float] | None = None) -> tuple[list[dict], list[str | None]]:
     df = _normalize(df)
 
     # split sensitive
     if "orientation_sexuelle" in df.columns:
-        sens = df[["orientation_sexuelle"]].copy()
+        orientations = [_clean_orientation(v) for v in df["orientation_sexuelle"].tolist()]
     else:
-        sens = pd.DataFrame({"orientation_sexuelle": [None]*len(df)})
+        orientations = [None] * len(df)
 
     # keep only expected client cols
     df_clients = df[[c for c in EXPECTED_CLIENT_COLS if c in df.columns]].copy()
 
-    # Fill required non-null fields to avoid ORM errors
+    # Fill required non-null fields to avoid integrity errors
     # (dataset should already be complete, but on securise)
-    df_clients["nom"] = df_clients["nom"].fillna("UNKNOWN")
-    df_clients["prenom"] = df_clients["prenom"].fillna("UNKNOWN")
-    df_clients["sexe"] = df_clients["sexe"].fillna("U")
-    df_clients["sport_licence"] = df_clients["sport_licence"].fillna("non")
-    df_clients["niveau_etude"] = df_clients["niveau_etude"].fillna("inconnu")
-    df_clients["region"] = df_clients["region"].fillna("inconnu")
-    df_clients["smoker"] = df_clients["smoker"].fillna("non")
-    df_clients["nationalite_francaise"] = df_clients["nationalite_francaise"].fillna("non")
-    df_clients["age"] = df_clients["age"].fillna(df_clients["age"].median()).astype(int)
-    df_clients["revenu_estime_mois"] = df_clients["revenu_estime_mois"].fillna(df_clients["revenu_estime_mois"].median()).astype(int)
-    df_clients["risque_personnel"] = df_clients["risque_personnel"].fillna(df_clients["risque_personnel"].median())
-    df_clients["date_creation_compte"] = df_clients["date_creation_compte"].fillna("1970-01-01")
-
-    db = SessionLocal()
+    for c, default in REQUIRED_DEFAULTS.items():
+        df_clients[c] = df_clients[c].fillna(default)
+    for c in REQUIRED_MEDIAN_COLS:
+        df_clients[c] = df_clients[c].fillna((medians or {}).get(c, df_clients[c].median()))
+    for c in INT_COLS:
+        df_clients[c] = df_clients[c].astype(int)
+
+    # NaN -> None, types numpy -> types Python (liaison DBAPI)
+    df_clients = df_clients.astype(object).where(df_clients.notna(), None)
+    return df_clients.to_dict(orient="records"), orientations
+
+def _clean_orientation(v):
+    # store but do not expose; keep None for 'nan'
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return None
+    if isinstance(v, str) and v.lower() in {"nan", "none", ""}:
+        return None
+    return v
+
+def _fingerprint(path: Path) -> dict:
+    """Identite du CSV: taille, date de modification et empreinte du premier bloc."""
+    st = path.stat()
+    with open(path, "rb") as f:
+        head = hashlib.sha256(f.read(1 << 20)).hexdigest()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "head_sha256": head}
+
+def _load_checkpoint(path: Path) -> dict:
+    if not path.exists():
+        return {"rows_done": 0}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def _save_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _resolve_pending(conn, state: dict) -> dict:
+    """Un lot marque 'pending' a-t-il ete commite avant l'interruption ?"""
+    pending = state.pop("pending", None)
+    if pending is not None:
+        committed = conn.execute(select(Client.id).where(Client.id == pending["last_id"])).first()
+        if committed is not None:
+            state["rows_done"] += pending["rows"]
+    return state
+
+def _insert_chunk(records: list[dict], orientations: list, checkpoint: Path, state: dict) -> list[int]:
+    """Un lot en une transaction, rejoue si une ecriture concurrente (API) le bloque."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            with engine.begin() as conn:
+                ids = insert_clients(conn, records)
+                conn.execute(insert(ClientSensitive), [
+                    {"client_id": cid, "orientation_sexuelle": o} for cid, o in zip(ids, orientations)
+                ])
+                # note avant commit: si le process meurt entre commit et checkpoint,
+                # la reprise verifie si ce lot est en base
+                _save_checkpoint(checkpoint, {**state, "pending": {"rows": len(ids), "last_id": ids[-1]}})
+            return ids
+        except (IntegrityError, OperationalError) as exc:
+            # lot annule: le marqueur pending ne designe plus rien
+            _save_checkpoint(checkpoint, state)
+            if attempt == WRITE_RETRIES or not is_transient_error(exc):
+                raise
+            print(f"  lot rejoue ({exc.orig})", flush=True)
+            time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+
+def ingest(
+    path: Path = DATA_PATH, chunk_size: int = 50_000, checkpoint: Path | None = None, resume: bool = True,
+    profile: Path | None = None,
+) -> int:
+    """Ingestion par lots: une transaction par lot (clients + lignes sensibles).
+
+    Les ids des clients sont connus a l'insertion (INSERT ... RETURNING, ou
+    attribues sous le verrou d'ecriture sous SQLite), donc les lignes sensibles
+    sont liees sans relire la table. Un lot en conflit avec une ecriture
+    concurrente (base verrouillee, id pris) est rejoue dans une nouvelle transaction.
+    L'avancement est note dans un fichier de reprise, avec l'identite du CSV
+    (_fingerprint); relancer la commande reprend apres le dernier lot commite. Un
+    fichier different au meme chemin est refuse (--no-resume pour repartir de
+    zero); le fichier de reprise est supprime a la fin d'une ingestion complete.
+    """
+    checkpoint = checkpoint or path.with_suffix(path.suffix + ".ingest.json")
+    medians = None
+    if profile is not None:
+        from .analyze_data_all import load_report, report_medians
+
+        medians = report_medians(load_report(profile), REQUIRED_MEDIAN_COLS)
+    file_id = _fingerprint(path)
+    state = _load_checkpoint(checkpoint) if resume else {"rows_done": 0}
+    if state["rows_done"] or "pending" in state:
+        if state.get("file") != file_id:
+            raise ValueError(f"{checkpoint} ne correspond pas a {path} (fichier modifie ou remplace): "
+                             "relancer avec --no-resume pour tout reingerer")
+        with engine.connect() as conn:
+            state = _resolve_pending(conn, state)
+    rows_done = state["rows_done"]
+    if rows_done:
+        print(f"Reprise apres {rows_done} lignes ({checkpoint})")
+
+    reader = pd.read_csv(path, chunksize=chunk_size, skiprows=range(1, rows_done + 1))
+    t0 = time.perf_counter()
+    inserted = 0
+    for chunk in reader:
+        if chunk.empty:
+            continue
+        records, orientations = _prepare_chunk(chunk, medians)
+        ids = _insert_chunk(records, orientations, checkpoint, {"file": file_id, "rows_done": rows_done})
+        rows_done += len(ids)
+        inserted += len(ids)
+        _save_checkpoint(checkpoint, {"file": file_id, "rows_done": rows_done})
+        elapsed = time.perf_counter() - t0
+        print(f"  {rows_done} lignes ({inserted / elapsed:,.0f} lignes/s)", flush=True)
+
+    # fichier entierement lu: une relance reingere tout (ou un nouveau fichier)
+    checkpoint.unlink(missing_ok=True)
+    return inserted
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, default=DATA_PATH)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="fichier de reprise (defaut: <csv>.ingest.json)")
+    parser.add_argument("--no-resume", action="store_true", help="ignorer le fichier de reprise")
+    parser.add_argument("--profile", type=Path, default=None,
+                        help="rapport de python -m scripts.analyze_data_all (medianes globales)")
+    args = parser.parse_args()
+
     try:
-        # bulk insert clients
-        clients = []
-        for row in df_clients.to_dict(orient="records"):
-            clients.append(Client(**row))
-        db.bulk_save_objects(clients)
-        db.commit()
-
-        # Need client ids after commit -> requery in same order by rowid
-        # In SQLite, after bulk_save_objects, ids may not be populated.
-        # So we fetch all clients inserted and zip in insertion order (best effort).
-        inserted = db.query(Client).order_by(Client.id).all()[-len(df_clients):]
-
-        sens_records = []
-        for client_obj, orientation in zip(inserted, sens["orientation_sexuelle"].tolist()):
-            # store but do not expose; keep None for 'nan'
-            if isinstance(orientation, str) and orientation.lower() in {"nan","none",""}:
-                orientation = None
-            sens_records.append(ClientSensitive(client_id=client_obj.id, orientation_sexuelle=orientation))
-        db.bulk_save_objects(sens_records)
-        db.commit()
-
-        print(f"OK: {len(df_clients)} clients inseres + {len(sens_records)} lignes sensibles")
-    finally:
-        db.close()
+        n = ingest(args.path, args.chunk_size, args.checkpoint, resume=not args.no_resume, profile=args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"OK: {n} clients inseres + {n} lignes sensibles")
 
 if __name__ == "__main__":
     main()
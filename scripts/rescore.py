@@ -0,0 +1,38 @@
+"""Rescoring de toute la table clients avec le modele promu (ou --run).
+
+Ecrit une ligne par client dans client_predictions (score, version du modele,
+date). Une execution interrompue reprend apres la derniere tranche commitee
+pour la meme version; --full repart du debut (et une execution --full
+interrompue se relance avec --full).
+
+Usage:
+    python -m scripts.rescore [--chunk-size 20000] [--workers 4] [--run <run_id>] [--full]
+"""
+from __future__ import annotations
+import argparse
+
+from app.ml.artifacts import run_dir
+from app.ml.inference import ModelNotReady
+from app.ml.rescore import CHUNK_SIZE, rescore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--run", default=None, help="id du run (defaut: run promu)")
+    parser.add_argument("--full", action="store_true", help="ignorer les tranches deja ecrites")
+    args = parser.parse_args()
+
+    def on_chunk(done, total):
+        print(f"  tranche {done}/{total}", flush=True)
+
+    try:
+        result = rescore(run_dir(args.run) if args.run else None, args.chunk_size, args.workers, args.full,
+                         on_chunk=on_chunk)
+    except ModelNotReady as e:
+        raise SystemExit(f"Erreur: {e}")
+    print(f"OK: {result['n_rows']} clients scores (modele {result['model_version']}, reprise apres "
+          f"id {result['resumed_after']}, source {result['source']}) en {result['seconds']:.1f} s")
+
+if __name__ == "__main__":
+    main()
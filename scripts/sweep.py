@@ -0,0 +1,58 @@
+"""Recherche d'hyperparametres en ligne de commande (meme moteur que POST /train/sweep).
+
+Chaque parametre recoit une liste de valeurs (grille) ou, en mode random,
+"low:high" (uniforme) / "low:high:log" (log-uniforme). Le meilleur essai est promu
+(artifacts/LATEST) sauf --no-promote.
+
+Usage:
+    python -m scripts.sweep --lr 1e-3 3e-3 1e-2 --batch-size 128 256 [--epochs 25] [--workers 4]
+    python -m scripts.sweep --mode random --trials 16 --lr 1e-4:1e-2:log --batch-size 64 128 256
+"""
+from __future__ import annotations
+import argparse
+
+from app.ml.artifacts import new_run_id, promote, run_dir
+from app.ml.sweep import PARAMS, expand_space, run_sweep
+
+def parse_values(values: list[str]):
+    if len(values) == 1 and ":" in values[0]:
+        low, high, *log = values[0].split(":")
+        return {"low": float(low), "high": float(high), "log": log == ["log"]}
+    return [float(v) for v in values]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name in PARAMS:
+        parser.add_argument(f"--{name.replace('_', '-')}", nargs="+", dest=name)
+    parser.add_argument("--mode", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=8, help="nombre d'essais (mode random)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--no-promote", action="store_true")
+    args = parser.parse_args()
+
+    space = {name: parse_values(getattr(args, name)) for name in PARAMS if getattr(args, name)}
+    try:
+        expand_space(space, args.mode, args.trials, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    run_id = new_run_id()
+
+    def on_trial(result, leaderboard):
+        print(f"  essai {result['trial']:3d} {result['params']}  RMSE={result['RMSE']:.3f} "
+              f"MAE={result['MAE']:.3f} ({result['epochs_run']} epoques, {result['seconds']:.1f} s)", flush=True)
+
+    result = run_sweep(space, args.mode, args.trials, args.seed, args.workers, args.threads_per_worker,
+                       run_dir(run_id), on_trial)
+    if result["status"] != "ok":
+        raise SystemExit(f"Erreur: {result['metrics']['error']}")
+    print("\nClassement:")
+    for rank, r in enumerate(result["leaderboard"], start=1):
+        print(f"{rank:3d}. essai {r['trial']:3d}  RMSE={r['RMSE']:.3f}  MAE={r['MAE']:.3f}  {r['params']}")
+    if not args.no_promote:
+        promote(run_id)
+        print(f"Run {run_id} promu (essai {result['metrics']['best_trial']})")
+
+if __name__ == "__main__":
+    main()